@@ -1,17 +1,90 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, Response, send_file, abort
 import os
-from db import Database
+import atexit
+import base64
+from datetime import date, timedelta
+import plotly
+import numpy as np
+from db import Database, DEFAULT_USER_ID
 from storage import Storage
 from processor import Processor
-from openai_client import OpenAIClient
+from tips_service import TipsService
 from ui_helpers import UIHelpers
-from models import Expense, Budget, UserPrefs, Category
-from utils import parse_date, format_currency
+from trends import TrendEngine
+from categorizer import CategorizerPool
+from fx import FxRates, normalize_currency
+from recurring import RecurringCache
+from forecast import ForecastScheduler, refresh_forecasts
+from exporter import Exporter, EXPENSE_COLUMNS, REPORT_COLUMNS, MIMETYPES
+from models import Expense, ExpenseRow, Budget, UserPrefs, Category, EXPENSE_FIELDS
+from utils import parse_date, format_currency, encode_cursor, decode_cursor
 import json
+from dataclasses import asdict
+from typing import List
 
 app = Flask(__name__)
 db = Database()
-storage = Storage(db)
+default_storage = Storage(db)
+tips_service = TipsService()
+categorizers = CategorizerPool(db.db_path)
+# Labels are saved in batches; write out whatever is pending when the process exits
+atexit.register(categorizers.flush)
+recurring_cache = RecurringCache()
+fx_rates = FxRates.from_csv(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fx_rates.csv'))
+
+# Budget forecasts are computed off the request path and read back by the dashboard
+forecast_scheduler = ForecastScheduler(lambda month, today: refresh_forecasts(default_storage, fx_rates, month, today))
+
+def background_jobs_enabled() -> bool:
+    """Whether this process should run the forecast refresher and categorizer flusher"""
+    # `python app.py` runs the debug reloader, whose watcher process also executes this module;
+    # only the serving child (WERKZEUG_RUN_MAIN) runs jobs. Any other import is the app being served.
+    if __name__ == '__main__' and os.environ.get('WERKZEUG_RUN_MAIN') != 'true':
+        return False
+    return os.environ.get('FINANCE_BACKGROUND_JOBS', '1') != '0'
+
+# Started with the app rather than under __main__, so WSGI servers get stored forecasts too
+if background_jobs_enabled():
+    forecast_scheduler.start()
+    categorizers.start_flusher()
+
+def current_user_id() -> int:
+    """Tenant for this request, from the X-User-Id header or user_id query parameter"""
+    raw = request.headers.get('X-User-Id') or request.args.get('user_id')
+    if raw is None:
+        return DEFAULT_USER_ID
+    try:
+        return int(raw)
+    except ValueError:
+        abort(400, 'Invalid user id')
+
+def tenant_storage() -> Storage:
+    return default_storage.for_user(current_user_id())
+
+def tenant_categorizer(storage: Storage):
+    # Only user-chosen categories train it: rule and model guesses fed back would override later rule changes
+    return categorizers.get(storage.user_id, storage.load_labelled_expenses)
+
+def supported_currency(code) -> str:
+    """Normalized currency code; codes without FX rates would break every later conversion"""
+    currency = normalize_currency(code or 'USD')
+    if currency not in fx_rates.currencies:
+        raise ValueError(f"Unsupported currency: {code}")
+    return currency
+
+def expense_json(expense: Expense) -> dict:
+    return dict(asdict(expense), category=expense.category.value)
+
+def expense_row_json(row: ExpenseRow, fields: List[str]) -> dict:
+    item = {f: getattr(row, f) for f in fields}
+    if 'tags' in item:
+        item['tags'] = row.tags.split(',') if row.tags else []
+    return item
+
+@app.errorhandler(ValueError)
+def handle_value_error(e):
+    # e.g. an expense currency missing from fx_rates.csv
+    return jsonify({'error': str(e)}), 400
 
 @app.route('/')
 def index():
@@ -20,49 +93,183 @@ def index():
 @app.route('/api/expense', methods=['POST'])
 def add_expense():
     data = request.json
+    storage = tenant_storage()
+    categorizer = tenant_categorizer(storage)
     try:
+        # An explicit category is a user label: use it and teach the local categorizer once stored
+        labelled = bool(data.get('category'))
+        if labelled:
+            category = Category(data['category'])
+        else:
+            category = categorizer.categorize(data['description'])
         expense = Expense(
             date=parse_date(data['date']),
             amount=float(data['amount']),
-            currency=data.get('currency', 'USD'),
-            category=Processor.categorize_expense(data['description']),
+            currency=supported_currency(data.get('currency')),
+            category=category,
             description=data['description'],
             method=data.get('method', 'cash'),
             tags=data.get('tags', [])
         )
-        expense_id = storage.save_expense(expense)
+        expense_id = storage.save_expense(expense, labelled)
+        if labelled:
+            categorizer.learn(expense.description, category)
+        tips_service.invalidate_month(expense.date[:7], storage.user_id)
         return jsonify({'id': expense_id, 'message': 'Expense added successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
 
+@app.route('/api/expenses', methods=['GET'])
+def list_expenses():
+    """Keyset-paginated expense listing ordered by (date, id); pass `next_cursor` back as `cursor`"""
+    fields = [f for f in request.args.get('fields', '').split(',') if f] or None
+    limit = min(max(int(request.args.get('limit', 50)), 1), 500)
+    order = request.args.get('order', 'desc')
+    if order not in ('asc', 'desc'):
+        raise ValueError(f"Unsupported order: {order}")
+    cursor = request.args.get('cursor')
+    rows = tenant_storage().list_expense_rows(fields, decode_cursor(cursor) if cursor else None, order == 'desc',
+                                              request.args.get('start'), request.args.get('end'),
+                                              request.args.get('category'), limit + 1)
+    page = rows[:limit]
+    return jsonify({
+        'expenses': [expense_row_json(row, fields or EXPENSE_FIELDS) for row in page],
+        'next_cursor': encode_cursor(page[-1].date, page[-1].id) if len(rows) > limit else None
+    })
+
+@app.route('/api/expenses/search', methods=['GET'])
+def search_expenses():
+    """Prefix search over descriptions and tags (`q`), filtered by `category`/`start`/`end`, paged by `limit`/`offset`"""
+    limit = min(max(int(request.args.get('limit', 50)), 1), 200)
+    offset = max(int(request.args.get('offset', 0)), 0)
+    # One extra row tells the client whether another page exists without a COUNT(*)
+    results = tenant_storage().search_expenses(request.args.get('q', ''), request.args.get('category'),
+                                               request.args.get('start'), request.args.get('end'),
+                                               limit + 1, offset)
+    return jsonify({
+        'results': [expense_json(e) for e in results[:limit]],
+        'limit': limit,
+        'offset': offset,
+        'has_more': len(results) > limit
+    })
+
 @app.route('/api/dashboard', methods=['GET'])
 def get_dashboard():
     month = request.args.get('month')
+    storage = tenant_storage()
     expenses = storage.load_expenses(month)
     budget = storage.load_budget(month or 'current')
+    currency = storage.load_user_prefs().currency
 
-    aggregates = Processor.aggregate_expenses(expenses, month)
-    budget_status = Processor.calculate_budget_status(expenses, budget)
+    aggregates = Processor.aggregate_expenses(expenses, month, currency, fx_rates)
+    budget_status = Processor.calculate_budget_status(expenses, budget, currency, fx_rates)
 
-    # Generate tips
-    try:
-        client = OpenAIClient()
-        tips = client.generate_tips(aggregates, budget_status)
-    except:
-        tips = Processor.generate_saving_tips(aggregates, budget_status)
+    # Cached AI tips if available, otherwise rule-based tips now and AI tips via a background job
+    tips, tips_job_id = tips_service.submit(month, aggregates, budget_status, storage.user_id)
 
+    # Plotly JSON specs rendered client-side by default; ?charts=png for legacy image output
+    chart_output = request.args.get('charts', 'spec')
     charts = {
-        'pie_chart': UIHelpers.create_pie_chart(aggregates['by_category']),
-        'bar_chart': UIHelpers.create_bar_chart(aggregates['by_category'])
+        'pie_chart': UIHelpers.create_pie_chart(aggregates['by_category'], output=chart_output),
+        'bar_chart': UIHelpers.create_bar_chart(aggregates['by_category'], output=chart_output)
     }
+    trend_rows = storage.load_month_daily_spend(month) if month else storage.load_daily_spend()
+    trend_rows = fx_rates.convert_rows(trend_rows, currency)
+    trend_series = TrendEngine.spend_series(trend_rows, TrendEngine.auto_frequency(trend_rows))
+    charts['trend_chart'] = UIHelpers.create_trend_chart(trend_series, output=chart_output)
+
+    forecast = storage.load_forecasts(month or date.today().strftime('%Y-%m'))
 
     return jsonify({
         'aggregates': aggregates,
         'budget_status': budget_status,
+        'forecast': forecast,
         'charts': charts,
-        'tips': tips
+        'tips': tips,
+        'tips_job_id': tips_job_id
     })
 
+@app.route('/api/trends', methods=['GET'])
+def get_trends():
+    """Spend series (D/W/M), rolling averages and month-over-month deltas from the daily rollup"""
+    storage = tenant_storage()
+    try:
+        rows = storage.load_daily_spend(request.args.get('start'), request.args.get('end'))
+        rows = fx_rates.convert_rows(rows, storage.load_user_prefs().currency)
+        max_points = request.args.get('max_points', type=int)
+        trends = TrendEngine.build_trends(
+            rows,
+            freq=request.args.get('freq'),
+            category=request.args.get('category'),
+            window=request.args.get('window', type=int),
+            max_points=max_points
+        )
+        trends['chart'] = UIHelpers.create_trend_chart(trends['series'], output='spec')
+        return jsonify(trends)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+
+@app.route('/api/recurring', methods=['GET'])
+def get_recurring():
+    """Detected subscriptions/recurring charges and their projected spend for a month (default: next month)"""
+    storage = tenant_storage()
+    month = request.args.get('month') or (date.today().replace(day=1) + timedelta(days=32)).strftime('%Y-%m')
+    # Read under the user's lock: a concurrent update would change the results mid-iteration
+    subscriptions, projected = recurring_cache.report(storage.user_id, storage.load_expenses_since, month)
+
+    currency = storage.load_user_prefs().currency
+    amounts = fx_rates.convert([p['projected_amount'] for p in projected], [p['currency'] for p in projected],
+                               [f"{month}-01"] * len(projected), currency) if projected else []
+    return jsonify({
+        'recurring': subscriptions,
+        'month': month,
+        'projected': projected,
+        'projected_total': round(float(np.nansum(amounts)), 2),
+        'currency': currency
+    })
+
+@app.route('/api/charts/<kind>.png', methods=['GET'])
+def get_chart_png(kind):
+    """PNG export of a dashboard chart (for email/export)"""
+    builders = {'pie': UIHelpers.create_pie_chart, 'bar': UIHelpers.create_bar_chart}
+    if kind not in builders:
+        return jsonify({'error': 'Unknown chart'}), 404
+    month = request.args.get('month')
+    storage = tenant_storage()
+    aggregates = Processor.aggregate_expenses(storage.load_expenses(month), month,
+                                              storage.load_user_prefs().currency, fx_rates)
+    data_uri = builders[kind](aggregates['by_category'], output='png')
+    if not data_uri:
+        return jsonify({'error': 'No data'}), 404
+    png = base64.b64decode(data_uri.split(',', 1)[1])
+    return Response(png, mimetype='image/png')
+
+@app.route('/api/export', methods=['GET'])
+def export():
+    """Stream expenses (type=expenses) or monthly totals (type=report) as csv, parquet or xlsx"""
+    kind = request.args.get('type', 'expenses')
+    fmt = request.args.get('format', 'csv')
+    start, end = request.args.get('start'), request.args.get('end')
+    Exporter.check_format(fmt)
+    storage = tenant_storage()
+    if kind == 'expenses':
+        chunks = Exporter.stream(fmt, EXPENSE_COLUMNS, storage.iter_expense_rows(start, end), 'Expenses')
+    elif kind == 'report':
+        rows = Exporter.monthly_report(storage.iter_daily_spend(start, end), fx_rates,
+                                       storage.load_user_prefs().currency)
+        chunks = Exporter.stream(fmt, REPORT_COLUMNS, rows, 'Report')
+    else:
+        raise ValueError(f"Unknown export type: {kind}")
+    # The generator reads the database chunk by chunk while the response is sent
+    return Response(chunks, mimetype=MIMETYPES[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={kind}.{fmt}'})
+
+@app.route('/vendor/plotly.min.js')
+def plotly_js():
+    # Serve the Plotly.js bundle shipped with the plotly package so charts work offline
+    return send_file(os.path.join(os.path.dirname(plotly.__file__), 'package_data', 'plotly.min.js'),
+                     mimetype='application/javascript', max_age=86400)
+
 @app.route('/api/budget', methods=['POST'])
 def set_budget():
     data = request.json
@@ -72,7 +279,7 @@ def set_budget():
             category_limits=data['category_limits'],
             savings_goal=float(data['savings_goal'])
         )
-        storage.save_budget(budget)
+        tenant_storage().save_budget(budget)
         return jsonify({'message': 'Budget updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -80,31 +287,65 @@ def set_budget():
 @app.route('/api/tips', methods=['POST'])
 def get_tips():
     month = request.json.get('month')
+    storage = tenant_storage()
     expenses = storage.load_expenses(month)
     budget = storage.load_budget(month or 'current')
+    currency = storage.load_user_prefs().currency
 
-    aggregates = Processor.aggregate_expenses(expenses, month)
-    budget_status = Processor.calculate_budget_status(expenses, budget)
+    aggregates = Processor.aggregate_expenses(expenses, month, currency, fx_rates)
+    budget_status = Processor.calculate_budget_status(expenses, budget, currency, fx_rates)
 
-    # Try OpenAI first, fallback to rule-based
-    try:
-        client = OpenAIClient()
-        tips = client.generate_tips(aggregates, budget_status)
-    except:
-        tips = Processor.generate_saving_tips(aggregates, budget_status)
+    # Try OpenAI first (cached, rate limited), fallback to rule-based
+    tips = tips_service.get_tips(month, aggregates, budget_status, storage.user_id)
 
     return jsonify({'tips': tips})
 
+@app.route('/api/tips/jobs/<job_id>', methods=['GET'])
+def get_tips_job(job_id):
+    # max() first so a NaN wait becomes 0
+    wait = min(max(0.0, float(request.args.get('wait', 0))), tips_service.MAX_JOB_WAIT_SECONDS)
+    job = tips_service.get_job(job_id, wait=wait)
+    if job is None:
+        return jsonify({'error': 'Unknown job'}), 404
+    return jsonify(job)
+
+@app.route('/api/tips/jobs/<job_id>/events', methods=['GET'])
+def stream_tips_job(job_id):
+    if tips_service.get_job(job_id) is None:
+        return jsonify({'error': 'Unknown job'}), 404
+
+    def events():
+        # Keep-alive comments until the job finishes, then a single data event
+        while True:
+            job = tips_service.get_job(job_id, wait=15)
+            if job is None:
+                # Finished jobs are dropped after JOB_RETENTION_SECONDS
+                yield f"event: error\ndata: {json.dumps({'error': 'Unknown job'})}\n\n"
+                return
+            if job['status'] != 'pending':
+                yield f"data: {json.dumps(job)}\n\n"
+                return
+            yield ": waiting\n\n"
+
+    return Response(events(), mimetype='text/event-stream', headers={'Cache-Control': 'no-cache'})
+
+@app.route('/api/categorizer/retrain', methods=['POST'])
+def retrain_categorizer():
+    storage = tenant_storage()
+    expenses = storage.load_labelled_expenses()
+    tenant_categorizer(storage).fit(expenses)
+    return jsonify({'message': 'Categorizer retrained', 'examples': len(expenses)})
+
 @app.route('/api/user_prefs', methods=['POST'])
 def set_user_prefs():
     data = request.json
     try:
         prefs = UserPrefs(
-            currency=data.get('currency', 'USD'),
+            currency=supported_currency(data.get('currency')),
             income=float(data.get('income', 0)),
             savings_goal=float(data.get('savings_goal', 0))
         )
-        storage.save_user_prefs(prefs)
+        tenant_storage().save_user_prefs(prefs)
         return jsonify({'message': 'Preferences updated successfully'})
     except Exception as e:
         return jsonify({'error': str(e)}), 400
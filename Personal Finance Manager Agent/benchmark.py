@@ -0,0 +1,169 @@
+"""Performance benchmarks for the Finance agent on synthetic data.
+
+    python benchmark.py --users 5 --years 3 --output results.json
+    python benchmark.py --baseline results.json --tolerance 0.25   # exit 1 on regressions
+
+Every benchmark reports the best of `--repeat` runs as JSON, so results can
+be stored and compared as data volume grows.
+"""
+import argparse
+import json
+import os
+import platform
+import sqlite3
+import sys
+import tempfile
+import time
+from dataclasses import asdict
+from datetime import date
+from typing import Callable, Dict, List
+from db import Database
+from storage import Storage
+from processor import Processor
+from categorizer import LocalCategorizer, CategorizerPool
+from tips_service import TipsService
+from synthetic import SyntheticConfig, SyntheticData
+
+
+class StubTipsClient:
+    """Stands in for OpenAIClient so dashboard timings exclude network round trips"""
+
+    def generate_tips(self, aggregates: Dict, budget_status: Dict, fallback: bool = True) -> List[Dict]:
+        return [{'title': 'Benchmark tip', 'description': 'Stubbed', 'savings_potential': 0.0}]
+
+
+def _timed(name: str, n: int, fn: Callable[[], object], repeat: int) -> Dict:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - started)
+    return {'name': name, 'n': n, 'seconds': round(best, 6), 'per_second': round(n / best, 1) if best else None}
+
+
+def run_benchmarks(config: SyntheticConfig, workdir: str, repeat: int = 3) -> Dict:
+    """Generate data under `workdir`, run every benchmark and return the JSON-serializable report"""
+    data = SyntheticData(config)
+    storage = Storage(Database(os.path.join(workdir, 'finance.db')))
+    results = []
+
+    expenses = data.expenses(1)
+    sample = expenses[:min(len(expenses), 200)]
+    single = Storage(Database(os.path.join(workdir, 'single.db')))
+    results.append(_timed('insert_single', len(sample), lambda: [single.save_expense(e) for e in sample], 1))
+
+    started = time.perf_counter()
+    total = data.load(storage)
+    elapsed = time.perf_counter() - started
+    results.append({'name': 'insert_bulk', 'n': total, 'seconds': round(elapsed, 6),
+                    'per_second': round(total / elapsed, 1)})
+
+    month = config.end.strftime('%Y-%m')
+    month_expenses = storage.load_expenses(month)
+    results.append(_timed('month_query', len(month_expenses), lambda: storage.load_expenses(month), repeat))
+    results.append(_timed('full_history_query', len(expenses), lambda: storage.load_expenses(), repeat))
+    # A page from the middle of the history; keyset seeks make this as cheap as the first page
+    middle = (expenses[len(expenses) // 2].date, 10 ** 12)
+    results.append(_timed('list_page', 50, lambda: storage.list_expense_rows(after=middle, limit=50), repeat))
+
+    results.append(_timed('aggregate_expenses', len(month_expenses),
+                          lambda: Processor.aggregate_expenses(month_expenses, month), repeat))
+    results.append(_timed('aggregate_full_history', len(expenses),
+                          lambda: Processor.aggregate_expenses(expenses, None), repeat))
+    budget = storage.load_budget(month)
+    results.append(_timed('calculate_budget_status', len(month_expenses),
+                          lambda: Processor.calculate_budget_status(month_expenses, budget), repeat))
+
+    descriptions = [e.description for e in expenses]
+    results.append(_timed('categorize_rules', len(descriptions),
+                          lambda: Processor.categorize_many(descriptions), repeat))
+    categorizer = LocalCategorizer(os.path.join(workdir, 'bench_categorizer.npz'))
+    results.append(_timed('categorizer_fit', len(expenses), lambda: categorizer.fit(expenses), 1))
+    sample_descriptions = descriptions[:2000]
+    results.append(_timed('categorize_local', len(sample_descriptions),
+                          lambda: [categorizer.categorize(d) for d in sample_descriptions], repeat))
+
+    results.append(_timed('dashboard', 1, _dashboard_client(storage, workdir, month), repeat))
+
+    return {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'environment': {'python': platform.python_version(), 'sqlite': sqlite3.sqlite_version,
+                        'platform': platform.platform()},
+        'config': dict(asdict(config), categories=[c.value for c in config.categories],
+                       end=config.end.isoformat()),
+        'results': results
+    }
+
+
+def _dashboard_client(storage: Storage, workdir: str, month: str) -> Callable[[], object]:
+    """GET /api/dashboard against the synthetic database with tips served by the stub client"""
+    cwd = os.getcwd()
+    os.chdir(workdir)  # app opens finance.db relative to the working directory on import
+    # Background refreshes would compete with the timed requests
+    os.environ['FINANCE_BACKGROUND_JOBS'] = '0'
+    try:
+        import app as finance_app
+    finally:
+        os.chdir(cwd)
+    finance_app.default_storage = storage
+    finance_app.categorizers = CategorizerPool(storage.db.db_path)
+    finance_app.tips_service = TipsService(client_factory=StubTipsClient)
+    client = finance_app.app.test_client()
+
+    def request():
+        response = client.get(f'/api/dashboard?month={month}')
+        if response.status_code != 200:
+            raise RuntimeError(f"Dashboard returned {response.status_code}: {response.get_data(as_text=True)}")
+    return request
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """Names and slowdowns of benchmarks more than `tolerance` slower than the baseline"""
+    previous = {r['name']: r for r in baseline['results']}
+    regressions = []
+    for result in results['results']:
+        before = previous.get(result['name'])
+        # Compare per-item time so runs at different data volumes stay comparable
+        if before and before['n'] and result['n']:
+            ratio = (result['seconds'] / result['n']) / (before['seconds'] / before['n'])
+            if ratio > 1 + tolerance:
+                regressions.append(f"{result['name']}: {ratio:.2f}x slower per item")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--users', type=int, default=3)
+    parser.add_argument('--years', type=float, default=2.0)
+    parser.add_argument('--per-day', type=float, default=3.0, help="average expenses per user per day")
+    parser.add_argument('--merchants', type=int, default=25, help="merchants per category")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--output', help="write the JSON report here (default: stdout)")
+    parser.add_argument('--baseline', help="earlier JSON report to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.25)
+    args = parser.parse_args(argv)
+
+    config = SyntheticConfig(users=args.users, years=args.years, expenses_per_day=args.per_day,
+                             merchants_per_category=args.merchants, seed=args.seed, end=date(2023, 12, 31))
+    with tempfile.TemporaryDirectory() as workdir:
+        report = run_benchmarks(config, workdir, args.repeat)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,238 @@
+import json
+import logging
+import os
+import re
+import threading
+import zlib
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
+from models import Expense, Category
+from processor import Processor
+from db import DEFAULT_USER_ID
+
+# Categories the model can predict; UNCATEGORIZED is the "no answer" result
+LABELS: List[Category] = [c for c in Category if c is not Category.UNCATEGORIZED]
+_LABEL_INDEX = {c: i for i, c in enumerate(LABELS)}
+
+_TOKEN_RE = re.compile(r'[a-z]+')
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_merchant(description: str) -> str:
+    """Normalize a description to a merchant key (lowercase letters only, store numbers dropped)"""
+    return ' '.join(_TOKEN_RE.findall(description.lower()))
+
+
+class LocalCategorizer:
+    """Offline categorizer trained on the user's own labelled expenses.
+
+    Lookups go merchant cache -> keyword rules -> multinomial naive Bayes over
+    hashed word and character n-grams. Naive Bayes only needs per-class feature
+    counts, so new labels are folded in incrementally without a full retrain.
+    New labels only mark the model dirty; `flush()` persists them in batches.
+    """
+
+    def __init__(self, model_path: str, n_features: int = 2 ** 16, alpha: float = 0.1,
+                 min_confidence: float = 0.6):
+        self.model_path = model_path
+        self.merchants_path = os.path.splitext(model_path)[0] + "_merchants.json"
+        self.n_features = n_features
+        self.alpha = alpha
+        self.min_confidence = min_confidence
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = False
+        self._reset()
+        self.load()
+
+    @classmethod
+    def for_database(cls, db_path: str, user_id: int = DEFAULT_USER_ID, **kwargs) -> "LocalCategorizer":
+        """Create a categorizer whose model files live next to the SQLite database"""
+        suffix = "" if user_id == DEFAULT_USER_ID else f"_u{user_id}"
+        return cls(os.path.splitext(db_path)[0] + f"_categorizer{suffix}.npz", **kwargs)
+
+    def _reset(self):
+        self.feature_counts = np.zeros((len(LABELS), self.n_features), dtype=np.float32)
+        self.class_counts = np.zeros(len(LABELS), dtype=np.float64)
+        self.merchants: Dict[str, str] = {}
+
+    @property
+    def trained(self) -> bool:
+        return bool(self.class_counts.sum())
+
+    def _features(self, description: str) -> np.ndarray:
+        """Hash word unigrams, bigrams and character trigrams into feature buckets"""
+        words = _TOKEN_RE.findall(description.lower())
+        grams = list(words)
+        grams.extend(f"{a} {b}" for a, b in zip(words, words[1:]))
+        for word in words:
+            padded = f"^{word}$"
+            grams.extend("#" + padded[i:i + 3] for i in range(len(padded) - 2))
+        # crc32 is stable across processes, unlike the builtin str hash
+        return np.fromiter((zlib.crc32(g.encode()) % self.n_features for g in grams),
+                           dtype=np.int64, count=len(grams))
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def learn(self, description: str, category: Category):
+        """Fold a single labelled expense into the model and merchant cache (persisted on the next flush)"""
+        if category is Category.UNCATEGORIZED:
+            return
+        features = self._features(description)
+        label = _LABEL_INDEX[category]
+        with self._lock:
+            np.add.at(self.feature_counts[label], features, 1.0)
+            self.class_counts[label] += 1
+            merchant = normalize_merchant(description)
+            if merchant:
+                self.merchants[merchant] = category.value
+            self._dirty = True
+
+    def fit(self, expenses: Iterable[Expense]):
+        """Retrain from scratch on labelled expenses"""
+        with self._lock:
+            self._reset()
+        for expense in expenses:
+            self.learn(expense.description, expense.category)
+        self.save()
+
+    def predict(self, description: str) -> Tuple[Category, float]:
+        """Return the most likely category and its posterior probability"""
+        if not self.trained:
+            return Category.UNCATEGORIZED, 0.0
+        features = self._features(description)
+        if not len(features):
+            return Category.UNCATEGORIZED, 0.0
+        with self._lock:
+            counts = self.feature_counts[:, features].astype(np.float64)
+            totals = self.feature_counts.sum(axis=1, dtype=np.float64)
+            class_counts = self.class_counts.copy()
+        log_prior = np.log((class_counts + 1.0) / (class_counts.sum() + len(LABELS)))
+        log_likelihood = np.log(counts + self.alpha).sum(axis=1) - \
+            len(features) * np.log(totals + self.alpha * self.n_features)
+        scores = log_prior + log_likelihood
+        # Only classes with training data are candidates
+        scores[class_counts == 0] = -np.inf
+        probs = np.exp(scores - scores.max())
+        probs /= probs.sum()
+        best = int(probs.argmax())
+        return LABELS[best], float(probs[best])
+
+    def categorize(self, description: str) -> Category:
+        """Categorize using the merchant cache, keyword rules, then the learned model"""
+        cached = self.merchants.get(normalize_merchant(description))
+        if cached:
+            return Category(cached)
+        category = Processor.categorize_expense(description)
+        if category is not Category.UNCATEGORIZED:
+            return category
+        predicted, confidence = self.predict(description)
+        return predicted if confidence >= self.min_confidence else Category.UNCATEGORIZED
+
+    def load(self):
+        """Load persisted model files if present"""
+        if os.path.exists(self.model_path):
+            with np.load(self.model_path) as data:
+                if data['feature_counts'].shape == (len(LABELS), self.n_features):
+                    self.feature_counts = data['feature_counts'].astype(np.float32)
+                    self.class_counts = data['class_counts'].astype(np.float64)
+        if os.path.exists(self.merchants_path):
+            with open(self.merchants_path) as f:
+                self.merchants = json.load(f)
+
+    def flush(self):
+        """Persist the model if it changed since the last save"""
+        if self._dirty:
+            self.save()
+
+    def save(self):
+        with self._save_lock:
+            # Snapshot under the model lock and write outside it, so lookups and learning are not blocked on disk
+            with self._lock:
+                feature_counts = self.feature_counts.copy()
+                class_counts = self.class_counts.copy()
+                merchants = dict(self.merchants)
+                self._dirty = False
+            try:
+                self._write(feature_counts, class_counts, merchants)
+            except Exception:
+                self._dirty = True
+                raise
+
+    def _write(self, feature_counts: np.ndarray, class_counts: np.ndarray, merchants: Dict[str, str]):
+        # Write to temp files and rename so a crash never leaves a half-written model
+        tmp_model = self.model_path + ".tmp"
+        with open(tmp_model, 'wb') as f:
+            np.savez_compressed(f, feature_counts=feature_counts, class_counts=class_counts)
+        os.replace(tmp_model, self.model_path)
+        tmp_merchants = self.merchants_path + ".tmp"
+        with open(tmp_merchants, 'w') as f:
+            json.dump(merchants, f)
+        os.replace(tmp_merchants, self.merchants_path)
+
+
+class CategorizerPool:
+    """LRU pool of per-user categorizers; only recently active tenants stay loaded.
+
+    Dirty models are saved when evicted, by `flush()` and by the background
+    flusher every `flush_interval_seconds`.
+    """
+
+    def __init__(self, db_path: str, max_size: int = 32, flush_interval_seconds: float = 30):
+        self.db_path = db_path
+        self.max_size = max_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._pool: "OrderedDict[int, LocalCategorizer]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def get(self, user_id: int, bootstrap: Callable[[], Iterable[Expense]] = None) -> LocalCategorizer:
+        """Return the user's categorizer, training it from `bootstrap()` expenses if it has no model yet"""
+        with self._lock:
+            categorizer = self._pool.get(user_id)
+            if categorizer is not None:
+                self._pool.move_to_end(user_id)
+                return categorizer
+        categorizer = LocalCategorizer.for_database(self.db_path, user_id)
+        if not categorizer.trained and bootstrap is not None:
+            categorizer.fit(e for e in bootstrap() if e.category != Category.UNCATEGORIZED)
+        evicted = []
+        with self._lock:
+            categorizer = self._pool.setdefault(user_id, categorizer)
+            self._pool.move_to_end(user_id)
+            while len(self._pool) > self.max_size:
+                evicted.append(self._pool.popitem(last=False)[1])
+        for stale in evicted:
+            self._flush_one(stale)
+        return categorizer
+
+    def flush(self):
+        """Save every loaded categorizer with unsaved labels"""
+        with self._lock:
+            categorizers = list(self._pool.values())
+        for categorizer in categorizers:
+            self._flush_one(categorizer)
+
+    @staticmethod
+    def _flush_one(categorizer: LocalCategorizer):
+        try:
+            categorizer.flush()
+        except Exception:
+            logger.exception("Saving categorizer %s failed", categorizer.model_path)
+
+    def start_flusher(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='categorizer-flusher', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.wait(self.flush_interval_seconds):
+            self.flush()
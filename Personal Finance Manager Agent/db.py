@@ -1,6 +1,271 @@
+import ast
+import logging
 import sqlite3
-from typing import List, Dict, Any
-from models import Expense, Budget, UserPrefs, Category
+from typing import List, Dict, Any, Iterable, Iterator, Tuple
+from models import Expense, ExpenseRow, Budget, UserPrefs, Category, EXPENSE_FIELDS
+from utils import build_search_query
+
+logger = logging.getLogger(__name__)
+
+# Tenant that owns rows created before storage became multi-user
+DEFAULT_USER_ID = 1
+
+# Rows fetched per round trip when streaming large result sets
+CHUNK_SIZE = 5000
+
+def _month_range(month: str) -> Tuple[str, str]:
+    """Half-open [first day, first day of next month) bounds, so dates with a time suffix still match"""
+    year, mon = map(int, month.split('-'))
+    return f"{month}-01", f"{year + mon // 12:04d}-{mon % 12 + 1:02d}-01"
+
+def _migrate_budget_limits(conn: sqlite3.Connection):
+    """Move category limits stored as Python dict reprs into budget_limits rows"""
+    rows = conn.execute('SELECT user_id, month, category_limits FROM budgets').fetchall()
+    for user_id, month, raw_limits in rows:
+        # literal_eval only accepts literals, unlike the eval() these rows were written for
+        try:
+            limits = ast.literal_eval(raw_limits) if raw_limits else {}
+        except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+            limits = None
+        if not isinstance(limits, dict):
+            logger.warning("Skipping unreadable budget limits for %s: %r", month, raw_limits)
+            continue
+        values = []
+        for category, limit in limits.items():
+            try:
+                values.append((user_id, month, str(category), float(limit)))
+            except (TypeError, ValueError):
+                logger.warning("Skipping non-numeric %s limit for %s: %r", category, month, limit)
+        conn.executemany(
+            'INSERT OR REPLACE INTO budget_limits (user_id, month, category, limit_amount) VALUES (?, ?, ?, ?)',
+            values
+        )
+
+def _add_labelled_column(conn: sqlite3.Connection):
+    """ALTER TABLE has no IF NOT EXISTS for columns"""
+    if 'labelled' not in [row[1] for row in conn.execute('PRAGMA table_info(expenses)')]:
+        conn.execute('ALTER TABLE expenses ADD COLUMN labelled INTEGER NOT NULL DEFAULT 0')
+
+# Schema migrations, applied in order and tracked with PRAGMA user_version.
+# A step is either an SQL statement or a callable taking the connection.
+MIGRATIONS = [
+    # 1: daily spend rollup maintained by triggers, so trends never scan raw expenses
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS daily_spend (
+            date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            amount REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (date, category, currency)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT OR REPLACE INTO daily_spend (date, category, currency, amount, count)
+        SELECT date, category, currency, SUM(amount), COUNT(*)
+        FROM expenses GROUP BY date, category, currency
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_rollup_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO daily_spend (date, category, currency, amount, count)
+            VALUES (NEW.date, NEW.category, NEW.currency, NEW.amount, 1)
+            ON CONFLICT (date, category, currency) DO UPDATE
+            SET amount = amount + excluded.amount, count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_rollup_delete AFTER DELETE ON expenses BEGIN
+            UPDATE daily_spend SET amount = amount - OLD.amount, count = count - 1
+            WHERE date = OLD.date AND category = OLD.category AND currency = OLD.currency;
+            DELETE FROM daily_spend
+            WHERE date = OLD.date AND category = OLD.category AND currency = OLD.currency AND count <= 0;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_rollup_update AFTER UPDATE OF date, amount, currency, category ON expenses BEGIN
+            UPDATE daily_spend SET amount = amount - OLD.amount, count = count - 1
+            WHERE date = OLD.date AND category = OLD.category AND currency = OLD.currency;
+            DELETE FROM daily_spend
+            WHERE date = OLD.date AND category = OLD.category AND currency = OLD.currency AND count <= 0;
+            INSERT INTO daily_spend (date, category, currency, amount, count)
+            VALUES (NEW.date, NEW.category, NEW.currency, NEW.amount, 1)
+            ON CONFLICT (date, category, currency) DO UPDATE
+            SET amount = amount + excluded.amount, count = count + 1;
+        END
+        ''',
+    ],
+    # 2: tenant-scoped storage. Every table gets a user_id with composite keys/indexes,
+    # existing rows belong to DEFAULT_USER_ID.
+    [
+        'ALTER TABLE expenses ADD COLUMN user_id INTEGER NOT NULL DEFAULT 1',
+        'CREATE INDEX IF NOT EXISTS idx_expenses_user_date ON expenses (user_id, date, id)',
+        'DROP TRIGGER IF EXISTS expenses_rollup_insert',
+        'DROP TRIGGER IF EXISTS expenses_rollup_delete',
+        'DROP TRIGGER IF EXISTS expenses_rollup_update',
+        '''
+        CREATE TABLE daily_spend_v2 (
+            user_id INTEGER NOT NULL,
+            date TEXT NOT NULL,
+            category TEXT NOT NULL,
+            currency TEXT NOT NULL,
+            amount REAL NOT NULL,
+            count INTEGER NOT NULL,
+            PRIMARY KEY (user_id, date, category, currency)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO daily_spend_v2 (user_id, date, category, currency, amount, count)
+        SELECT 1, date, category, currency, amount, count FROM daily_spend
+        ''',
+        'DROP TABLE daily_spend',
+        'ALTER TABLE daily_spend_v2 RENAME TO daily_spend',
+        '''
+        CREATE TRIGGER expenses_rollup_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO daily_spend (user_id, date, category, currency, amount, count)
+            VALUES (NEW.user_id, NEW.date, NEW.category, NEW.currency, NEW.amount, 1)
+            ON CONFLICT (user_id, date, category, currency) DO UPDATE
+            SET amount = amount + excluded.amount, count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER expenses_rollup_delete AFTER DELETE ON expenses BEGIN
+            UPDATE daily_spend SET amount = amount - OLD.amount, count = count - 1
+            WHERE user_id = OLD.user_id AND date = OLD.date AND category = OLD.category
+              AND currency = OLD.currency;
+            DELETE FROM daily_spend
+            WHERE user_id = OLD.user_id AND date = OLD.date AND category = OLD.category
+              AND currency = OLD.currency AND count <= 0;
+        END
+        ''',
+        '''
+        CREATE TRIGGER expenses_rollup_update AFTER UPDATE OF user_id, date, amount, currency, category ON expenses BEGIN
+            UPDATE daily_spend SET amount = amount - OLD.amount, count = count - 1
+            WHERE user_id = OLD.user_id AND date = OLD.date AND category = OLD.category
+              AND currency = OLD.currency;
+            DELETE FROM daily_spend
+            WHERE user_id = OLD.user_id AND date = OLD.date AND category = OLD.category
+              AND currency = OLD.currency AND count <= 0;
+            INSERT INTO daily_spend (user_id, date, category, currency, amount, count)
+            VALUES (NEW.user_id, NEW.date, NEW.category, NEW.currency, NEW.amount, 1)
+            ON CONFLICT (user_id, date, category, currency) DO UPDATE
+            SET amount = amount + excluded.amount, count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TABLE budgets_v2 (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category_limits TEXT NOT NULL,
+            savings_goal REAL NOT NULL,
+            UNIQUE (user_id, month)
+        )
+        ''',
+        '''
+        INSERT INTO budgets_v2 (id, user_id, month, category_limits, savings_goal)
+        SELECT id, 1, month, category_limits, savings_goal FROM budgets
+        ''',
+        'DROP TABLE budgets',
+        'ALTER TABLE budgets_v2 RENAME TO budgets',
+        '''
+        CREATE TABLE user_prefs_v2 (
+            user_id INTEGER PRIMARY KEY,
+            currency TEXT NOT NULL,
+            income REAL NOT NULL,
+            savings_goal REAL NOT NULL
+        )
+        ''',
+        '''
+        INSERT INTO user_prefs_v2 (user_id, currency, income, savings_goal)
+        SELECT id, currency, income, savings_goal FROM user_prefs WHERE id = 1
+        ''',
+        'DROP TABLE user_prefs',
+        'ALTER TABLE user_prefs_v2 RENAME TO user_prefs',
+    ],
+    # 3: normalized budget limits (one row per category) replacing the str()/eval() dict column
+    [
+        '''
+        CREATE TABLE budget_limits (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            limit_amount REAL NOT NULL,
+            PRIMARY KEY (user_id, month, category)
+        ) WITHOUT ROWID
+        ''',
+        _migrate_budget_limits,
+        '''
+        CREATE TABLE budgets_v3 (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            savings_goal REAL NOT NULL,
+            PRIMARY KEY (user_id, month)
+        ) WITHOUT ROWID
+        ''',
+        '''
+        INSERT INTO budgets_v3 (user_id, month, savings_goal)
+        SELECT user_id, month, savings_goal FROM budgets
+        ''',
+        'DROP TABLE budgets',
+        'ALTER TABLE budgets_v3 RENAME TO budgets',
+    ],
+    # 4: end-of-month projections written by the background forecast job
+    [
+        '''
+        CREATE TABLE IF NOT EXISTS forecasts (
+            user_id INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            category TEXT NOT NULL,
+            spent REAL NOT NULL,
+            projected REAL NOT NULL,
+            limit_amount REAL,
+            overrun_date TEXT,
+            computed_at TEXT NOT NULL,
+            PRIMARY KEY (user_id, month, category)
+        ) WITHOUT ROWID
+        ''',
+    ],
+    # 5: full-text index over descriptions and tags (an external-content table, so
+    # the text is not stored twice), kept in sync with expenses by triggers
+    [
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+            description, tags, content='expenses', content_rowid='id', prefix='2 3'
+        )
+        ''',
+        "INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')",
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses BEGIN
+            INSERT INTO expenses_fts (rowid, description, tags) VALUES (NEW.id, NEW.description, NEW.tags);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, description, tags)
+            VALUES ('delete', OLD.id, OLD.description, OLD.tags);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description, tags ON expenses BEGIN
+            INSERT INTO expenses_fts (expenses_fts, rowid, description, tags)
+            VALUES ('delete', OLD.id, OLD.description, OLD.tags);
+            INSERT INTO expenses_fts (rowid, description, tags) VALUES (NEW.id, NEW.description, NEW.tags);
+        END
+        ''',
+    ],
+    # 6: whether the user chose the category (rather than a rule or the model), so only
+    # user labels train the categorizer; the origin of existing rows is unknown
+    [
+        _add_labelled_column,
+    ],
+    # 7: currency codes were free text before they were validated on write; store the
+    # canonical upper-case form (the rollup triggers move the daily_spend rows along)
+    [
+        'UPDATE expenses SET currency = UPPER(TRIM(currency)) WHERE currency != UPPER(TRIM(currency))',
+        'UPDATE user_prefs SET currency = UPPER(TRIM(currency)) WHERE currency != UPPER(TRIM(currency))',
+    ],
+]
 
 class Database:
     def __init__(self, db_path: str = "finance.db"):
@@ -9,6 +274,8 @@ class Database:
 
     def init_db(self):
         with sqlite3.connect(self.db_path) as conn:
+            # WAL lets long streaming reads (exports) run without blocking writers
+            conn.execute('PRAGMA journal_mode=WAL')
             conn.execute('''
                 CREATE TABLE IF NOT EXISTS expenses (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -37,82 +304,281 @@ class Database:
                     savings_goal REAL NOT NULL
                 )
             ''')
+            self._migrate(conn)
             conn.commit()
 
-    def insert_expense(self, expense: Expense) -> int:
+    def _migrate(self, conn: sqlite3.Connection):
+        """Apply pending schema migrations, each in its own transaction"""
+        conn.commit()
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for target, statements in enumerate(MIGRATIONS[version:], start=version + 1):
+            # sqlite3 does not open a transaction for DDL, so begin one explicitly: a failed
+            # step rolls back with its version bump and the migration is retried cleanly
+            conn.execute('BEGIN')
+            try:
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {target}')
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+
+    def insert_expense(self, expense: Expense, user_id: int = DEFAULT_USER_ID, labelled: bool = False) -> int:
+        """Insert an expense; `labelled` marks a category chosen by the user"""
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT INTO expenses (date, amount, currency, category, description, method, tags)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (expense.date, expense.amount, expense.currency, expense.category.value,
-                  expense.description, expense.method, ','.join(expense.tags)))
+                INSERT INTO expenses (user_id, date, amount, currency, category, description, method, tags, labelled)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, expense.date, expense.amount, expense.currency, expense.category.value,
+                  expense.description, expense.method, ','.join(expense.tags), int(labelled)))
             conn.commit()
             return cursor.lastrowid
 
-    def get_expenses(self, month: str = None) -> List[Expense]:
+    def insert_expenses(self, expenses: Iterable[Expense], user_id: int = DEFAULT_USER_ID) -> int:
+        """Insert many expenses in one transaction; returns the number inserted"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.executemany('''
+                INSERT INTO expenses (user_id, date, amount, currency, category, description, method, tags)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            ''', ((user_id, e.date, e.amount, e.currency, e.category.value, e.description, e.method,
+                   ','.join(e.tags)) for e in expenses))
+            conn.commit()
+            return cursor.rowcount
+
+    def get_expenses(self, month: str = None, user_id: int = DEFAULT_USER_ID) -> List[Expense]:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
+            columns = 'id, date, amount, currency, category, description, method, tags'
             if month:
-                cursor.execute('SELECT * FROM expenses WHERE strftime("%Y-%m", date) = ?', (month,))
+                # Date range rather than strftime() so the (user_id, date) index is used
+                cursor.execute(f'SELECT {columns} FROM expenses WHERE user_id = ? AND date >= ? AND date < ?',
+                               (user_id, *_month_range(month)))
             else:
-                cursor.execute('SELECT * FROM expenses')
-            rows = cursor.fetchall()
-            expenses = []
-            for row in rows:
-                expense = Expense(
-                    id=row[0],
-                    date=row[1],
-                    amount=row[2],
-                    currency=row[3],
-                    category=Category(row[4]),
-                    description=row[5],
-                    method=row[6],
-                    tags=row[7].split(',') if row[7] else []
-                )
-                expenses.append(expense)
-            return expenses
+                cursor.execute(f'SELECT {columns} FROM expenses WHERE user_id = ?', (user_id,))
+            return [self._row_to_expense(row) for row in cursor.fetchall()]
+
+    def get_labelled_expenses(self, user_id: int = DEFAULT_USER_ID) -> List[Expense]:
+        """Expenses whose category the user chose, the only rows the categorizer may learn from"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute('''
+                SELECT id, date, amount, currency, category, description, method, tags
+                FROM expenses WHERE user_id = ? AND labelled = 1 AND category != ?
+            ''', (user_id, Category.UNCATEGORIZED.value))
+            return [self._row_to_expense(row) for row in cursor.fetchall()]
+
+    def search_expenses(self, text: str, category: str = None, start: str = None, end: str = None,
+                        limit: int = 50, offset: int = 0, user_id: int = DEFAULT_USER_ID) -> List[Expense]:
+        """Full-text prefix search over descriptions and tags, newest first"""
+        # CROSS JOIN pins the join order: resolve the (small) match set from the index first,
+        # rather than walking every expense of the user and probing FTS row by row
+        query, params = self._date_range('''
+            SELECT e.id, e.date, e.amount, e.currency, e.category, e.description, e.method, e.tags
+            FROM expenses_fts CROSS JOIN expenses e ON e.id = expenses_fts.rowid
+            WHERE expenses_fts MATCH ? AND e.user_id = ?''', [build_search_query(text), user_id], start, end)
+        if category:
+            query += ' AND e.category = ?'
+            params.append(category)
+        query += ' ORDER BY e.date DESC, e.id DESC LIMIT ? OFFSET ?'
+        with sqlite3.connect(self.db_path) as conn:
+            return [self._row_to_expense(row) for row in conn.execute(query, params + [limit, offset])]
 
-    def update_budget(self, budget: Budget):
+    def list_expense_rows(self, fields: List[str] = None, after: Tuple[str, int] = None, descending: bool = True,
+                          start: str = None, end: str = None, category: str = None, limit: int = 50,
+                          user_id: int = DEFAULT_USER_ID) -> List[ExpenseRow]:
+        """One keyset page of expenses ordered by (date, id), starting after the `after` position"""
+        fields = set(fields or EXPENSE_FIELDS)
+        unknown = fields - set(EXPENSE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown expense fields: {', '.join(sorted(unknown))}")
+        # date and id are always needed for the next cursor; other unselected columns come back NULL
+        columns = ', '.join(c if c in fields or c in ('id', 'date') else 'NULL' for c in EXPENSE_FIELDS)
+        query, params = self._date_range(f'SELECT {columns} FROM expenses WHERE user_id = ?', [user_id], start, end)
+        if category:
+            query += ' AND category = ?'
+            params.append(category)
+        if after:
+            # Row-value comparison seeks straight into the (user_id, date, id) index
+            query += ' AND (date, id) < (?, ?)' if descending else ' AND (date, id) > (?, ?)'
+            params.extend(after)
+        direction = 'DESC' if descending else 'ASC'
+        query += f' ORDER BY date {direction}, id {direction} LIMIT ?'
+        with sqlite3.connect(self.db_path) as conn:
+            return [ExpenseRow(*row) for row in conn.execute(query, params + [limit])]
+
+    def get_expenses_since(self, last_id: int, user_id: int = DEFAULT_USER_ID) -> List[Expense]:
+        """Return expenses with id greater than last_id, for incremental consumers"""
+        with sqlite3.connect(self.db_path) as conn:
+            cursor = conn.execute('''
+                SELECT id, date, amount, currency, category, description, method, tags
+                FROM expenses WHERE id > ? AND user_id = ? ORDER BY id
+            ''', (last_id, user_id))
+            return [self._row_to_expense(row) for row in cursor.fetchall()]
+
+    def iter_expense_rows(self, start: str = None, end: str = None, user_id: int = DEFAULT_USER_ID,
+                          chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple]]:
+        """Yield raw expense rows ordered by (date, id) in chunks of chunk_size"""
+        query, params = self._date_range(
+            'SELECT id, date, amount, currency, category, description, method, tags FROM expenses WHERE user_id = ?',
+            [user_id], start, end)
+        return self._iter_chunks(query + ' ORDER BY date, id', params, chunk_size)
+
+    def iter_daily_spend(self, start: str = None, end: str = None, user_id: int = DEFAULT_USER_ID,
+                         chunk_size: int = CHUNK_SIZE) -> Iterator[List[Tuple]]:
+        """Yield daily_spend rollup rows ordered by date in chunks of chunk_size"""
+        query, params = self._date_range(
+            'SELECT date, category, currency, amount, count FROM daily_spend WHERE user_id = ?', [user_id], start, end)
+        return self._iter_chunks(query + ' ORDER BY date', params, chunk_size)
+
+    @staticmethod
+    def _date_range(query: str, params: List, start: str = None, end: str = None) -> Tuple[str, List]:
+        if start:
+            query += ' AND date >= ?'
+            params.append(start)
+        if end:
+            query += ' AND date <= ?'
+            params.append(end)
+        return query, params
+
+    def _iter_chunks(self, query: str, params: List, chunk_size: int) -> Iterator[List[Tuple]]:
+        # One cursor for the whole scan; only chunk_size rows are in memory at a time
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                yield rows
+        finally:
+            conn.close()
+
+    @staticmethod
+    def _row_to_expense(row) -> Expense:
+        return Expense(
+            id=row[0],
+            date=row[1],
+            amount=row[2],
+            currency=row[3],
+            category=Category(row[4]),
+            description=row[5],
+            method=row[6],
+            tags=row[7].split(',') if row[7] else []
+        )
+
+    def get_daily_spend(self, start: str = None, end: str = None,
+                        user_id: int = DEFAULT_USER_ID) -> List[Tuple[str, str, str, float, int]]:
+        """Return (date, category, currency, amount, count) rollup rows, optionally within [start, end]"""
+        query, params = self._date_range(
+            'SELECT date, category, currency, amount, count FROM daily_spend WHERE user_id = ?', [user_id], start, end)
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute(query + ' ORDER BY date', params).fetchall()
+
+    def get_month_daily_spend(self, month: str,
+                              user_id: int = DEFAULT_USER_ID) -> List[Tuple[str, str, str, float, int]]:
+        """Rollup rows of one month (YYYY-MM), over the same half-open range as the other month queries"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('''
+                SELECT date, category, currency, amount, count FROM daily_spend
+                WHERE user_id = ? AND date >= ? AND date < ? ORDER BY date
+            ''', (user_id, *_month_range(month))).fetchall()
+
+    def update_budget(self, budget: Budget, user_id: int = DEFAULT_USER_ID):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO budgets (month, category_limits, savings_goal)
+                INSERT OR REPLACE INTO budgets (user_id, month, savings_goal)
                 VALUES (?, ?, ?)
-            ''', (budget.month, str(budget.category_limits), budget.savings_goal))
+            ''', (user_id, budget.month, budget.savings_goal))
+            # Replace the month's limits wholesale so removed categories don't linger
+            cursor.execute('DELETE FROM budget_limits WHERE user_id = ? AND month = ?', (user_id, budget.month))
+            cursor.executemany('''
+                INSERT INTO budget_limits (user_id, month, category, limit_amount)
+                VALUES (?, ?, ?, ?)
+            ''', [(user_id, budget.month, category, float(limit))
+                  for category, limit in budget.category_limits.items()])
             conn.commit()
 
-    def get_budget(self, month: str) -> Budget:
+    def get_budget(self, month: str, user_id: int = DEFAULT_USER_ID) -> Budget:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM budgets WHERE month = ?', (month,))
-            row = cursor.fetchone()
-            if row:
+            cursor.execute('''
+                SELECT b.month, b.savings_goal, l.category, l.limit_amount
+                FROM budgets b
+                LEFT JOIN budget_limits l ON l.user_id = b.user_id AND l.month = b.month
+                WHERE b.user_id = ? AND b.month = ?
+            ''', (user_id, month))
+            rows = cursor.fetchall()
+            if rows:
                 return Budget(
-                    month=row[1],
-                    category_limits=eval(row[2]),  # Safe since we control the data
-                    savings_goal=row[3]
+                    month=rows[0][0],
+                    category_limits={row[2]: row[3] for row in rows if row[2] is not None},
+                    savings_goal=rows[0][1]
                 )
             return Budget()
 
-    def update_user_prefs(self, prefs: UserPrefs):
+    def get_budget_vs_spend(self, month: str, user_id: int = DEFAULT_USER_ID) -> List[Tuple[str, float, float]]:
+        """Return (category, limit, spent) for a month's budget, joined with the daily rollup in one query"""
+        with sqlite3.connect(self.db_path) as conn:
+            return conn.execute('''
+                SELECT l.category, l.limit_amount, COALESCE(SUM(d.amount), 0)
+                FROM budget_limits l
+                LEFT JOIN daily_spend d
+                    ON d.user_id = l.user_id AND d.category = l.category
+                    AND d.date >= l.month || '-01' AND d.date < date(l.month || '-01', '+1 month')
+                WHERE l.user_id = ? AND l.month = ?
+                GROUP BY l.category, l.limit_amount
+                ORDER BY l.category
+            ''', (user_id, month)).fetchall()
+
+    def get_budget_user_ids(self, month: str) -> List[int]:
+        """Users that have category limits set for a month"""
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute('SELECT DISTINCT user_id FROM budget_limits WHERE month = ?', (month,)).fetchall()
+            return [row[0] for row in rows]
+
+    def save_forecasts(self, month: str, forecasts: List[Dict], user_id: int = DEFAULT_USER_ID):
+        with sqlite3.connect(self.db_path) as conn:
+            conn.execute('DELETE FROM forecasts WHERE user_id = ? AND month = ?', (user_id, month))
+            conn.executemany('''
+                INSERT INTO forecasts (user_id, month, category, spent, projected, limit_amount, overrun_date,
+                                       computed_at)
+                VALUES (?, ?, ?, ?, ?, ?, ?, datetime('now'))
+            ''', [(user_id, month, f['category'], f['spent'], f['projected'], f['limit'],
+                  f['projected_overrun_date']) for f in forecasts])
+            conn.commit()
+
+    def get_forecasts(self, month: str, user_id: int = DEFAULT_USER_ID) -> List[Dict]:
+        with sqlite3.connect(self.db_path) as conn:
+            rows = conn.execute('''
+                SELECT category, spent, projected, limit_amount, overrun_date, computed_at
+                FROM forecasts WHERE user_id = ? AND month = ? ORDER BY category
+            ''', (user_id, month)).fetchall()
+        return [{'category': r[0], 'spent': r[1], 'projected': r[2], 'limit': r[3],
+                 'projected_overrun_date': r[4], 'computed_at': r[5]} for r in rows]
+
+    def update_user_prefs(self, prefs: UserPrefs, user_id: int = DEFAULT_USER_ID):
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                INSERT OR REPLACE INTO user_prefs (id, currency, income, savings_goal)
-                VALUES (1, ?, ?, ?)
-            ''', (prefs.currency, prefs.income, prefs.savings_goal))
+                INSERT OR REPLACE INTO user_prefs (user_id, currency, income, savings_goal)
+                VALUES (?, ?, ?, ?)
+            ''', (user_id, prefs.currency, prefs.income, prefs.savings_goal))
             conn.commit()
 
-    def get_user_prefs(self) -> UserPrefs:
+    def get_user_prefs(self, user_id: int = DEFAULT_USER_ID) -> UserPrefs:
         with sqlite3.connect(self.db_path) as conn:
             cursor = conn.cursor()
-            cursor.execute('SELECT * FROM user_prefs WHERE id = 1')
+            cursor.execute('SELECT currency, income, savings_goal FROM user_prefs WHERE user_id = ?', (user_id,))
             row = cursor.fetchone()
             if row:
                 return UserPrefs(
-                    currency=row[1],
-                    income=row[2],
-                    savings_goal=row[3]
+                    currency=row[0],
+                    income=row[1],
+                    savings_goal=row[2]
                 )
             return UserPrefs()
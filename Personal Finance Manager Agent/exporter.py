@@ -0,0 +1,192 @@
+import csv
+import io
+import zipfile
+from typing import Dict, Iterable, Iterator, List, Tuple
+from xml.sax.saxutils import escape
+from fx import FxRates
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = pq = None
+
+# (column, type) for each export; types are 'int', 'float' or 'str'
+EXPENSE_COLUMNS = [('id', 'int'), ('date', 'str'), ('amount', 'float'), ('currency', 'str'),
+                   ('category', 'str'), ('description', 'str'), ('method', 'str'), ('tags', 'str')]
+REPORT_COLUMNS = [('month', 'str'), ('category', 'str'), ('currency', 'str'), ('amount', 'float'),
+                  ('count', 'int')]
+
+MIMETYPES = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+_XLSX_PARTS = {
+    '[Content_Types].xml':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>',
+    '_rels/.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="xl/workbook.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/officeDocument"/></Relationships>',
+    'xl/_rels/workbook.xml.rels':
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" Target="worksheets/sheet1.xml" Type="http://schemas.openxmlformats.org/'
+        'officeDocument/2006/relationships/worksheet"/></Relationships>',
+}
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only, non-seekable file object whose buffered bytes are drained after each chunk"""
+
+    def __init__(self):
+        super().__init__()
+        self._parts: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._parts)
+        self._parts.clear()
+        return data
+
+
+class Exporter:
+    """Streaming CSV / Parquet / XLSX encoders over chunked row iterators.
+
+    Every encoder consumes one chunk of rows at a time and yields the encoded
+    bytes for it, so memory use is bounded by the chunk size rather than the
+    length of the history being exported.
+    """
+
+    @staticmethod
+    def check_format(fmt: str):
+        """Raise ValueError for formats that cannot be produced here, before any response is started"""
+        if fmt not in MIMETYPES:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        if fmt == 'parquet' and pq is None:
+            raise ValueError("Parquet export requires pyarrow (pip install pyarrow)")
+
+    @staticmethod
+    def stream(fmt: str, columns: List[Tuple[str, str]], chunks: Iterable[List[Tuple]],
+               sheet_name: str = 'Export') -> Iterator[bytes]:
+        Exporter.check_format(fmt)
+        if fmt == 'csv':
+            return Exporter.to_csv(columns, chunks)
+        if fmt == 'parquet':
+            return Exporter.to_parquet(columns, chunks)
+        return Exporter.to_xlsx(columns, chunks, sheet_name)
+
+    @staticmethod
+    def monthly_report(chunks: Iterable[List[Tuple]], fx: FxRates, currency: str) -> Iterator[List[Tuple]]:
+        """Fold date-ordered daily_spend chunks into (month, category, currency, amount, count) rows.
+
+        Amounts are converted at each day's rate before summing; a month's rows
+        are emitted as soon as the first row of the next month is seen.
+        """
+        month, totals = None, {}
+        for chunk in chunks:
+            for day, category, _currency, amount, count in fx.convert_rows(chunk, currency):
+                if day[:7] != month:
+                    if totals:
+                        yield Exporter._month_rows(month, currency, totals)
+                    month, totals = day[:7], {}
+                spent, n = totals.get(category, (0.0, 0))
+                totals[category] = (spent + amount, n + count)
+        if totals:
+            yield Exporter._month_rows(month, currency, totals)
+
+    @staticmethod
+    def _month_rows(month: str, currency: str, totals: Dict[str, Tuple[float, int]]) -> List[Tuple]:
+        return [(month, category, currency, round(amount, 2), count)
+                for category, (amount, count) in sorted(totals.items())]
+
+    @staticmethod
+    def to_csv(columns: List[Tuple[str, str]], chunks: Iterable[List[Tuple]]) -> Iterator[bytes]:
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow([name for name, _ in columns])
+        for chunk in chunks:
+            writer.writerows(chunk)
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+        if buffer.tell():
+            yield buffer.getvalue().encode('utf-8')
+
+    @staticmethod
+    def to_parquet(columns: List[Tuple[str, str]], chunks: Iterable[List[Tuple]]) -> Iterator[bytes]:
+        """One Parquet row group per chunk, written as record batches"""
+        types = {'int': pa.int64(), 'float': pa.float64(), 'str': pa.string()}
+        schema = pa.schema([(name, types[kind]) for name, kind in columns])
+        sink = _ChunkSink()
+        writer = pq.ParquetWriter(sink, schema)
+        try:
+            for chunk in chunks:
+                arrays = [pa.array(values, type=field.type) for values, field in zip(zip(*chunk), schema)]
+                writer.write_batch(pa.RecordBatch.from_arrays(arrays, schema=schema))
+                yield sink.drain()
+        finally:
+            writer.close()
+        yield sink.drain()
+
+    @staticmethod
+    def to_xlsx(columns: List[Tuple[str, str]], chunks: Iterable[List[Tuple]],
+                sheet_name: str = 'Export') -> Iterator[bytes]:
+        """Minimal single-sheet workbook streamed through a non-seekable zip"""
+        sink = _ChunkSink()
+        with zipfile.ZipFile(sink, 'w', zipfile.ZIP_DEFLATED) as archive:
+            for name, xml in _XLSX_PARTS.items():
+                archive.writestr(name, xml)
+            archive.writestr(
+                'xl/workbook.xml',
+                '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+                'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+                f'<sheets><sheet name="{escape(sheet_name[:31])}" sheetId="1" r:id="rId1"/></sheets></workbook>')
+            yield sink.drain()
+
+            kinds = [kind for _, kind in columns]
+            with archive.open('xl/worksheets/sheet1.xml', 'w', force_zip64=True) as sheet:
+                sheet.write(b'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                            b'<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                            b'<sheetData>')
+                sheet.write(Exporter._xlsx_row([name for name, _ in columns], ['str'] * len(columns)))
+                for chunk in chunks:
+                    sheet.write(b''.join(Exporter._xlsx_row(row, kinds) for row in chunk))
+                    yield sink.drain()
+                sheet.write(b'</sheetData></worksheet>')
+        yield sink.drain()
+
+    @staticmethod
+    def _xlsx_row(values: Iterable, kinds: List[str]) -> bytes:
+        cells = []
+        for value, kind in zip(values, kinds):
+            if value is None:
+                cells.append('<c/>')
+            elif kind == 'str':
+                cells.append(f'<c t="inlineStr"><is><t xml:space="preserve">{escape(str(value))}</t></is></c>')
+            else:
+                cells.append(f'<c><v>{value}</v></c>')
+        return f'<row>{"".join(cells)}</row>'.encode('utf-8')
@@ -0,0 +1,152 @@
+import logging
+import threading
+import time
+from datetime import date, timedelta
+from typing import Callable, Dict, List, Optional, Tuple
+import numpy as np
+from fx import FxRates
+from storage import Storage
+
+logger = logging.getLogger(__name__)
+
+def _month_bounds(month: str) -> Tuple[date, date]:
+    start = date.fromisoformat(f"{month}-01")
+    end = (start + timedelta(days=32)).replace(day=1) - timedelta(days=1)
+    return start, end
+
+
+class Forecaster:
+    """End-of-month spend projection per category from daily rollup rows.
+
+    Weekly totals over the history window are smoothed with simple exponential
+    smoothing (closed-form weights, so every category is computed at once as a
+    matrix product). The resulting daily level is spread over the days left in
+    the month using per-category day-of-week factors.
+    """
+
+    HISTORY_DAYS = 84  # twelve whole weeks of history for weekday factors and smoothing
+
+    @staticmethod
+    def forecast_month(rows: List[Tuple], limits: Dict[str, float], month: str, today: date,
+                       alpha: float = 0.3, shrinkage: float = 2.0) -> List[Dict]:
+        """Project spend and budget-overrun dates for `month` given rollup rows up to `today`"""
+        month_start, month_end = _month_bounds(month)
+        today = min(max(today, month_start - timedelta(days=1)), month_end)
+        history_start = today - timedelta(days=Forecaster.HISTORY_DAYS - 1)
+
+        categories = sorted(set(limits) | {row[1] for row in rows})
+        if not categories:
+            return []
+        cat_index = {c: i for i, c in enumerate(categories)}
+
+        # Dense (category x day) matrix covering the history window and the month to date
+        first_day = min(history_start, month_start)
+        n_days = (today - first_day).days + 1
+        daily = np.zeros((len(categories), n_days))
+        for day, category, _currency, amount, _count in rows:
+            offset = (date.fromisoformat(day) - first_day).days
+            if 0 <= offset < n_days:
+                daily[cat_index[category], offset] += amount
+        days = [first_day + timedelta(days=k) for k in range(n_days)]
+        weekdays = np.array([d.weekday() for d in days], dtype=int)
+
+        history = daily[:, -Forecaster.HISTORY_DAYS:]
+        history_weekdays = weekdays[-Forecaster.HISTORY_DAYS:]
+        factors = Forecaster._weekday_factors(history, history_weekdays, shrinkage)
+        weekly = history.reshape(len(categories), -1, 7).sum(axis=2)
+        level = Forecaster._smoothed_level(weekly, alpha) / 7
+
+        # Spread the smoothed daily level over the remaining days of the month
+        remaining = [today + timedelta(days=k) for k in range(1, (month_end - today).days + 1)]
+        remaining_weekdays = np.array([d.weekday() for d in remaining], dtype=int)
+        projected_daily = level[:, None] * factors[:, remaining_weekdays]
+
+        in_month = np.array([d >= month_start for d in days], dtype=bool)
+        actual_month = daily[:, in_month]
+        actual_days = [d for d, keep in zip(days, in_month) if keep]
+        spent = actual_month.sum(axis=1)
+        cumulative = np.concatenate([np.cumsum(actual_month, axis=1),
+                                     spent[:, None] + np.cumsum(projected_daily, axis=1)], axis=1)
+        timeline = actual_days + remaining
+
+        results = []
+        for category, i in cat_index.items():
+            limit = limits.get(category)
+            overrun = None
+            if limit:
+                crossed = np.nonzero(cumulative[i] > limit)[0]
+                if len(crossed):
+                    overrun = timeline[crossed[0]].isoformat()
+            projected = float(cumulative[i, -1]) if cumulative.shape[1] else float(spent[i])
+            results.append({
+                'category': category,
+                'spent': round(float(spent[i]), 2),
+                'projected': round(projected, 2),
+                'limit': limit,
+                'projected_overrun_date': overrun
+            })
+        return results
+
+    @staticmethod
+    def _weekday_factors(history: np.ndarray, weekdays: np.ndarray, shrinkage: float) -> np.ndarray:
+        """Per-category weekday multipliers, shrunk towards 1 when there are few weeks of data"""
+        factors = np.ones((history.shape[0], 7))
+        overall = history.mean(axis=1)
+        for weekday in range(7):
+            mask = weekdays == weekday
+            n = mask.sum()
+            if not n:
+                continue
+            raw = np.divide(history[:, mask].mean(axis=1), overall, out=np.ones_like(overall), where=overall > 0)
+            factors[:, weekday] = (n * raw + shrinkage) / (n + shrinkage)
+        return factors
+
+    @staticmethod
+    def _smoothed_level(series: np.ndarray, alpha: float) -> np.ndarray:
+        """Final simple-exponential-smoothing level of each row, for all categories at once"""
+        n = series.shape[1]
+        weights = alpha * (1 - alpha) ** np.arange(n - 1, -1, -1)
+        return series @ weights + (1 - alpha) ** n * series[:, 0]
+
+
+class ForecastScheduler:
+    """Background thread that refreshes stored forecasts for every budget of the current month"""
+
+    def __init__(self, run: Callable[[str, date], int], interval_seconds: float = 900):
+        self.run = run
+        self.interval_seconds = interval_seconds
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._loop, name='forecast-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _loop(self):
+        while not self._stop.is_set():
+            started = time.monotonic()
+            today = date.today()
+            try:
+                count = self.run(today.strftime('%Y-%m'), today)
+                logger.info("Refreshed forecasts for %d budgets in %.2fs", count, time.monotonic() - started)
+            except Exception:
+                logger.exception("Forecast refresh failed")
+            self._stop.wait(self.interval_seconds)
+
+
+def refresh_forecasts(storage: Storage, fx: FxRates, month: str, today: date) -> int:
+    """Recompute and store forecasts for every user with a budget in `month`; returns the count"""
+    month_start, _ = _month_bounds(month)
+    history_start = min(month_start, today - timedelta(days=Forecaster.HISTORY_DAYS - 1))
+    user_ids = storage.db.get_budget_user_ids(month)
+    for user_id in user_ids:
+        user_storage = storage.for_user(user_id)
+        rows = user_storage.load_daily_spend(history_start.isoformat(), today.isoformat())
+        rows = fx.convert_rows(rows, user_storage.load_user_prefs().currency)
+        limits = {category: limit for category, limit, _spent in user_storage.load_budget_vs_spend(month)}
+        user_storage.save_forecasts(month, Forecaster.forecast_month(rows, limits, month, today))
+    return len(user_ids)
@@ -0,0 +1,115 @@
+import csv
+import logging
+import threading
+from typing import Dict, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+BASE_CURRENCY = "USD"
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_currency(code) -> str:
+    """Canonical form of a currency code: ' eur' and 'EUR' are the same currency"""
+    return str(code).strip().upper()
+
+
+class FxRates:
+    """Daily FX rate table used to normalize expenses to the user's currency.
+
+    Rates are stored as USD per unit of currency, so converting to any target
+    currency only needs the source and target rates for the day. Lookups use
+    the most recent rate on or before the expense date and are memoized per
+    (currency, date): re-aggregating in another currency after a preference
+    change reuses every rate already resolved. Codes are normalized on lookup,
+    and amounts in a currency without rates are skipped (NaN) rather than
+    failing the whole conversion.
+    """
+
+    def __init__(self, rates: Dict[str, List[Tuple[str, float]]] = None):
+        self._dates: Dict[str, np.ndarray] = {}
+        self._rates: Dict[str, np.ndarray] = {}
+        self._memo: Dict[Tuple[str, str], float] = {}
+        self._lock = threading.Lock()
+        for currency, points in (rates or {}).items():
+            points = sorted(points)
+            self._dates[currency] = np.array([d for d, _ in points], dtype='datetime64[D]')
+            self._rates[currency] = np.array([r for _, r in points], dtype=float)
+
+    @classmethod
+    def from_csv(cls, path: str) -> "FxRates":
+        """Load a date,currency,rate_to_usd CSV file"""
+        rates: Dict[str, List[Tuple[str, float]]] = {}
+        with open(path, newline='') as f:
+            for row in csv.DictReader(f):
+                rates.setdefault(row['currency'].upper(), []).append((row['date'], float(row['rate_to_usd'])))
+        return cls(rates)
+
+    @property
+    def currencies(self) -> List[str]:
+        return [BASE_CURRENCY] + sorted(self._rates)
+
+    def rates_to_usd(self, currencies: Sequence[str], dates: Sequence[str]) -> np.ndarray:
+        """USD value of one unit of each currency on each date (NaN if unknown), resolved once per unique pair"""
+        pairs = pd.DataFrame({'currency': np.asarray(currencies, dtype=object),
+                              'date': np.asarray(dates, dtype=object)})
+        codes, uniques = pd.factorize(pd.MultiIndex.from_frame(pairs))
+        unique_rates = np.empty(len(uniques))
+
+        misses: Dict[str, List[Tuple[int, str]]] = {}
+        with self._lock:
+            for i, (currency, date) in enumerate(uniques):
+                currency = normalize_currency(currency)
+                rate = 1.0 if currency == BASE_CURRENCY else self._memo.get((currency, date))
+                if rate is None:
+                    misses.setdefault(currency, []).append((i, date))
+                else:
+                    unique_rates[i] = rate
+
+        # Vectorized as-of lookup for the pairs not seen before, one searchsorted per currency
+        for currency, items in misses.items():
+            positions = np.array([i for i, _ in items])
+            if currency not in self._rates:
+                # Memoized as NaN too, so a legacy row is reported once per date rather than on every request
+                logger.warning("No FX rates for currency %r, skipping its amounts on %d dates", currency, len(items))
+                unique_rates[positions] = np.nan
+                with self._lock:
+                    self._memo.update(((currency, d), np.nan) for _, d in items)
+                continue
+            wanted = np.array([d for _, d in items], dtype='datetime64[D]')
+            idx = np.searchsorted(self._dates[currency], wanted, side='right') - 1
+            # Dates before the first rate use the earliest known rate
+            found = self._rates[currency][np.clip(idx, 0, None)]
+            unique_rates[positions] = found
+            with self._lock:
+                self._memo.update(((currency, d), r) for (_, d), r in zip(items, found))
+
+        return unique_rates[codes]
+
+    def convert(self, amounts: Sequence[float], currencies: Sequence[str], dates: Sequence[str],
+                target: str) -> np.ndarray:
+        """Convert amounts from their own currencies to `target` at each date's rate.
+
+        Amounts in currencies without rates come back as NaN; an unknown target raises ValueError.
+        """
+        target = normalize_currency(target)
+        if target not in self.currencies:
+            raise ValueError(f"No FX rates for currency: {target}")
+        amounts = np.asarray(amounts, dtype=float)
+        source = self.rates_to_usd(currencies, dates)
+        if target == BASE_CURRENCY:
+            return amounts * source
+        target_rates = self.rates_to_usd([target] * len(amounts), dates)
+        return amounts * source / target_rates
+
+    def convert_rows(self, rows: List[Tuple], target: str) -> List[Tuple]:
+        """Convert daily_spend rollup rows (date, category, currency, amount, count) to `target`,
+        dropping rows in currencies without rates"""
+        if not rows:
+            return rows
+        dates, categories, currencies, amounts, counts = zip(*rows)
+        converted = self.convert(amounts, currencies, dates, target)
+        target = normalize_currency(target)
+        return [row for row in zip(dates, categories, [target] * len(rows), converted.tolist(), counts)
+                if not np.isnan(row[3])]
@@ -23,6 +23,22 @@ class Expense:
     method: str = "cash"  # cash or card
     tags: List[str] = field(default_factory=list)
 
+# Column order of the expenses table, as returned by listings
+EXPENSE_FIELDS = ('id', 'date', 'amount', 'currency', 'category', 'description', 'method', 'tags')
+
+@dataclass(frozen=True, slots=True)
+class ExpenseRow:
+    """Lightweight listing row: raw column values, no enum lookup or tag splitting per row.
+    Columns that were not selected are None."""
+    id: int
+    date: str
+    amount: float = None
+    currency: str = None
+    category: str = None
+    description: str = None
+    method: str = None
+    tags: str = None
+
 @dataclass
 class Budget:
     month: str = ""  # YYYY-MM
@@ -10,8 +10,12 @@ class OpenAIClient:
         if not openai.api_key:
             raise ValueError("OPENAI_API_KEY environment variable not set")
 
-    def generate_tips(self, aggregates: Dict, budget_status: Dict) -> List[Dict]:
-        """Generate personalized saving tips using OpenAI"""
+    def generate_tips(self, aggregates: Dict, budget_status: Dict, fallback: bool = True) -> List[Dict]:
+        """Generate personalized saving tips using OpenAI
+
+        With fallback=False API errors are raised instead of silently returning
+        rule-based tips, so callers can avoid caching the fallback.
+        """
         prompt = self._build_prompt(aggregates, budget_status)
 
         try:
@@ -30,11 +34,14 @@ class OpenAIClient:
 
         except Exception as e:
             print(f"OpenAI API error: {e}")
+            if not fallback:
+                raise
             # Fallback to rule-based tips
             from processor import Processor
             return Processor.generate_saving_tips(aggregates, budget_status)
 
-    def _build_prompt(self, aggregates: Dict, budget_status: Dict) -> str:
+    @staticmethod
+    def _build_prompt(aggregates: Dict, budget_status: Dict) -> str:
         """Build prompt with aggregated data"""
         top_cats = ", ".join([f"{cat}: {amt:.2f}" for cat, amt in aggregates['top_categories']])
         budget_gap = budget_status.get('budget_gap', 0)
@@ -1,32 +1,166 @@
-from typing import List, Dict, Tuple
+import json
+import logging
+import os
+import threading
+import time
+from typing import List, Dict, Tuple, Iterable, Optional
 import pandas as pd
 from models import Expense, Budget, Category
 from utils import extract_keywords
+from fx import FxRates
+
+logger = logging.getLogger(__name__)
+
+# Built-in keyword rules in priority order. When a description matches keywords
+# from several categories (e.g. 'gas' is both TRANSPORT and UTILITIES) the
+# longest matching phrase wins, then the category listed first here.
+DEFAULT_RULES: List[Tuple[Category, List[str]]] = [
+    (Category.FOOD, ['food', 'restaurant', 'grocery', 'meal', 'eat', 'drink', 'coffee', 'lunch', 'dinner']),
+    (Category.TRANSPORT, ['taxi', 'bus', 'train', 'gas', 'fuel', 'uber', 'lyft', 'parking', 'travel',
+                          'gas station']),
+    (Category.ENTERTAINMENT, ['movie', 'game', 'music', 'concert', 'party', 'fun', 'hobby']),
+    (Category.UTILITIES, ['electric', 'water', 'gas', 'internet', 'phone', 'utility', 'bill',
+                          'gas bill', 'gas company']),
+    (Category.HEALTHCARE, ['doctor', 'medicine', 'pharmacy', 'health', 'hospital', 'clinic']),
+    (Category.SHOPPING, ['shop', 'buy', 'purchase', 'store', 'mall', 'clothes', 'amazon'])
+]
+
+USER_RULES_PATH = "category_rules.json"
+
+
+class KeywordIndex:
+    """Inverted index from keyword phrases to categories, compiled once.
+
+    User rules are loaded from a JSON file mapping category values to keyword
+    lists (``{"food": ["whole foods", "deli"]}``). They take precedence over
+    the built-in rules and are reloaded when the file changes on disk.
+    """
+
+    RELOAD_CHECK_SECONDS = 2.0
+
+    def __init__(self, rules: List[Tuple[Category, List[str]]] = None, user_rules_path: Optional[str] = None):
+        self.rules = rules if rules is not None else DEFAULT_RULES
+        self.user_rules_path = user_rules_path
+        self._user_rules_mtime = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self._index: Dict[str, Tuple[Tuple[int, int, int], Category]] = {}
+        self._phrase_starts: Dict[str, int] = {}
+        self.reload()
+
+    def reload(self):
+        """Rebuild the index from the built-in and user rules"""
+        user_rules = self._read_user_rules()
+        index = {}
+        phrase_starts = {}
+        tiers = [(0, user_rules), (1, self.rules)]
+        for tier, rules in tiers:
+            for order, (category, phrases) in enumerate(rules):
+                for phrase in phrases:
+                    tokens = extract_keywords(phrase)
+                    if not tokens:
+                        continue
+                    key = ' '.join(tokens)
+                    # Lower tuples win: user tier first, then longer phrases, then rule order
+                    priority = (tier, -len(tokens), order)
+                    if key not in index or priority < index[key][0]:
+                        index[key] = (priority, category)
+                    if len(tokens) > 1:
+                        phrase_starts[tokens[0]] = max(phrase_starts.get(tokens[0], 0), len(tokens))
+        # Swap in the new index in one assignment so concurrent readers never see a partial build
+        self._index, self._phrase_starts = index, phrase_starts
+
+    def _read_user_rules(self) -> List[Tuple[Category, List[str]]]:
+        if not self.user_rules_path or not os.path.exists(self.user_rules_path):
+            self._user_rules_mtime = None
+            return []
+        self._user_rules_mtime = os.path.getmtime(self.user_rules_path)
+        try:
+            with open(self.user_rules_path) as f:
+                data = json.load(f)
+            return [(Category(cat), list(phrases)) for cat, phrases in data.items()]
+        except (ValueError, OSError, AttributeError, TypeError) as e:
+            logger.warning("Ignoring invalid category rules in %s: %s", self.user_rules_path, e)
+            return []
+
+    def reload_if_changed(self):
+        """Reload user rules if the rules file was modified (checked at most every few seconds)"""
+        now = time.monotonic()
+        if now - self._last_check < self.RELOAD_CHECK_SECONDS:
+            return
+        self._last_check = now
+        if not self.user_rules_path:
+            return
+        mtime = os.path.getmtime(self.user_rules_path) if os.path.exists(self.user_rules_path) else None
+        if mtime != self._user_rules_mtime:
+            with self._lock:
+                self.reload()
+
+    def lookup(self, description: str) -> Category:
+        """Return the best matching category for a description"""
+        index, phrase_starts = self._index, self._phrase_starts
+        tokens = extract_keywords(description)
+        best = None
+        for i, token in enumerate(tokens):
+            hit = index.get(token)
+            if hit and (best is None or hit[0] < best[0]):
+                best = hit
+            # Only tokens that open a multi-word phrase pay for n-gram joins
+            max_len = phrase_starts.get(token)
+            if max_len:
+                for n in range(2, min(max_len, len(tokens) - i) + 1):
+                    hit = index.get(' '.join(tokens[i:i + n]))
+                    if hit and (best is None or hit[0] < best[0]):
+                        best = hit
+        return best[1] if best else Category.UNCATEGORIZED
+
+    def lookup_many(self, descriptions: Iterable[str]) -> List[Category]:
+        """Categorize a batch of descriptions, resolving repeated descriptions once"""
+        seen: Dict[str, Category] = {}
+        results = []
+        for desc in descriptions:
+            category = seen.get(desc)
+            if category is None:
+                category = seen[desc] = self.lookup(desc)
+            results.append(category)
+        return results
+
+
+_keyword_index = KeywordIndex(user_rules_path=USER_RULES_PATH)
+
 
 class Processor:
     @staticmethod
     def categorize_expense(description: str) -> Category:
         """Rule-based categorization based on keywords"""
-        keywords = extract_keywords(description)
-        rules = {
-            Category.FOOD: ['food', 'restaurant', 'grocery', 'meal', 'eat', 'drink', 'coffee', 'lunch', 'dinner'],
-            Category.TRANSPORT: ['taxi', 'bus', 'train', 'gas', 'fuel', 'uber', 'lyft', 'parking', 'travel'],
-            Category.ENTERTAINMENT: ['movie', 'game', 'music', 'concert', 'party', 'fun', 'hobby'],
-            Category.UTILITIES: ['electric', 'water', 'gas', 'internet', 'phone', 'utility', 'bill'],
-            Category.HEALTHCARE: ['doctor', 'medicine', 'pharmacy', 'health', 'hospital', 'clinic'],
-            Category.SHOPPING: ['shop', 'buy', 'purchase', 'store', 'mall', 'clothes', 'amazon']
-        }
-        for category, cats in rules.items():
-            if any(kw in keywords for kw in cats):
-                return category
-        return Category.UNCATEGORIZED
+        _keyword_index.reload_if_changed()
+        return _keyword_index.lookup(description)
 
     @staticmethod
-    def aggregate_expenses(expenses: List[Expense], month: str) -> Dict:
-        """Aggregate expenses by category and calculate totals"""
+    def categorize_many(descriptions: Iterable[str]) -> List[Category]:
+        """Rule-based categorization for bulk imports"""
+        _keyword_index.reload_if_changed()
+        return _keyword_index.lookup_many(descriptions)
+
+    @staticmethod
+    def reload_rules(user_rules_path: str = None):
+        """Force a rebuild of the keyword index, optionally from a new user rules file"""
+        if user_rules_path is not None:
+            _keyword_index.user_rules_path = user_rules_path
+        _keyword_index.reload()
+
+    @staticmethod
+    def aggregate_expenses(expenses: List[Expense], month: str, target_currency: str = None,
+                           fx: FxRates = None) -> Dict:
+        """Aggregate expenses by category and calculate totals
+
+        With target_currency and fx set, amounts are converted to target_currency
+        at each expense date's rate before summing.
+        """
         df = pd.DataFrame([{
             'date': e.date,
             'amount': e.amount,
+            'currency': e.currency,
             'category': e.category.value,
             'description': e.description
         } for e in expenses])
@@ -44,6 +178,12 @@ class Processor:
             df['month'] = pd.to_datetime(df['date']).dt.strftime('%Y-%m')
             df = df[df['month'] == month]
 
+        if target_currency and fx is not None and not df.empty:
+            df['amount'] = fx.convert(df['amount'].values, df['currency'].values, df['date'].values,
+                                      target_currency)
+            # Expenses in currencies without rates are left out rather than failing the aggregate
+            df = df[df['amount'].notna()]
+
         total = df['amount'].sum()
         by_category = df.groupby('category')['amount'].sum().to_dict()
         top_categories = sorted(by_category.items(), key=lambda x: x[1], reverse=True)[:3]
@@ -60,13 +200,15 @@ class Processor:
             'total': total,
             'by_category': by_category,
             'top_categories': top_categories,
-            'trend': trend
+            'trend': trend,
+            'currency': target_currency
         }
 
     @staticmethod
-    def calculate_budget_status(expenses: List[Expense], budget: Budget) -> Dict:
+    def calculate_budget_status(expenses: List[Expense], budget: Budget, target_currency: str = None,
+                                fx: FxRates = None) -> Dict:
         """Calculate budget usage and suggestions"""
-        aggregates = Processor.aggregate_expenses(expenses, budget.month)
+        aggregates = Processor.aggregate_expenses(expenses, budget.month, target_currency, fx)
         status = {}
 
         for cat, limit in budget.category_limits.items():
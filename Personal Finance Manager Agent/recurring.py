@@ -0,0 +1,163 @@
+import threading
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Callable, Dict, Iterable, List, Tuple
+import numpy as np
+from models import Expense
+from categorizer import normalize_merchant
+
+# Cadence name -> (expected interval in days, allowed deviation in days)
+CADENCES: Dict[str, Tuple[float, float]] = {
+    'weekly': (7, 1.5),
+    'biweekly': (14, 2),
+    'monthly': (30.44, 4),
+    'quarterly': (91.3, 7),
+    'annual': (365.25, 10),
+}
+
+
+class RecurringDetector:
+    """Find subscriptions and other recurring charges in a user's expense history.
+
+    Expenses are bucketed by normalized merchant. Within a bucket, charges are
+    sorted by amount and split wherever the next amount is outside the
+    tolerance (so a $9.99 plan and a $99 annual plan from the same merchant
+    stay separate). Each amount cluster is then sorted by date and its
+    intervals are checked against the known cadences. This is O(n log n) per
+    merchant, with no pairwise comparison. Only merchants touched by new
+    expenses are re-analysed on update.
+    """
+
+    def __init__(self, amount_tolerance: float = 0.1, min_occurrences: int = 3, min_match_ratio: float = 0.75):
+        self.amount_tolerance = amount_tolerance
+        self.min_occurrences = min_occurrences
+        self.min_match_ratio = min_match_ratio
+        self.last_expense_id = 0
+        self._charges: Dict[str, List[Tuple[str, float, str, str, str]]] = {}
+        self._results: Dict[str, List[Dict]] = {}
+
+    def update(self, expenses: Iterable[Expense]):
+        """Fold in new expenses and re-analyse only the merchants they touch"""
+        dirty = set()
+        for e in expenses:
+            merchant = normalize_merchant(e.description)
+            if not merchant:
+                continue
+            self._charges.setdefault(merchant, []).append(
+                (e.date, float(e.amount), e.currency, e.description, e.category.value))
+            dirty.add(merchant)
+            if e.id is not None:
+                self.last_expense_id = max(self.last_expense_id, e.id)
+        for merchant in dirty:
+            self._results[merchant] = self._analyse(merchant, self._charges[merchant])
+
+    def _amount_clusters(self, charges: List[Tuple]) -> List[List[Tuple]]:
+        ordered = sorted(charges, key=lambda c: (c[2], c[1]))
+        clusters = [[ordered[0]]]
+        for charge in ordered[1:]:
+            anchor = clusters[-1][0]
+            if charge[2] == anchor[2] and abs(charge[1] - anchor[1]) <= self.amount_tolerance * anchor[1]:
+                clusters[-1].append(charge)
+            else:
+                clusters.append([charge])
+        return clusters
+
+    def _analyse(self, merchant: str, charges: List[Tuple]) -> List[Dict]:
+        found = []
+        for cluster in self._amount_clusters(charges):
+            if len(cluster) < self.min_occurrences:
+                continue
+            cluster.sort()
+            dates = np.array([c[0] for c in cluster], dtype='datetime64[D]')
+            intervals = np.diff(dates).astype(float)
+            intervals = intervals[intervals > 0]  # same-day duplicates are not a cadence
+            if len(intervals) < self.min_occurrences - 1:
+                continue
+            median = float(np.median(intervals))
+            for cadence, (expected, deviation) in CADENCES.items():
+                if abs(median - expected) > deviation:
+                    continue
+                if np.mean(np.abs(intervals - expected) <= deviation) < self.min_match_ratio:
+                    continue
+                last = cluster[-1]
+                amounts = np.array([c[1] for c in cluster])
+                found.append({
+                    'merchant': merchant,
+                    'description': last[3],
+                    'category': last[4],
+                    'cadence': cadence,
+                    'interval_days': round(median, 1),
+                    'amount': round(float(np.median(amounts)), 2),
+                    'currency': last[2],
+                    'occurrences': len(cluster),
+                    'first_date': cluster[0][0],
+                    'last_date': last[0],
+                    'next_date': (date.fromisoformat(last[0]) + timedelta(days=round(median))).isoformat()
+                })
+                break
+        return found
+
+    def subscriptions(self) -> List[Dict]:
+        """All detected recurring charges, most expensive first"""
+        items = [item for results in self._results.values() for item in results]
+        return sorted(items, key=lambda item: item['amount'], reverse=True)
+
+    def project(self, month: str) -> List[Dict]:
+        """Expected charges for a month (YYYY-MM), stepping each cadence forward from its last charge"""
+        start = date.fromisoformat(f"{month}-01")
+        end = (start + timedelta(days=32)).replace(day=1)
+        projected = []
+        for item in self.subscriptions():
+            # Charges that missed two cycles before the month are treated as cancelled
+            if (start - date.fromisoformat(item['last_date'])).days > 2 * item['interval_days'] + 7:
+                continue
+            step = timedelta(days=round(item['interval_days']))
+            due = date.fromisoformat(item['next_date'])
+            while due < start:
+                due += step
+            charges = 0
+            while due < end:
+                charges += 1
+                due += step
+            if charges:
+                projected.append(dict(item, projected_charges=charges,
+                                      projected_amount=round(item['amount'] * charges, 2)))
+        return projected
+
+
+class RecurringCache:
+    """Per-user detectors kept warm in an LRU and updated incrementally from new expense ids"""
+
+    def __init__(self, max_size: int = 256):
+        self.max_size = max_size
+        self._detectors: "OrderedDict[int, Tuple[RecurringDetector, threading.Lock]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _entry(self, user_id: int) -> Tuple[RecurringDetector, threading.Lock]:
+        # The cache-wide lock only guards the LRU; loading and analysis hold the user's own lock
+        with self._lock:
+            entry = self._detectors.get(user_id)
+            if entry is None:
+                entry = self._detectors[user_id] = (RecurringDetector(), threading.Lock())
+            self._detectors.move_to_end(user_id)
+            while len(self._detectors) > self.max_size:
+                self._detectors.popitem(last=False)
+        return entry
+
+    def get(self, user_id: int, load_since: Callable[[int], List[Expense]]) -> RecurringDetector:
+        """Return the user's detector after folding in expenses newer than it has seen.
+
+        Another request may update the detector once this returns; use `report()` to read results.
+        """
+        detector, lock = self._entry(user_id)
+        with lock:
+            detector.update(load_since(detector.last_expense_id))
+        return detector
+
+    def report(self, user_id: int, load_since: Callable[[int], List[Expense]],
+               month: str) -> Tuple[List[Dict], List[Dict]]:
+        """Up-to-date (subscriptions, projection for `month`), both read under the user's lock"""
+        detector, lock = self._entry(user_id)
+        with lock:
+            detector.update(load_since(detector.last_expense_id))
+            return detector.subscriptions(), detector.project(month)
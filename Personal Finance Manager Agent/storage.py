@@ -1,25 +1,71 @@
-from typing import List
-from models import Expense, Budget, UserPrefs
-from db import Database
+from typing import Dict, Iterable, Iterator, List, Tuple
+from models import Expense, ExpenseRow, Budget, UserPrefs
+from db import Database, DEFAULT_USER_ID
 
 class Storage:
-    def __init__(self, db: Database):
+    """Tenant-scoped storage: every call reads and writes only this user's rows"""
+
+    def __init__(self, db: Database, user_id: int = DEFAULT_USER_ID):
         self.db = db
+        self.user_id = user_id
+
+    def for_user(self, user_id: int) -> 'Storage':
+        """Return a storage view bound to another tenant (shares the database)"""
+        return Storage(self.db, user_id)
 
-    def save_expense(self, expense: Expense) -> int:
-        return self.db.insert_expense(expense)
+    def save_expense(self, expense: Expense, labelled: bool = False) -> int:
+        return self.db.insert_expense(expense, self.user_id, labelled)
+
+    def save_expenses(self, expenses: Iterable[Expense]) -> int:
+        return self.db.insert_expenses(expenses, self.user_id)
 
     def load_expenses(self, month: str = None) -> List[Expense]:
-        return self.db.get_expenses(month)
+        return self.db.get_expenses(month, self.user_id)
+
+    def load_labelled_expenses(self) -> List[Expense]:
+        return self.db.get_labelled_expenses(self.user_id)
+
+    def load_expenses_since(self, last_id: int) -> List[Expense]:
+        return self.db.get_expenses_since(last_id, self.user_id)
+
+    def list_expense_rows(self, fields: List[str] = None, after: Tuple[str, int] = None, descending: bool = True,
+                          start: str = None, end: str = None, category: str = None,
+                          limit: int = 50) -> List[ExpenseRow]:
+        return self.db.list_expense_rows(fields, after, descending, start, end, category, limit, self.user_id)
+
+    def search_expenses(self, text: str, category: str = None, start: str = None, end: str = None,
+                        limit: int = 50, offset: int = 0) -> List[Expense]:
+        return self.db.search_expenses(text, category, start, end, limit, offset, self.user_id)
+
+    def iter_expense_rows(self, start: str = None, end: str = None) -> Iterator[List[Tuple]]:
+        return self.db.iter_expense_rows(start, end, self.user_id)
+
+    def iter_daily_spend(self, start: str = None, end: str = None) -> Iterator[List[Tuple]]:
+        return self.db.iter_daily_spend(start, end, self.user_id)
+
+    def load_daily_spend(self, start: str = None, end: str = None) -> List[Tuple[str, str, str, float, int]]:
+        return self.db.get_daily_spend(start, end, self.user_id)
+
+    def load_month_daily_spend(self, month: str) -> List[Tuple[str, str, str, float, int]]:
+        return self.db.get_month_daily_spend(month, self.user_id)
 
     def save_budget(self, budget: Budget):
-        self.db.update_budget(budget)
+        self.db.update_budget(budget, self.user_id)
 
     def load_budget(self, month: str) -> Budget:
-        return self.db.get_budget(month)
+        return self.db.get_budget(month, self.user_id)
+
+    def load_budget_vs_spend(self, month: str) -> List[Tuple[str, float, float]]:
+        return self.db.get_budget_vs_spend(month, self.user_id)
+
+    def save_forecasts(self, month: str, forecasts: List[Dict]):
+        self.db.save_forecasts(month, forecasts, self.user_id)
+
+    def load_forecasts(self, month: str) -> List[Dict]:
+        return self.db.get_forecasts(month, self.user_id)
 
     def save_user_prefs(self, prefs: UserPrefs):
-        self.db.update_user_prefs(prefs)
+        self.db.update_user_prefs(prefs, self.user_id)
 
     def load_user_prefs(self) -> UserPrefs:
-        return self.db.get_user_prefs()
+        return self.db.get_user_prefs(self.user_id)
@@ -0,0 +1,150 @@
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from typing import Dict, List
+import numpy as np
+from models import Expense, Budget, Category
+from processor import DEFAULT_RULES
+from storage import Storage
+
+# Median amount (USD) and log-normal spread of a single expense in each category
+AMOUNT_PROFILES: Dict[Category, tuple] = {
+    Category.FOOD: (15.0, 0.6),
+    Category.TRANSPORT: (20.0, 0.7),
+    Category.ENTERTAINMENT: (35.0, 0.8),
+    Category.UTILITIES: (75.0, 0.3),
+    Category.HEALTHCARE: (50.0, 0.9),
+    Category.SHOPPING: (45.0, 1.0),
+    Category.OTHER: (25.0, 1.0),
+}
+
+# Monthly subscriptions every synthetic user has: (description, category, amount)
+SUBSCRIPTIONS = [
+    ("Streaming music subscription", Category.ENTERTAINMENT, 9.99),
+    ("Internet provider monthly bill", Category.UTILITIES, 59.0),
+    ("Gym membership", Category.OTHER, 35.0),
+]
+
+_SYLLABLES = ['ka', 'lo', 'mi', 'ra', 'zen', 'tor', 'vi', 'bel', 'no', 'sa', 'ter', 'qu', 'den', 'fa', 'ly']
+
+
+@dataclass
+class SyntheticConfig:
+    users: int = 1
+    years: float = 1.0
+    expenses_per_day: float = 3.0
+    categories: List[Category] = field(default_factory=lambda: list(AMOUNT_PROFILES))
+    merchants_per_category: int = 25
+    # Share of expenses whose description no keyword rule matches (exercises the learned categorizer)
+    unmatched_ratio: float = 0.1
+    # Currency -> probability; amounts are kept in USD terms, so only the currency label changes
+    currencies: Dict[str, float] = field(default_factory=lambda: {'USD': 1.0})
+    end: date = date(2023, 12, 31)
+    seed: int = 42
+
+
+class SyntheticData:
+    """Deterministic, vectorized generator of realistic-looking expense histories.
+
+    Merchant names are built from the keyword rules, so rule-based
+    categorization behaves as it would on real data. Merchant popularity is
+    skewed, amounts are log-normal per category, and every user also gets a
+    few monthly subscriptions.
+    """
+
+    def __init__(self, config: SyntheticConfig = None):
+        self.config = config or SyntheticConfig()
+        self.merchants = self._merchants(np.random.default_rng(self.config.seed))
+
+    def _merchants(self, rng: np.random.Generator) -> Dict[Category, List[str]]:
+        # Only keywords owned by a single category, so the rules label each merchant unambiguously
+        owners = {}
+        for category, words in DEFAULT_RULES:
+            for word in words:
+                owners.setdefault(word, set()).add(category)
+        keywords = {}
+        for category, words in DEFAULT_RULES:
+            keywords.setdefault(category, []).extend(w for w in words if len(owners[w]) == 1)
+        merchants = {}
+        for category in self.config.categories:
+            names = []
+            for _ in range(self.config.merchants_per_category):
+                brand = ''.join(rng.choice(_SYLLABLES, size=int(rng.integers(2, 4)))).title()
+                words = keywords.get(category)
+                names.append(f"{brand} {rng.choice(words)}" if words else f"{brand} services")
+            merchants[category] = names
+        return merchants
+
+    @property
+    def start(self) -> date:
+        return self.config.end - timedelta(days=int(self.config.years * 365) - 1)
+
+    def expenses(self, user_id: int = 1) -> List[Expense]:
+        """All expenses for one user, in date order"""
+        config = self.config
+        rng = np.random.default_rng((config.seed, user_id))
+        n_days = (config.end - self.start).days + 1
+        counts = rng.poisson(config.expenses_per_day, n_days)
+        day_offsets = np.repeat(np.arange(n_days), counts)
+        total = len(day_offsets)
+
+        categories = config.categories
+        category_idx = rng.integers(0, len(categories), total)
+        # Squaring a uniform draw skews visits towards each category's first merchants
+        merchant_idx = (rng.random(total) ** 2 * config.merchants_per_category).astype(int)
+        unmatched = rng.random(total) < config.unmatched_ratio
+        store_numbers = rng.integers(1, 999, total)
+        medians = np.array([AMOUNT_PROFILES.get(c, (25.0, 1.0))[0] for c in categories])
+        spreads = np.array([AMOUNT_PROFILES.get(c, (25.0, 1.0))[1] for c in categories])
+        log_amounts = np.log(medians[category_idx]) + spreads[category_idx] * rng.standard_normal(total)
+        amounts = np.round(np.exp(log_amounts), 2)
+        currency_codes = list(config.currencies)
+        currencies = rng.choice(currency_codes, total, p=np.array(list(config.currencies.values())) /
+                                sum(config.currencies.values()))
+        methods = np.where(rng.random(total) < 0.7, 'card', 'cash')
+
+        expenses = []
+        for i in range(total):
+            category = categories[category_idx[i]]
+            merchant = self.merchants[category][merchant_idx[i]]
+            description = f"POS {store_numbers[i]:03d}" if unmatched[i] else f"{merchant} #{store_numbers[i]}"
+            expenses.append(Expense(
+                date=(self.start + timedelta(days=int(day_offsets[i]))).isoformat(),
+                amount=float(amounts[i]),
+                currency=str(currencies[i]),
+                category=category,
+                description=description,
+                method=str(methods[i]),
+                tags=['synthetic']
+            ))
+
+        billing_day = int(rng.integers(1, 29))
+        month = self.start.replace(day=1)
+        while month <= config.end:
+            charge_date = month.replace(day=billing_day)
+            if self.start <= charge_date <= config.end:
+                expenses.extend(Expense(date=charge_date.isoformat(), amount=amount, category=category,
+                                        description=description, method='card', tags=['subscription'])
+                                for description, category, amount in SUBSCRIPTIONS if category in categories)
+            month = (month + timedelta(days=32)).replace(day=1)
+        expenses.sort(key=lambda e: e.date)
+        return expenses
+
+    def budget(self, month: str, headroom: float = 1.1) -> Budget:
+        """Monthly budget near the expected spend for each category"""
+        per_month = self.config.expenses_per_day * 30.44 / len(self.config.categories)
+        limits = {}
+        for category in self.config.categories:
+            median, spread = AMOUNT_PROFILES.get(category, (25.0, 1.0))
+            expected = per_month * median * np.exp(spread ** 2 / 2)  # log-normal mean
+            limits[category.value] = round(float(expected * headroom), 2)
+        return Budget(month=month, category_limits=limits, savings_goal=500.0)
+
+    def load(self, storage: Storage) -> int:
+        """Bulk insert every user's history plus a budget for the final month; returns rows inserted"""
+        inserted = 0
+        last_month = self.config.end.strftime('%Y-%m')
+        for user_id in range(1, self.config.users + 1):
+            user_storage = storage.for_user(user_id)
+            inserted += user_storage.save_expenses(self.expenses(user_id))
+            user_storage.save_budget(self.budget(last_month))
+        return inserted
@@ -0,0 +1,49 @@
+from models import Expense, Category
+from categorizer import LocalCategorizer, CategorizerPool, normalize_merchant
+
+def make_categorizer(tmp_path):
+    return LocalCategorizer.for_database(str(tmp_path / "finance.db"))
+
+def test_normalize_merchant():
+    assert normalize_merchant("STARBUCKS #1234") == "starbucks"
+    assert normalize_merchant("  Joe's  Diner 42 ") == "joe s diner"
+
+def test_merchant_cache_overrides_rules(tmp_path):
+    categorizer = make_categorizer(tmp_path)
+    categorizer.learn("Game Stop 017", Category.SHOPPING)
+    assert categorizer.categorize("Game Stop 020") == Category.SHOPPING
+    # Unlabelled descriptions still use the keyword rules
+    assert categorizer.categorize("Board game night") == Category.ENTERTAINMENT
+
+def test_learned_model_predicts_unseen_merchants(tmp_path):
+    categorizer = make_categorizer(tmp_path)
+    categorizer.fit([
+        Expense(description="Starbucks downtown", category=Category.FOOD),
+        Expense(description="Starbucks airport", category=Category.FOOD),
+        Expense(description="Chipotle", category=Category.FOOD),
+        Expense(description="Shell station", category=Category.TRANSPORT),
+        Expense(description="Chevron station", category=Category.TRANSPORT),
+    ])
+    assert categorizer.categorize("Starbucks reserve roastery") == Category.FOOD
+    assert categorizer.categorize("Exxon station") == Category.TRANSPORT
+
+def test_model_persists_next_to_database(tmp_path):
+    categorizer = make_categorizer(tmp_path)
+    categorizer.learn("Netflix subscription", Category.ENTERTAINMENT)
+    # Labels are batched: nothing is written until a flush
+    assert not (tmp_path / "finance_categorizer.npz").exists()
+    categorizer.flush()
+    assert (tmp_path / "finance_categorizer.npz").exists()
+    assert not categorizer.dirty
+
+    reloaded = make_categorizer(tmp_path)
+    assert reloaded.trained
+    assert reloaded.categorize("Netflix subscription") == Category.ENTERTAINMENT
+
+def test_pool_flushes_evicted_categorizers(tmp_path):
+    pool = CategorizerPool(str(tmp_path / "finance.db"), max_size=1)
+    pool.get(1).learn("Netflix subscription", Category.ENTERTAINMENT)
+    assert not (tmp_path / "finance_categorizer.npz").exists()
+    pool.get(2)
+    assert (tmp_path / "finance_categorizer.npz").exists()
+    assert LocalCategorizer.for_database(str(tmp_path / "finance.db")).trained
@@ -0,0 +1,61 @@
+import csv
+import io
+import zipfile
+import pytest
+from db import Database
+from storage import Storage
+from fx import FxRates
+from exporter import Exporter, EXPENSE_COLUMNS, REPORT_COLUMNS
+from models import Expense, Category
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    for day, amount, currency, category in [("2023-09-30", 10, "USD", Category.FOOD),
+                                            ("2023-10-01", 20, "EUR", Category.FOOD),
+                                            ("2023-10-02", 5, "USD", Category.TRANSPORT),
+                                            ("2023-10-03", 7.5, "USD", Category.FOOD)]:
+        storage.save_expense(Expense(date=day, amount=amount, currency=currency, category=category,
+                                     description=f"Lunch, \"{day}\" <cafe>"))
+    return storage
+
+def test_expense_rows_are_streamed_in_chunks(storage):
+    chunks = list(storage.db.iter_expense_rows(user_id=1, chunk_size=3))
+    assert [len(c) for c in chunks] == [3, 1]
+    assert [row[1] for chunk in chunks for row in chunk] == ["2023-09-30", "2023-10-01", "2023-10-02", "2023-10-03"]
+    assert list(storage.db.iter_expense_rows(start="2023-10-02", user_id=1))[0][0][1] == "2023-10-02"
+
+def test_csv_export_round_trips(storage):
+    data = b''.join(Exporter.stream('csv', EXPENSE_COLUMNS, storage.db.iter_expense_rows(user_id=1, chunk_size=2)))
+    rows = list(csv.DictReader(io.StringIO(data.decode('utf-8'))))
+    assert len(rows) == 4
+    assert rows[1]['currency'] == "EUR"
+    assert rows[1]['description'] == 'Lunch, "2023-10-01" <cafe>'
+
+def test_monthly_report_converts_before_summing(storage):
+    fx = FxRates({'EUR': [('2023-01-01', 1.5)]})
+    rows = [row for chunk in Exporter.monthly_report(storage.iter_daily_spend(), fx, "USD") for row in chunk]
+    assert rows == [("2023-09", "food", "USD", 10.0, 1),
+                    ("2023-10", "food", "USD", 37.5, 2),
+                    ("2023-10", "transport", "USD", 5.0, 1)]
+    assert [name for name, _ in REPORT_COLUMNS] == ["month", "category", "currency", "amount", "count"]
+
+def test_xlsx_export_is_a_valid_workbook(storage):
+    data = b''.join(Exporter.stream('xlsx', EXPENSE_COLUMNS, storage.iter_expense_rows(), 'Expenses'))
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        assert archive.testzip() is None
+        sheet = archive.read('xl/worksheets/sheet1.xml').decode('utf-8')
+    assert sheet.count('<row>') == 5
+    assert '&lt;cafe&gt;' in sheet
+    assert '<c><v>7.5</v></c>' in sheet
+
+def test_parquet_export_writes_a_row_group_per_chunk(storage):
+    pq = pytest.importorskip("pyarrow.parquet")
+    data = b''.join(Exporter.stream('parquet', EXPENSE_COLUMNS, storage.db.iter_expense_rows(user_id=1, chunk_size=3)))
+    parquet = pq.ParquetFile(io.BytesIO(data))
+    assert parquet.metadata.num_row_groups == 2
+    assert parquet.read().column('amount').to_pylist() == [10.0, 20.0, 5.0, 7.5]
+
+def test_unknown_format_is_rejected():
+    with pytest.raises(ValueError):
+        Exporter.check_format('xls')
@@ -0,0 +1,46 @@
+from datetime import date, timedelta
+from db import Database
+from storage import Storage
+from fx import FxRates
+from forecast import Forecaster, refresh_forecasts
+from models import Expense, Budget, UserPrefs, Category
+
+def daily_rows(start, days, category, amount):
+    first = date.fromisoformat(start)
+    return [((first + timedelta(days=k)).isoformat(), category, "USD", amount, 1) for k in range(days)]
+
+def test_flat_spend_projects_to_month_total_and_overrun_date():
+    rows = daily_rows("2023-07-24", 84, "food", 10.0)  # through 2023-10-15
+    result = Forecaster.forecast_month(rows, {"food": 250.0, "travel": 100.0}, "2023-10", date(2023, 10, 15))
+    by_category = {r['category']: r for r in result}
+
+    food = by_category["food"]
+    assert food['spent'] == 150.0
+    assert food['projected'] == 310.0
+    assert food['projected_overrun_date'] == "2023-10-26"
+    # A budgeted category with no spend is reported but never overruns
+    assert by_category["travel"]['projected'] == 0.0
+    assert by_category["travel"]['projected_overrun_date'] is None
+
+def test_weekday_pattern_is_carried_into_projection():
+    rows = [r for r in daily_rows("2023-07-24", 84, "entertainment", 70.0)
+            if date.fromisoformat(r[0]).weekday() == 5]  # Saturdays only
+    result = Forecaster.forecast_month(rows, {}, "2023-10", date(2023, 10, 15))
+    # Two Saturdays so far plus two left (21st and 28th), shrinkage pulls slightly towards the mean
+    assert result[0]['spent'] == 140.0
+    assert 240.0 < result[0]['projected'] < 290.0
+
+def test_refresh_stores_forecasts_per_tenant(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    today = date.today()
+    month = today.strftime('%Y-%m')
+    bob = storage.for_user(2)
+    bob.save_expense(Expense(date=today.isoformat(), amount=40, category=Category.FOOD))
+    bob.save_budget(Budget(month=month, category_limits={"food": 30}, savings_goal=0))
+    bob.save_user_prefs(UserPrefs(currency="USD"))
+
+    assert refresh_forecasts(storage, FxRates(), month, today) == 1
+    stored = bob.load_forecasts(month)
+    assert [(f['category'], f['spent'], f['projected_overrun_date']) for f in stored] == \
+        [("food", 40.0, today.isoformat())]
+    assert storage.for_user(1).load_forecasts(month) == []
@@ -0,0 +1,47 @@
+import numpy as np
+import pytest
+from fx import FxRates
+from models import Expense, Category
+from processor import Processor
+
+RATES = FxRates({
+    'EUR': [('2023-10-01', 1.10), ('2023-10-15', 1.20)],
+    'GBP': [('2023-10-01', 1.25)],
+})
+
+def test_as_of_lookup_and_conversion():
+    converted = RATES.convert([100, 100, 100], ['EUR', 'EUR', 'USD'],
+                              ['2023-10-10', '2023-10-20', '2023-10-10'], 'USD')
+    assert converted.tolist() == pytest.approx([110.0, 120.0, 100.0])
+    to_gbp = RATES.convert([125], ['USD'], ['2023-10-10'], 'GBP')
+    assert to_gbp.tolist() == pytest.approx([100.0])
+
+def test_rates_are_memoized_per_currency_and_date():
+    rates = FxRates({'EUR': [('2023-10-01', 1.10)]})
+    rates.convert([1, 2], ['EUR', 'EUR'], ['2023-10-05', '2023-10-05'], 'USD')
+    assert rates._memo == {('EUR', '2023-10-05'): 1.10}
+    # A different target currency reuses the memoized source rate
+    rates._rates['EUR'] = None
+    rates.convert([1], ['USD'], ['2023-10-05'], 'EUR')
+
+def test_codes_are_normalized_and_unknown_currencies_skipped(caplog):
+    converted = RATES.convert([100, 1, 100], [' eur', 'XYZ', 'usd'], ['2023-10-10'] * 3, 'gbp')
+    assert converted[[0, 2]].tolist() == pytest.approx([88.0, 80.0])
+    assert np.isnan(converted[1])
+    assert "XYZ" in caplog.text
+    rows = RATES.convert_rows([('2023-10-10', 'food', 'XYZ', 5.0, 1), ('2023-10-10', 'food', 'eur', 10.0, 1)], 'USD')
+    assert rows == [('2023-10-10', 'food', 'USD', pytest.approx(11.0), 1)]
+    # Only the target has nothing to fall back to
+    with pytest.raises(ValueError):
+        RATES.convert([1], ['USD'], ['2023-10-01'], 'XYZ')
+
+def test_aggregate_expenses_normalizes_currency():
+    expenses = [
+        Expense(date="2023-10-02", amount=100, currency="EUR", category=Category.FOOD),
+        Expense(date="2023-10-03", amount=50, currency="USD", category=Category.FOOD),
+        Expense(date="2023-10-04", amount=80, currency="GBP", category=Category.TRANSPORT),
+    ]
+    result = Processor.aggregate_expenses(expenses, "2023-10", "USD", RATES)
+    assert result['total'] == pytest.approx(260.0)
+    assert result['by_category']['food'] == pytest.approx(160.0)
+    assert result['currency'] == "USD"
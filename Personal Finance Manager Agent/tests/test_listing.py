@@ -0,0 +1,38 @@
+import pytest
+from db import Database
+from storage import Storage
+from models import Expense, ExpenseRow, Category
+from utils import encode_cursor, decode_cursor
+
+@pytest.fixture
+def storage(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    for day in ["2023-10-02", "2023-10-01", "2023-10-02", "2023-10-03", "2023-10-01"]:
+        storage.save_expense(Expense(date=day, amount=5, category=Category.FOOD, description="Lunch", tags=["work"]))
+    storage.for_user(2).save_expense(Expense(date="2023-10-02", amount=9, description="Other tenant"))
+    return storage
+
+def test_keyset_pages_cover_every_row_once(storage):
+    seen, after = [], None
+    while True:
+        page = storage.list_expense_rows(after=after, limit=2)
+        seen.extend((row.date, row.id) for row in page)
+        if len(page) < 2:
+            break
+        after = (page[-1].date, page[-1].id)
+    assert seen == [("2023-10-03", 4), ("2023-10-02", 3), ("2023-10-02", 1), ("2023-10-01", 5), ("2023-10-01", 2)]
+
+    ascending = storage.list_expense_rows(after=("2023-10-01", 5), descending=False, limit=10)
+    assert [row.id for row in ascending] == [1, 3, 4]
+
+def test_field_selection_returns_lightweight_rows(storage):
+    row = storage.list_expense_rows(fields=["amount"], limit=1)[0]
+    assert row == ExpenseRow(id=4, date="2023-10-03", amount=5.0)
+    assert not hasattr(row, '__dict__')
+    with pytest.raises(ValueError):
+        storage.list_expense_rows(fields=["amount", "user_id"])
+
+def test_cursor_tokens_round_trip():
+    assert decode_cursor(encode_cursor("2023-10-02", 17)) == ("2023-10-02", 17)
+    with pytest.raises(ValueError):
+        decode_cursor("not-a-cursor")
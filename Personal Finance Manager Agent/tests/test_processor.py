@@ -51,3 +51,35 @@ def test_generate_saving_tips():
     assert 'estimated_savings' in tips[0]
     assert 'confidence' in tips[0]
     assert 'math' in tips[0]
+
+def test_categorize_expense_phrase_priority():
+    # 'gas' alone keeps the transport rule, the longer phrase resolves to utilities
+    assert Processor.categorize_expense("Gas refill") == Category.TRANSPORT
+    assert Processor.categorize_expense("Monthly gas bill") == Category.UTILITIES
+
+def test_categorize_many():
+    descriptions = ["Lunch at restaurant", "Bus fare", "Random expense", "Lunch at restaurant"]
+    assert Processor.categorize_many(descriptions) == [
+        Category.FOOD, Category.TRANSPORT, Category.UNCATEGORIZED, Category.FOOD
+    ]
+
+def test_user_rules_override(tmp_path):
+    rules_path = tmp_path / "category_rules.json"
+    rules_path.write_text('{"shopping": ["whole foods"], "healthcare": ["gym"]}')
+    try:
+        Processor.reload_rules(str(rules_path))
+        assert Processor.categorize_expense("Whole Foods market") == Category.SHOPPING
+        assert Processor.categorize_expense("Gym membership") == Category.HEALTHCARE
+        assert Processor.categorize_expense("Food truck") == Category.FOOD
+    finally:
+        Processor.reload_rules("category_rules.json")
+
+def test_invalid_user_rules_are_logged(tmp_path, caplog):
+    rules_path = tmp_path / "category_rules.json"
+    rules_path.write_text('["not", "a", "mapping"]')
+    try:
+        Processor.reload_rules(str(rules_path))
+        assert "Ignoring invalid category rules" in caplog.text
+        assert Processor.categorize_expense("Bus fare") == Category.TRANSPORT
+    finally:
+        Processor.reload_rules("category_rules.json")
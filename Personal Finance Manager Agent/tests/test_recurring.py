@@ -0,0 +1,76 @@
+import threading
+from models import Expense, Category
+from recurring import RecurringDetector, RecurringCache
+
+def monthly(description, amount, months, day=5, expense_id=0):
+    return [Expense(id=expense_id + i, date=f"2023-{m:02d}-{day:02d}", amount=amount, description=description,
+                    category=Category.ENTERTAINMENT) for i, m in enumerate(months)]
+
+def test_detects_monthly_subscription_and_projects_next_month():
+    detector = RecurringDetector()
+    detector.update(monthly("NETFLIX.COM 8831", 15.49, range(1, 7)) +
+                    [Expense(id=100, date="2023-03-09", amount=42.0, description="Netflix gift card")])
+    subs = detector.subscriptions()
+    assert len(subs) == 1
+    assert subs[0]['merchant'] == "netflix com"
+    assert subs[0]['cadence'] == 'monthly'
+    assert subs[0]['occurrences'] == 6
+
+    projected = detector.project("2023-07")
+    assert projected[0]['projected_charges'] == 1
+    assert projected[0]['projected_amount'] == 15.49
+    # Nothing is projected once the subscription has been missing for a while
+    assert detector.project("2024-01") == []
+
+def test_splits_amount_tiers_and_ignores_irregular_charges():
+    detector = RecurringDetector()
+    weekly = [Expense(date=d, amount=20.0, description="Gym class") for d in
+              ["2023-10-02", "2023-10-09", "2023-10-16", "2023-10-23"]]
+    irregular = [Expense(date=d, amount=30.0, description="Gym class") for d in
+                 ["2023-10-03", "2023-10-04", "2023-10-25"]]
+    detector.update(weekly + irregular)
+    subs = detector.subscriptions()
+    assert [(s['cadence'], s['amount']) for s in subs] == [('weekly', 20.0)]
+
+def test_incremental_update_tracks_last_expense_id():
+    detector = RecurringDetector()
+    detector.update(monthly("Spotify", 9.99, [1, 2], expense_id=1))
+    assert detector.subscriptions() == []
+    assert detector.last_expense_id == 2
+    detector.update(monthly("Spotify", 9.99, [3], expense_id=3))
+    assert detector.subscriptions()[0]['cadence'] == 'monthly'
+    assert detector.last_expense_id == 3
+
+def test_slow_update_does_not_block_other_users():
+    cache = RecurringCache()
+    loading, release = threading.Event(), threading.Event()
+
+    def slow_load(since):
+        loading.set()
+        release.wait(5)
+        return []
+
+    worker = threading.Thread(target=cache.get, args=(1, slow_load))
+    worker.start()
+    assert loading.wait(5)
+    # User 2 is served while user 1's load is still in progress
+    assert cache.get(2, lambda since: monthly("Spotify", 9.99, [1, 2, 3], expense_id=1)).last_expense_id == 3
+    release.set()
+    worker.join(5)
+
+def test_report_reads_results_under_the_user_lock():
+    cache = RecurringCache()
+    cache.get(1, lambda since: monthly("Spotify", 9.99, [1, 2, 3], expense_id=1))
+    detector, lock = cache._entry(1)
+    results = []
+    reader = threading.Thread(target=lambda: results.append(cache.report(1, lambda since: [], "2023-04")))
+    with lock:
+        reader.start()
+        # A concurrent update holds the lock, so the report waits rather than iterating mid-change
+        reader.join(0.2)
+        assert reader.is_alive()
+        detector.update(monthly("Netflix", 15.49, [1, 2, 3], expense_id=10))
+    reader.join(5)
+    subscriptions, projected = results[0]
+    assert sorted(s['merchant'] for s in subscriptions) == ["netflix", "spotify"]
+    assert len(projected) == 2
@@ -0,0 +1,41 @@
+import sqlite3
+import pytest
+from db import Database
+from storage import Storage
+from models import Expense, Category
+from utils import build_search_query
+
+def add(storage, day, description, tags=(), category=Category.FOOD):
+    storage.save_expense(Expense(date=day, amount=10, category=category, description=description, tags=list(tags)))
+
+def test_prefix_search_with_filters_and_paging(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    add(storage, "2023-10-01", "Starbucks coffee", ["work"])
+    add(storage, "2023-10-02", "Coffee beans", ["groceries", "home"], Category.SHOPPING)
+    add(storage, "2023-10-03", "Uber to airport", ["work", "travel"], Category.TRANSPORT)
+    add(storage.for_user(2), "2023-10-04", "Coffee with Bob")
+
+    assert [e.description for e in storage.search_expenses("cof")] == ["Coffee beans", "Starbucks coffee"]
+    assert [e.description for e in storage.search_expenses("wor")] == ["Uber to airport", "Starbucks coffee"]
+    assert [e.description for e in storage.search_expenses("coffee home")] == ["Coffee beans"]
+    assert [e.description for e in storage.search_expenses("coffee", category="food")] == ["Starbucks coffee"]
+    assert [e.description for e in storage.search_expenses("coffee", end="2023-10-01")] == ["Starbucks coffee"]
+    assert [e.description for e in storage.search_expenses("coffee", limit=1, offset=1)] == ["Starbucks coffee"]
+    assert storage.search_expenses("bob") == []
+
+def test_index_follows_updates_and_deletes(tmp_path):
+    path = str(tmp_path / "finance.db")
+    storage = Storage(Database(path))
+    add(storage, "2023-10-01", "Netflix subscription")
+    with sqlite3.connect(path) as conn:
+        conn.execute("UPDATE expenses SET description = 'Spotify subscription'")
+    assert storage.search_expenses("netflix") == []
+    assert len(storage.search_expenses("spot")) == 1
+    with sqlite3.connect(path) as conn:
+        conn.execute("DELETE FROM expenses")
+    assert storage.search_expenses("subscription") == []
+
+def test_query_syntax_is_not_interpreted():
+    assert build_search_query('coffee OR "NEAR(x') == '"coffee"* "or"* "near"* "x"*'
+    with pytest.raises(ValueError):
+        build_search_query('  -- ')
@@ -0,0 +1,131 @@
+import sqlite3
+import pytest
+import db
+from db import Database
+from storage import Storage
+from models import Expense, Budget, UserPrefs, Category
+
+def test_storage_is_tenant_scoped(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    alice, bob = storage.for_user(1), storage.for_user(2)
+    alice.save_expense(Expense(date="2023-10-01", amount=10, category=Category.FOOD))
+    bob.save_expense(Expense(date="2023-10-01", amount=99, category=Category.FOOD))
+    bob.save_budget(Budget(month="2023-10", category_limits={"food": 50}, savings_goal=10))
+    bob.save_user_prefs(UserPrefs(currency="EUR"))
+
+    assert [e.amount for e in alice.load_expenses("2023-10")] == [10]
+    assert [e.amount for e in bob.load_expenses()] == [99]
+    assert alice.load_daily_spend() == [("2023-10-01", "food", "USD", 10.0, 1)]
+    assert alice.load_budget("2023-10").category_limits == {}
+    assert bob.load_budget("2023-10").category_limits == {"food": 50}
+    assert alice.load_user_prefs().currency == "USD"
+    assert bob.load_user_prefs().currency == "EUR"
+
+def test_single_user_database_is_migrated(tmp_path):
+    path = str(tmp_path / "finance.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute('''CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+            amount REAL NOT NULL, currency TEXT NOT NULL, category TEXT NOT NULL,
+            description TEXT NOT NULL, method TEXT NOT NULL, tags TEXT NOT NULL)''')
+        conn.execute('''CREATE TABLE budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, month TEXT NOT NULL UNIQUE,
+            category_limits TEXT NOT NULL, savings_goal REAL NOT NULL)''')
+        conn.execute('''CREATE TABLE user_prefs (id INTEGER PRIMARY KEY AUTOINCREMENT, currency TEXT NOT NULL,
+            income REAL NOT NULL, savings_goal REAL NOT NULL)''')
+        conn.execute("INSERT INTO expenses VALUES (1, '2023-10-01', 25.5, 'USD', 'food', 'Lunch', 'card', '')")
+        conn.execute("INSERT INTO budgets VALUES (1, '2023-10', \"{'food': 100}\", 50)")
+        conn.execute("INSERT INTO user_prefs VALUES (1, 'GBP', 3000, 500)")
+
+    storage = Storage(Database(path))
+    assert [e.description for e in storage.load_expenses("2023-10")] == ["Lunch"]
+    assert storage.load_daily_spend() == [("2023-10-01", "food", "USD", 25.5, 1)]
+    assert storage.load_budget("2023-10").category_limits == {"food": 100}
+    assert storage.load_user_prefs().currency == "GBP"
+    assert storage.for_user(2).load_expenses() == []
+
+def test_failed_migration_rolls_back_and_retries(tmp_path, monkeypatch):
+    path = str(tmp_path / "finance.db")
+    with sqlite3.connect(path) as conn:
+        conn.execute('''CREATE TABLE expenses (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+            amount REAL NOT NULL, currency TEXT NOT NULL, category TEXT NOT NULL,
+            description TEXT NOT NULL, method TEXT NOT NULL, tags TEXT NOT NULL)''')
+        conn.execute("INSERT INTO expenses VALUES (1, '2023-10-01', 25.5, 'USD', 'food', 'Lunch', 'card', '')")
+
+    def fail(conn):
+        raise sqlite3.OperationalError("disk full")
+
+    broken = list(db.MIGRATIONS)
+    broken[1] = list(broken[1]) + [fail]
+    monkeypatch.setattr(db, 'MIGRATIONS', broken)
+    with pytest.raises(sqlite3.OperationalError):
+        Database(path)
+    with sqlite3.connect(path) as conn:
+        assert conn.execute('PRAGMA user_version').fetchone()[0] == 1
+        assert 'user_id' not in [row[1] for row in conn.execute('PRAGMA table_info(expenses)')]
+
+    monkeypatch.undo()
+    assert [e.description for e in Storage(Database(path)).load_expenses("2023-10")] == ["Lunch"]
+
+def test_month_filters_are_half_open(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    storage.save_budget(Budget(month="2023-12", category_limits={"food": 100}, savings_goal=0))
+    storage.save_expense(Expense(date="2023-12-31T18:30:00", amount=30, category=Category.FOOD))
+    storage.save_expense(Expense(date="2024-01-01", amount=5, category=Category.FOOD))
+
+    assert [e.amount for e in storage.load_expenses("2023-12")] == [30]
+    assert storage.load_budget_vs_spend("2023-12") == [("food", 100.0, 30.0)]
+    assert storage.load_month_daily_spend("2023-12") == [("2023-12-31T18:30:00", "food", "USD", 30.0, 1)]
+
+def test_only_user_labelled_expenses_train_the_categorizer(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    storage.save_expense(Expense(date="2023-10-01", description="Uber ride", category=Category.TRANSPORT))
+    storage.save_expense(Expense(date="2023-10-02", description="Game Stop", category=Category.SHOPPING),
+                         labelled=True)
+    storage.save_expenses([Expense(date="2023-10-03", description="Cinema", category=Category.ENTERTAINMENT)])
+
+    assert [e.description for e in storage.load_labelled_expenses()] == ["Game Stop"]
+    assert storage.for_user(2).load_labelled_expenses() == []
+
+def test_currency_codes_are_normalized_by_migration(tmp_path):
+    path = str(tmp_path / "finance.db")
+    storage = Storage(Database(path))
+    storage.save_expense(Expense(date="2023-10-01", amount=10, currency=" usd", category=Category.FOOD))
+    storage.save_user_prefs(UserPrefs(currency="eur"))
+    with sqlite3.connect(path) as conn:
+        conn.execute('PRAGMA user_version = 6')
+    Database(path)
+
+    assert [e.currency for e in storage.load_expenses()] == ["USD"]
+    assert storage.load_daily_spend() == [("2023-10-01", "food", "USD", 10.0, 1)]
+    assert storage.load_user_prefs().currency == "EUR"
+
+def test_budget_limits_round_trip_and_join_with_rollup(tmp_path):
+    storage = Storage(Database(str(tmp_path / "finance.db")))
+    storage.save_budget(Budget(month="2023-10", category_limits={"food": 150, "transport": 100}, savings_goal=200))
+    storage.save_budget(Budget(month="2023-10", category_limits={"food": 120}, savings_goal=250))
+    storage.save_expense(Expense(date="2023-10-01", amount=100, category=Category.FOOD))
+    storage.save_expense(Expense(date="2023-11-01", amount=40, category=Category.FOOD))
+
+    budget = storage.load_budget("2023-10")
+    assert budget.category_limits == {"food": 120}
+    assert budget.savings_goal == 250
+    assert storage.load_budget_vs_spend("2023-10") == [("food", 120.0, 100.0)]
+
+def test_budget_migration_never_evaluates_code(tmp_path):
+    path = str(tmp_path / "finance.db")
+    Database(path)
+    with sqlite3.connect(path) as conn:
+        conn.execute('PRAGMA user_version = 2')
+        conn.execute('DROP TABLE budget_limits')
+        conn.execute('DROP TABLE budgets')
+        conn.execute('''CREATE TABLE budgets (id INTEGER PRIMARY KEY AUTOINCREMENT, user_id INTEGER NOT NULL,
+            month TEXT NOT NULL, category_limits TEXT NOT NULL, savings_goal REAL NOT NULL)''')
+        conn.execute("INSERT INTO budgets VALUES (1, 1, '2023-11', '__import__(\"os\").getcwd()', 0)")
+        conn.execute("INSERT INTO budgets VALUES (2, 1, '2023-12', '[100, 200]', 0)")
+        conn.execute("INSERT INTO budgets VALUES (3, 1, '2024-01', \"{'food': 'lots', 'rent': 900}\", 0)")
+    storage = Storage(Database(path))
+    budget = storage.load_budget("2023-11")
+    assert budget.month == "2023-11"
+    assert budget.category_limits == {}
+    # Non-dict values and non-numeric limits are skipped rather than aborting the migration
+    assert storage.load_budget("2023-12").category_limits == {}
+    assert storage.load_budget("2024-01").category_limits == {"rent": 900}
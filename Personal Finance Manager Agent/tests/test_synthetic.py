@@ -0,0 +1,37 @@
+from datetime import date
+from models import Category
+from processor import Processor
+from recurring import RecurringDetector
+from synthetic import SyntheticConfig, SyntheticData
+from benchmark import compare, run_benchmarks
+
+CONFIG = SyntheticConfig(users=2, years=0.5, expenses_per_day=2, unmatched_ratio=0.0, end=date(2023, 6, 30))
+
+def test_generator_is_deterministic_and_in_range():
+    data = SyntheticData(CONFIG)
+    first, second = data.expenses(1), SyntheticData(CONFIG).expenses(1)
+    assert [(e.date, e.amount, e.description) for e in first] == [(e.date, e.amount, e.description) for e in second]
+    assert first != SyntheticData(CONFIG).expenses(2)
+    assert first[0].date >= data.start.isoformat() and first[-1].date <= "2023-06-30"
+    assert all(e.amount > 0 for e in first)
+
+def test_merchants_follow_the_keyword_rules():
+    expenses = [e for e in SyntheticData(CONFIG).expenses(1)
+                if e.category is not Category.OTHER and 'subscription' not in e.tags]
+    categories = Processor.categorize_many(e.description for e in expenses)
+    assert all(got == e.category for got, e in zip(categories, expenses))
+
+def test_subscriptions_are_detected_as_monthly():
+    detector = RecurringDetector()
+    detector.update(SyntheticData(CONFIG).expenses(1))
+    cadences = {s['description']: s['cadence'] for s in detector.subscriptions()}
+    assert cadences["Streaming music subscription"] == 'monthly'
+
+def test_benchmark_report_and_regression_check(tmp_path):
+    report = run_benchmarks(SyntheticConfig(years=0.1, end=date(2023, 12, 31)), str(tmp_path), repeat=1)
+    names = {r['name'] for r in report['results']}
+    assert {'insert_bulk', 'month_query', 'aggregate_expenses', 'calculate_budget_status',
+            'categorize_rules', 'dashboard'} <= names
+    slower = {'results': [dict(r, seconds=r['seconds'] * 2) for r in report['results']]}
+    assert compare(report, report, 0.25) == []
+    assert len(compare(slower, report, 0.25)) == len(report['results'])
@@ -0,0 +1,87 @@
+import threading
+import time
+from tips_service import TipsService, TipsCache, TokenBucket
+
+AGGREGATES = {'total': 500, 'by_category': {'food': 200}, 'top_categories': [('food', 200)]}
+BUDGET_STATUS = {'category_status': {}, 'budget_gap': 100, 'savings_goal': 50}
+AI_TIPS = [{'tip': 'Cook at home', 'estimated_savings': 80.0, 'confidence': 'high', 'math': '4 x 20'}]
+
+class FakeClient:
+    def __init__(self, delay=0.0):
+        self.calls = 0
+        self.delay = delay
+
+    def generate_tips(self, aggregates, budget_status, fallback=True):
+        self.calls += 1
+        time.sleep(self.delay)
+        return AI_TIPS
+
+def test_tips_are_cached_until_month_invalidated():
+    client = FakeClient()
+    service = TipsService(client_factory=lambda: client)
+    assert service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS) == AI_TIPS
+    assert service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS) == AI_TIPS
+    assert client.calls == 1
+
+    service.invalidate_month('2023-10')
+    service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS)
+    assert client.calls == 2
+
+def test_cache_is_bounded_and_drops_least_recently_used():
+    cache = TipsCache(max_entries=2)
+    cache.set('1:2023-10', 'a', AI_TIPS)
+    cache.set('2:2023-10', 'b', AI_TIPS)
+    assert cache.get('a') == AI_TIPS
+    cache.set('3:2023-10', 'c', AI_TIPS)
+    assert len(cache) == 2
+    assert cache.get('b') is None
+    assert cache.get('a') == AI_TIPS
+    # Evicted keys leave the month index too
+    assert '2:2023-10' not in cache._keys_by_month
+
+def test_concurrent_misses_share_one_call():
+    client = FakeClient(delay=0.2)
+    service = TipsService(client_factory=lambda: client)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS))) for _ in range(5)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert client.calls == 1
+    assert results == [AI_TIPS] * 5
+
+def test_rate_limited_requests_fall_back_to_rules():
+    client = FakeClient()
+    service = TipsService(client_factory=lambda: client,
+                          limiter=TokenBucket(capacity=1, refill_per_second=0))
+    service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS)
+    service.invalidate_month('2023-10')
+    tips = service.get_tips('2023-10', AGGREGATES, BUDGET_STATUS)
+    assert client.calls == 1
+    assert tips[0]['tip'] == "Reduce spending in food by 10%"
+
+def test_submit_returns_rule_tips_then_ai_tips_from_job():
+    client = FakeClient(delay=0.1)
+    service = TipsService(client_factory=lambda: client)
+    tips, job_id = service.submit('2023-10', AGGREGATES, BUDGET_STATUS)
+    assert tips[0]['tip'] == "Reduce spending in food by 10%"
+    assert job_id is not None
+    # Requests arriving while the job runs share it
+    assert service.submit('2023-10', AGGREGATES, BUDGET_STATUS)[1] == job_id
+
+    job = service.get_job(job_id, wait=5)
+    assert job['status'] == 'done'
+    assert job['tips'] == AI_TIPS
+    # Once cached, the dashboard gets AI tips directly
+    assert service.submit('2023-10', AGGREGATES, BUDGET_STATUS) == (AI_TIPS, None)
+
+def test_finished_jobs_expire_without_new_submissions():
+    service = TipsService(client_factory=lambda: FakeClient())
+    service.JOB_RETENTION_SECONDS = 0.05
+    _, job_id = service.submit('2023-10', AGGREGATES, BUDGET_STATUS)
+    assert service.get_job(job_id, wait=5)['status'] == 'done'
+    time.sleep(0.1)
+    assert service.get_job(job_id) is None
+    assert not service._jobs
@@ -0,0 +1,53 @@
+from db import Database
+from models import Expense, Category
+from trends import TrendEngine
+
+def make_db(tmp_path, expenses):
+    db = Database(str(tmp_path / "finance.db"))
+    for expense in expenses:
+        db.insert_expense(expense)
+    return db
+
+def test_daily_rollup_is_maintained_on_insert(tmp_path):
+    db = make_db(tmp_path, [
+        Expense(date="2023-10-01", amount=100, category=Category.FOOD),
+        Expense(date="2023-10-01", amount=20, category=Category.FOOD),
+        Expense(date="2023-10-02", amount=50, category=Category.TRANSPORT),
+    ])
+    assert db.get_daily_spend() == [
+        ("2023-10-01", "food", "USD", 120.0, 2),
+        ("2023-10-02", "transport", "USD", 50.0, 1),
+    ]
+    assert db.get_daily_spend(start="2023-10-02") == [("2023-10-02", "transport", "USD", 50.0, 1)]
+
+def test_spend_series_fills_gaps_and_rolls():
+    rows = [("2023-10-01", "food", "USD", 10.0, 1), ("2023-10-03", "food", "USD", 20.0, 1)]
+    series = TrendEngine.spend_series(rows, 'D', window=2)
+    assert [p['amount'] for p in series] == [10.0, 0.0, 20.0]
+    assert [p['rolling_avg'] for p in series] == [10.0, 5.0, 10.0]
+
+    monthly = TrendEngine.spend_series(rows + [("2023-12-05", "food", "USD", 5.0, 1)], 'M')
+    assert [(p['period'], p['amount']) for p in monthly] == [
+        ("2023-10-01", 30.0), ("2023-11-01", 0.0), ("2023-12-01", 5.0)]
+
+def test_month_over_month_deltas():
+    rows = [
+        ("2023-09-10", "food", "USD", 100.0, 1),
+        ("2023-10-10", "food", "USD", 150.0, 1),
+        ("2023-10-11", "transport", "USD", 30.0, 1),
+    ]
+    deltas = TrendEngine.month_over_month(rows)
+    assert deltas['food'] == {'current': 150.0, 'previous': 100.0, 'delta': 50.0, 'pct_change': 50.0}
+    assert deltas['transport']['pct_change'] is None
+
+def test_downsample_keeps_spikes():
+    series = [{'period': str(i), 'amount': 1.0, 'rolling_avg': 1.0} for i in range(1000)]
+    series[500]['amount'] = 999.0
+    sampled = TrendEngine.downsample(series, 50)
+    assert len(sampled) == 50
+    assert any(p['amount'] == 999.0 for p in sampled)
+    assert sampled[0] is series[0] and sampled[-1] is series[-1]
+
+def test_auto_frequency_for_long_ranges():
+    rows = [("2019-01-01", "food", "USD", 1.0, 1), ("2023-12-31", "food", "USD", 1.0, 1)]
+    assert TrendEngine.auto_frequency(rows, max_points=400) == 'W'
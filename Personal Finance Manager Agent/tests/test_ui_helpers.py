@@ -0,0 +1,25 @@
+from unittest.mock import patch
+from ui_helpers import UIHelpers
+
+BY_CATEGORY = {'food': 175.0, 'transport': 50.0}
+
+def test_chart_specs_are_compact_plotly_json():
+    pie = UIHelpers.create_pie_chart(BY_CATEGORY, output='spec')
+    assert pie['data'][0]['type'] == 'pie'
+    assert pie['data'][0]['labels'] == ['food', 'transport']
+    assert pie['data'][0]['values'] == [175.0, 50.0]
+    bar = UIHelpers.create_bar_chart(BY_CATEGORY, output='spec')
+    assert bar['data'][0]['y'] == [175.0, 50.0]
+    assert 'template' not in bar['layout']
+
+def test_png_rendering_is_cached_by_data():
+    UIHelpers._render_png.cache_clear()
+    with patch.object(UIHelpers, '_fig_to_base64', return_value='data:image/png;base64,AAA') as render:
+        UIHelpers.create_pie_chart(BY_CATEGORY)
+        UIHelpers.create_pie_chart({'transport': 50.0, 'food': 175.0})
+        assert render.call_count == 1
+        UIHelpers.create_bar_chart(BY_CATEGORY)
+        assert render.call_count == 2
+
+def test_empty_data_returns_empty_chart():
+    assert UIHelpers.create_pie_chart({}, output='spec') == ""
@@ -0,0 +1,237 @@
+import hashlib
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from openai_client import OpenAIClient
+from processor import Processor
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """Thread-safe token bucket limiting calls to the OpenAI API"""
+
+    def __init__(self, capacity: int = 5, refill_per_second: float = 5 / 60):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self._tokens = float(capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def try_acquire(self) -> bool:
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.refill_per_second)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+
+class TipsCache:
+    """TTL cache of generated tips, indexed by scope (user and month) for invalidation.
+
+    At most `max_entries` are kept; beyond that the least recently used entry
+    is dropped, so expired entries that are never read again age out too.
+    """
+
+    def __init__(self, ttl_seconds: float = 6 * 3600, max_entries: int = 1024):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[float, str, List[Dict]]]" = OrderedDict()
+        self._keys_by_month: Dict[str, set] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> Optional[List[Dict]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, _month, tips = entry
+            if time.monotonic() >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return tips
+
+    def set(self, month: str, key: str, tips: List[Dict]):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, month, tips)
+            self._keys_by_month.setdefault(month, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate_month(self, month: str):
+        with self._lock:
+            for key in self._keys_by_month.pop(month, ()):
+                self._entries.pop(key, None)
+
+    def _remove(self, key: str):
+        _expires_at, month, _tips = self._entries.pop(key)
+        keys = self._keys_by_month.get(month)
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_month[month]
+
+
+class TipsService:
+    """Serve AI saving tips with caching, single-flight coalescing and rate limiting.
+
+    Tips are cached under a hash of the prompt inputs, so dashboards whose
+    aggregates have not changed never wait on an LLM round trip. Concurrent
+    misses for the same inputs share one API call, and when the token bucket
+    is empty (or no API key is configured) rule-based tips are returned.
+    """
+
+    ALL_MONTHS = 'all'
+    JOB_RETENTION_SECONDS = 600
+    # Longest a client may long-poll a job; each wait holds a request worker
+    MAX_JOB_WAIT_SECONDS = 30
+
+    def __init__(self, client_factory: Callable[[], OpenAIClient] = OpenAIClient,
+                 cache: TipsCache = None, limiter: TokenBucket = None, wait_timeout: float = 30.0,
+                 max_workers: int = 2):
+        self.client_factory = client_factory
+        self.cache = cache or TipsCache()
+        self.limiter = limiter or TokenBucket()
+        self.wait_timeout = wait_timeout
+        self._client = None
+        self._client_unavailable = False
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='tips')
+        self._jobs: Dict[str, Dict] = {}
+        self._jobs_by_key: Dict[str, str] = {}
+
+    @staticmethod
+    def cache_key(aggregates: Dict, budget_status: Dict) -> str:
+        prompt = OpenAIClient._build_prompt(aggregates, budget_status)
+        return hashlib.sha256(prompt.encode('utf-8')).hexdigest()
+
+    def _get_client(self) -> Optional[OpenAIClient]:
+        """Construct the API client once; remember if it cannot be configured"""
+        if self._client is None and not self._client_unavailable:
+            try:
+                self._client = self.client_factory()
+            except ValueError:
+                self._client_unavailable = True
+        return self._client
+
+    def _scope(self, user_id: int, month: Optional[str]) -> str:
+        return f"{user_id}:{month or self.ALL_MONTHS}"
+
+    def get_tips(self, month: Optional[str], aggregates: Dict, budget_status: Dict, user_id: int = 1) -> List[Dict]:
+        """Return AI tips for the given aggregates, falling back to rule-based tips"""
+        key = self.cache_key(aggregates, budget_status)
+        tips = self.cache.get(key)
+        if tips is not None:
+            return tips
+
+        with self._lock:
+            event = self._inflight.get(key)
+            leader = event is None
+            if leader:
+                event = self._inflight[key] = threading.Event()
+
+        if not leader:
+            # Another request is already fetching these tips; wait for its result
+            event.wait(self.wait_timeout)
+            tips = self.cache.get(key)
+            return tips if tips is not None else Processor.generate_saving_tips(aggregates, budget_status)
+
+        try:
+            return self._fetch(self._scope(user_id, month), key, aggregates, budget_status)
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            event.set()
+
+    def _fetch(self, scope: str, key: str, aggregates: Dict, budget_status: Dict) -> List[Dict]:
+        client = self._get_client()
+        if client is None or not self.limiter.try_acquire():
+            return Processor.generate_saving_tips(aggregates, budget_status)
+        try:
+            tips = client.generate_tips(aggregates, budget_status, fallback=False)
+        except Exception:
+            return Processor.generate_saving_tips(aggregates, budget_status)
+        self.cache.set(scope, key, tips)
+        return tips
+
+    def invalidate_month(self, month: str, user_id: int = 1):
+        """Drop a user's cached tips for a month (and their all-time view) after new expenses land"""
+        self.cache.invalidate_month(self._scope(user_id, month))
+        self.cache.invalidate_month(self._scope(user_id, None))
+
+    def submit(self, month: Optional[str], aggregates: Dict, budget_status: Dict,
+               user_id: int = 1) -> Tuple[List[Dict], Optional[str]]:
+        """Return tips without waiting on the API.
+
+        On a cache hit the AI tips are returned with no job id. Otherwise the
+        rule-based tips are returned immediately together with the id of a
+        background job that will produce the AI tips (shared by all callers
+        asking for the same inputs while it runs).
+        """
+        key = self.cache_key(aggregates, budget_status)
+        tips = self.cache.get(key)
+        if tips is not None:
+            return tips, None
+
+        rule_tips = Processor.generate_saving_tips(aggregates, budget_status)
+        if self._get_client() is None:
+            return rule_tips, None
+
+        with self._lock:
+            self._prune_jobs()
+            job_id = self._jobs_by_key.get(key)
+            if job_id is None:
+                job_id = uuid.uuid4().hex
+                job = {'status': 'pending', 'tips': None, 'finished': None, 'done': threading.Event()}
+                self._jobs[job_id] = job
+                self._jobs_by_key[key] = job_id
+                self._executor.submit(self._run_job, job_id, key, month, aggregates, budget_status, user_id)
+        return rule_tips, job_id
+
+    def _run_job(self, job_id: str, key: str, month: Optional[str], aggregates: Dict, budget_status: Dict,
+                 user_id: int):
+        job = self._jobs[job_id]
+        try:
+            job['tips'] = self.get_tips(month, aggregates, budget_status, user_id)
+            job['status'] = 'done'
+        except Exception:
+            logger.exception("Tips job %s failed", job_id)
+            job['tips'] = Processor.generate_saving_tips(aggregates, budget_status)
+            job['status'] = 'failed'
+        finally:
+            with self._lock:
+                if self._jobs_by_key.get(key) == job_id:
+                    del self._jobs_by_key[key]
+                job['finished'] = time.monotonic()
+                self._prune_jobs()
+            job['done'].set()
+
+    def _prune_jobs(self):
+        """Forget jobs finished more than JOB_RETENTION_SECONDS ago (call with the lock held)"""
+        cutoff = time.monotonic() - self.JOB_RETENTION_SECONDS
+        for job_id in [j for j, job in self._jobs.items() if job['finished'] is not None and job['finished'] < cutoff]:
+            del self._jobs[job_id]
+
+    def get_job(self, job_id: str, wait: float = 0) -> Optional[Dict]:
+        """Return a job's status and tips, optionally waiting up to `wait` seconds for it to finish"""
+        with self._lock:
+            self._prune_jobs()
+            job = self._jobs.get(job_id)
+        if job is None:
+            return None
+        if wait:
+            job['done'].wait(wait)
+        return {'job_id': job_id, 'status': job['status'], 'tips': job['tips']}
@@ -0,0 +1,122 @@
+from typing import List, Dict, Tuple, Optional
+import numpy as np
+import pandas as pd
+
+# Pandas period aliases for each supported series frequency
+FREQUENCIES = {'D': 'D', 'W': 'W', 'M': 'M'}
+
+# Default rolling-average window (in periods) for each frequency
+ROLLING_WINDOWS = {'D': 7, 'W': 4, 'M': 3}
+
+
+class TrendEngine:
+    """Spending trends computed from the daily_spend rollup table.
+
+    Inputs are (date, category, currency, amount, count) rollup rows, so five
+    years of history is at most a few thousand rows per category rather than
+    every raw expense.
+    """
+
+    @staticmethod
+    def _frame(rows: List[Tuple]) -> pd.DataFrame:
+        df = pd.DataFrame(rows, columns=['date', 'category', 'currency', 'amount', 'count'])
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    @staticmethod
+    def auto_frequency(rows: List[Tuple], max_points: int = 400) -> str:
+        """Pick the finest frequency whose series fits within max_points"""
+        if not rows:
+            return 'D'
+        days = (pd.Timestamp(rows[-1][0]) - pd.Timestamp(rows[0][0])).days + 1
+        if days <= max_points:
+            return 'D'
+        if days / 7 <= max_points:
+            return 'W'
+        return 'M'
+
+    @staticmethod
+    def spend_series(rows: List[Tuple], freq: str = 'D', category: str = None,
+                     window: Optional[int] = None) -> List[Dict]:
+        """Total spend per period with a trailing rolling average; empty periods count as zero"""
+        if freq not in FREQUENCIES:
+            raise ValueError(f"Unsupported frequency: {freq}")
+        df = TrendEngine._frame(rows)
+        if category:
+            df = df[df['category'] == category]
+        if df.empty:
+            return []
+
+        periods = df['date'].dt.to_period(FREQUENCIES[freq])
+        totals = df.groupby(periods)['amount'].sum()
+        full_range = pd.period_range(periods.min(), periods.max(), freq=FREQUENCIES[freq])
+        totals = totals.reindex(full_range, fill_value=0.0)
+        window = window or ROLLING_WINDOWS[freq]
+        rolling = totals.rolling(window, min_periods=1).mean()
+
+        return [
+            {'period': p.start_time.strftime('%Y-%m-%d'), 'amount': round(float(a), 2),
+             'rolling_avg': round(float(r), 2)}
+            for p, a, r in zip(totals.index, totals.values, rolling.values)
+        ]
+
+    @staticmethod
+    def month_over_month(rows: List[Tuple], month: str = None) -> Dict[str, Dict]:
+        """Per-category spend for a month (default: latest month with data) vs the previous month"""
+        df = TrendEngine._frame(rows)
+        if df.empty:
+            return {}
+        df['month'] = df['date'].dt.to_period('M')
+        current = pd.Period(month, 'M') if month else df['month'].max()
+        previous = current - 1
+        by_month = df[df['month'].isin([current, previous])].pivot_table(
+            index='category', columns='month', values='amount', aggfunc='sum', fill_value=0.0)
+        by_month = by_month.reindex(columns=[previous, current], fill_value=0.0)
+
+        deltas = {}
+        for cat, (prev_amount, cur_amount) in zip(by_month.index, by_month.values):
+            delta = cur_amount - prev_amount
+            deltas[cat] = {
+                'current': round(float(cur_amount), 2),
+                'previous': round(float(prev_amount), 2),
+                'delta': round(float(delta), 2),
+                'pct_change': round(float(delta / prev_amount) * 100, 1) if prev_amount > 0 else None
+            }
+        return deltas
+
+    @staticmethod
+    def downsample(series: List[Dict], max_points: int, key: str = 'amount') -> List[Dict]:
+        """Largest-Triangle-Three-Buckets downsampling, which keeps spikes that plain averaging hides"""
+        n = len(series)
+        if max_points >= n or max_points < 3:
+            return series
+        y = np.array([point[key] for point in series], dtype=float)
+        x = np.arange(n, dtype=float)
+        edges = np.linspace(1, n - 1, max_points - 1).astype(int)
+
+        selected = [0]
+        for i in range(max_points - 2):
+            start, end = edges[i], edges[i + 1]
+            # Average of the next bucket (or the last point) is the third triangle vertex
+            next_end = edges[i + 2] if i + 2 < len(edges) else n
+            avg_x = x[end:next_end].mean() if next_end > end else x[-1]
+            avg_y = y[end:next_end].mean() if next_end > end else y[-1]
+            a = selected[-1]
+            areas = np.abs((x[a] - avg_x) * (y[start:end] - y[a]) - (x[a] - x[start:end]) * (avg_y - y[a]))
+            selected.append(start + int(areas.argmax()))
+        selected.append(n - 1)
+        return [series[i] for i in selected]
+
+    @staticmethod
+    def build_trends(rows: List[Tuple], freq: str = None, category: str = None, window: int = None,
+                     max_points: int = None) -> Dict:
+        """Series plus month-over-month deltas for the trends API and chart"""
+        freq = freq or TrendEngine.auto_frequency(rows, max_points or 400)
+        series = TrendEngine.spend_series(rows, freq, category, window)
+        if max_points:
+            series = TrendEngine.downsample(series, max_points)
+        return {
+            'frequency': freq,
+            'series': series,
+            'month_over_month': TrendEngine.month_over_month(rows)
+        }
@@ -1,46 +1,107 @@
 import plotly.graph_objects as go
-import plotly.express as px
+from functools import lru_cache
 from io import BytesIO
 import base64
-from typing import Dict, List
+from typing import Dict, List, Tuple
 import pandas as pd
 
 class UIHelpers:
+    """Chart builders.
+
+    Charts are returned as compact Plotly JSON specs (output='spec') for
+    Plotly.js to render in the browser, or as base64 PNG data URIs
+    (output='png') for email and export. PNG rendering goes through Kaleido,
+    which keeps its Chromium process alive between calls; rendered images are
+    additionally cached by chart kind and data.
+    """
+
     @staticmethod
-    def create_pie_chart(by_category: Dict[str, float]) -> str:
+    def create_pie_chart(by_category: Dict[str, float], output: str = 'png'):
         """Create pie chart of spending by category"""
         if not by_category:
             return ""
-
-        fig = px.pie(
-            values=list(by_category.values()),
-            names=list(by_category.keys()),
-            title="Spending by Category"
-        )
-        fig.update_traces(textposition='inside', textinfo='percent+label')
-
-        return UIHelpers._fig_to_base64(fig)
+        spec = UIHelpers.pie_chart_spec(by_category)
+        return spec if output == 'spec' else UIHelpers._render_png('pie', UIHelpers._data_key(by_category))
 
     @staticmethod
-    def create_bar_chart(by_category: Dict[str, float]) -> str:
+    def create_bar_chart(by_category: Dict[str, float], output: str = 'png'):
         """Create bar chart of spending by category"""
         if not by_category:
             return ""
+        spec = UIHelpers.bar_chart_spec(by_category)
+        return spec if output == 'spec' else UIHelpers._render_png('bar', UIHelpers._data_key(by_category))
 
-        fig = px.bar(
-            x=list(by_category.keys()),
-            y=list(by_category.values()),
-            title="Spending by Category",
-            labels={'x': 'Category', 'y': 'Amount'}
-        )
+    @staticmethod
+    def pie_chart_spec(by_category: Dict[str, float]) -> Dict:
+        """Plotly JSON spec for the category pie chart (no template, a few hundred bytes)"""
+        return {
+            'data': [{
+                'type': 'pie',
+                'labels': list(by_category.keys()),
+                'values': [round(float(v), 2) for v in by_category.values()],
+                'textposition': 'inside',
+                'textinfo': 'percent+label'
+            }],
+            'layout': {'title': {'text': "Spending by Category"}}
+        }
+
+    @staticmethod
+    def bar_chart_spec(by_category: Dict[str, float]) -> Dict:
+        """Plotly JSON spec for the category bar chart"""
+        return {
+            'data': [{
+                'type': 'bar',
+                'x': list(by_category.keys()),
+                'y': [round(float(v), 2) for v in by_category.values()]
+            }],
+            'layout': {
+                'title': {'text': "Spending by Category"},
+                'xaxis': {'title': {'text': 'Category'}},
+                'yaxis': {'title': {'text': 'Amount'}}
+            }
+        }
 
-        return UIHelpers._fig_to_base64(fig)
+    @staticmethod
+    def create_trend_chart(series: List[Dict], output: str = 'png'):
+        """Create spending trend line chart from TrendEngine.spend_series output"""
+        if not series:
+            return ""
+        spec = UIHelpers.trend_chart_spec(series)
+        if output == 'spec':
+            return spec
+        return UIHelpers._fig_to_base64(go.Figure(spec))
+
+    @staticmethod
+    def trend_chart_spec(series: List[Dict]) -> Dict:
+        """Plotly JSON spec for spend per period plus its rolling average"""
+        periods = [point['period'] for point in series]
+        return {
+            'data': [
+                {'type': 'scatter', 'mode': 'lines', 'name': 'Spend',
+                 'x': periods, 'y': [point['amount'] for point in series]},
+                {'type': 'scatter', 'mode': 'lines', 'name': 'Rolling average',
+                 'x': periods, 'y': [point['rolling_avg'] for point in series],
+                 'line': {'dash': 'dot'}}
+            ],
+            'layout': {
+                'title': {'text': "Spending Trend"},
+                'xaxis': {'title': {'text': 'Date'}},
+                'yaxis': {'title': {'text': 'Amount'}}
+            }
+        }
+
+    @staticmethod
+    def _data_key(by_category: Dict[str, float]) -> Tuple[Tuple[str, float], ...]:
+        """Hashable, order-independent key for the chart data"""
+        return tuple(sorted((k, round(float(v), 2)) for k, v in by_category.items()))
 
     @staticmethod
-    def create_trend_chart(expenses: List[Dict]) -> str:
-        """Create trend chart (placeholder - implement with actual time series)"""
-        # For now, return empty - implement with proper time series data
-        return ""
+    @lru_cache(maxsize=128)
+    def _render_png(kind: str, data_key: Tuple[Tuple[str, float], ...]) -> str:
+        """Render a chart to a PNG data URI, cached on chart kind and data"""
+        by_category = dict(data_key)
+        spec = UIHelpers.pie_chart_spec(by_category) if kind == 'pie' else UIHelpers.bar_chart_spec(by_category)
+        return UIHelpers._fig_to_base64(go.Figure(spec))
 
     @staticmethod
     def _fig_to_base64(fig) -> str:
@@ -1,3 +1,5 @@
+import base64
+import json
 import re
 from datetime import datetime
 from typing import List
@@ -18,6 +20,18 @@ def parse_date(date_str: str) -> str:
                 continue
         raise ValueError(f"Unable to parse date: {date_str}")
 
+def encode_cursor(date: str, row_id: int) -> str:
+    """Opaque pagination token for the (date, id) position of the last row on a page"""
+    return base64.urlsafe_b64encode(json.dumps([date, row_id]).encode()).decode().rstrip('=')
+
+def decode_cursor(token: str) -> tuple:
+    try:
+        date, row_id = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        datetime.fromisoformat(date)
+        return date, int(row_id)
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid cursor: {token}")
+
 def format_currency(amount: float, currency: str = "USD") -> str:
     """Format amount as currency string"""
     return f"{currency} {amount:.2f}"
@@ -26,7 +40,17 @@ def clean_description(desc: str) -> str:
     """Clean and normalize description"""
     return desc.strip().lower()
 
+_WORD_RE = re.compile(r'\b\w+\b')
+
+def build_search_query(text: str) -> str:
+    """Turn free text into an FTS5 query where every word must match as a prefix"""
+    terms = _WORD_RE.findall(text.lower())
+    if not terms:
+        raise ValueError("Search query must contain at least one word")
+    # Quoting each term keeps FTS5 operators in user input from being interpreted
+    return ' '.join(f'"{term}"*' for term in terms)
+
 def extract_keywords(desc: str) -> List[str]:
     """Extract keywords from description for categorization"""
-    words = re.findall(r'\b\w+\b', desc.lower())
+    words = _WORD_RE.findall(desc.lower())
     return [word for word in words if len(word) > 2]
@@ -2,11 +2,12 @@ from flask import Flask, render_template, request, jsonify, send_file
 import os
 from dotenv import load_dotenv
 import yaml
-from services import geocoding, flights_service, hotels_service, attractions_service
-from utils import cost_estimator, cache_manager
+from services import geocoding, trip_search
+from utils import cost_estimator, cache_manager, itinerary_planner, itinerary_cache, exporter
 import logging
 import json
-from datetime import datetime
+from datetime import datetime, timedelta
+from werkzeug.utils import secure_filename
 
 # Load environment variables
 load_dotenv()
@@ -22,9 +23,6 @@ logging.basicConfig(filename='logs/app.log', level=logging.INFO,
 app = Flask(__name__)
 app.config['SECRET_KEY'] = os.getenv('SECRET_KEY', 'dev-secret-key')
 
-# Initialize cache
-cache = cache_manager.CacheManager()
-
 @app.route('/')
 def index():
     return render_template('index.html')
@@ -32,6 +30,7 @@ def index():
 @app.route('/generate_itinerary', methods=['POST'])
 def generate_itinerary():
     try:
+        cache = cache_manager.get_cache()
         data = request.get_json()
 
         # Extract user preferences
@@ -46,41 +45,93 @@ def generate_itinerary():
         if not all([destination, start_date, end_date]):
             return jsonify({'error': 'Missing required fields'}), 400
 
+        days = (datetime.fromisoformat(end_date) - datetime.fromisoformat(start_date)).days + 1
+        max_trip_days = config['defaults'].get('max_trip_days', 30)
+        if not 1 <= days <= max_trip_days:
+            return jsonify({'error': f'Trips must last between 1 and {max_trip_days} days'}), 400
+
         # Geocode destination
         coords = geocoding.get_coordinates(destination)
         if not coords:
             return jsonify({'error': 'Destination not found'}), 400
 
-        # Fetch flight data
-        flights = flights_service.search_flights(destination, start_date, end_date, travelers)
-
-        # Fetch hotel data
-        hotels = hotels_service.search_hotels(coords, start_date, end_date, travelers, budget)
-
-        # Fetch attractions
-        attractions = attractions_service.get_attractions(coords, travel_style)
-
-        # Generate itinerary
-        itinerary = generate_detailed_itinerary(
-            destination, start_date, end_date, travelers, budget, travel_style,
-            flights, hotels, attractions
-        )
-
-        # Calculate costs
-        costs = cost_estimator.calculate_total_cost(itinerary, travelers)
-
-        # Cache the result
-        cache_key = f"{destination}_{start_date}_{end_date}_{travelers}_{budget}_{travel_style}"
-        cache.set(cache_key, {
-            'itinerary': itinerary,
-            'costs': costs,
-            'timestamp': datetime.now().isoformat()
-        })
+        # Same place, dates, party and budget bucket: reuse the flights and plan, only re-price
+        request_key = itinerary_cache.request_key(coords, start_date, end_date, travelers, budget, travel_style)
+        hotels_key = itinerary_cache.hotels_key(request_key, budget)
+        plan_key = itinerary_cache.plan_key(coords, travel_style, days)
+        cached = cache.get(request_key)
+        fallbacks = []
+        if cached:
+            flights = cached['flights']
+            itinerary = dict(cached['itinerary'], destination=destination)
+            hotels = cache.get(hotels_key)
+            if hotels is not None:
+                cache_status = 'hit'
+            else:
+                # Hotel prices depend on the exact budget, so another budget in the bucket searches them again
+                cache_status = 'hotels'
+                results = trip_search.search_trip(
+                    destination, coords, start_date, end_date, travelers, budget, travel_style,
+                    timeouts=config.get('provider_timeouts'), providers=('hotels',)
+                )
+                hotels, fallbacks = results['hotels'], results['fallbacks']
+                if not fallbacks:
+                    cache.set(hotels_key, hotels)
+        else:
+            # A plan for the same place, style and length only needs new dates and offers
+            plan = cache.get(plan_key)
+            cache_status = 'plan' if plan else 'miss'
+
+            # Fetch flights, hotels and (unless planned already) attractions in parallel
+            results = trip_search.search_trip(
+                destination, coords, start_date, end_date, travelers, budget, travel_style,
+                timeouts=config.get('provider_timeouts'),
+                attractions_limit=days * itinerary_planner.MAX_STOPS_PER_DAY,
+                providers=('flights', 'hotels') if plan else None
+            )
+            flights, hotels, fallbacks = results['flights'], results['hotels'], results['fallbacks']
+
+            if plan:
+                itinerary = {
+                    'destination': destination,
+                    'duration': f"{start_date} to {end_date}",
+                    'travelers': travelers,
+                    'style': travel_style,
+                    'days': itinerary_cache.redate(plan['days'], start_date)
+                }
+            else:
+                # Generate itinerary
+                itinerary = generate_detailed_itinerary(
+                    destination, start_date, end_date, travelers, budget, travel_style,
+                    flights, hotels, results['attractions'], coords
+                )
+                if 'attractions' not in fallbacks:
+                    cache.set(plan_key, {'days': itinerary['days']})
+
+            # Mock data standing in for a slow or failing provider is not worth keeping
+            if not fallbacks:
+                cache.set(hotels_key, hotels)
+                cache.set(request_key, {
+                    'itinerary': itinerary,
+                    'flights': flights,
+                    'timestamp': datetime.now().isoformat()
+                })
+
+        # Pick the best flight, hotel and paid visits that fit the exact budget
+        variants = cost_estimator.get_cost_variants(itinerary, travelers, budget, flights, hotels)
+        costs = variants[0]['costs']
 
         return jsonify({
             'itinerary': itinerary,
             'costs': costs,
-            'destination': destination
+            'variants': variants,
+            'within_budget': variants[0]['within_budget'],
+            'destination': destination,
+            'budget': budget,
+            'fallbacks': fallbacks,
+            'cache': cache_status,
+            # Lets clients fetch exports of this itinerary; results built on fallbacks are not cached
+            'itinerary_id': None if fallbacks else request_key
         })
 
     except Exception as e:
@@ -89,13 +140,34 @@ def generate_itinerary():
 
 @app.route('/export/<format_type>')
 def export_itinerary(format_type):
-    # Implementation for PDF/CSV export
-    # This would use reportlab for PDF and pandas for CSV
-    pass
+    if format_type not in exporter.FORMATS:
+        return jsonify({'error': f'Unsupported export format: {format_type}'}), 400
+
+    # Only itinerary results may be exported, not arbitrary cache entries
+    cache = cache_manager.get_cache()
+    itinerary_id = request.args.get('id', '')
+    budget = request.args.get('budget', type=float)
+    cached = cache.get(itinerary_id) if itinerary_id.startswith('itinerary_') else None
+    # The hotel offers the page was priced with, searched for its exact budget
+    hotels = cache.get(itinerary_cache.hotels_key(itinerary_id, budget)) if cached and budget is not None else None
+    if hotels is None:
+        return jsonify({'error': 'Itinerary not found or expired'}), 404
+
+    try:
+        itinerary = cached['itinerary']
+        # Same choice as the page: the best variant for the exact budget
+        variant = cost_estimator.get_cost_variants(itinerary, itinerary.get('travelers', 1), budget,
+                                                   cached['flights'], hotels)[0]
+        download_name = secure_filename(f"itinerary_{itinerary.get('destination', '')}.{format_type}")
+        return exporter.export_response(itinerary, variant, format_type, download_name)
 
-def generate_detailed_itinerary(destination, start_date, end_date, travelers, budget, style, flights, hotels, attractions):
-    # Basic itinerary generation logic
-    # This would be expanded with more sophisticated planning
+    except Exception as e:
+        logging.error(f"Error exporting itinerary: {str(e)}")
+        return jsonify({'error': 'Internal server error'}), 500
+
+def generate_detailed_itinerary(destination, start_date, end_date, travelers, budget, style, flights, hotels, attractions,
+                                coords=None):
+    # Attractions are grouped into days by area, routed and timed by the itinerary planner
     itinerary = {
         'destination': destination,
         'duration': f"{start_date} to {end_date}",
@@ -104,23 +176,21 @@ def generate_detailed_itinerary(destination, start_date, end_date, travelers, bu
         'days': []
     }
 
-    # Generate day-by-day plan (simplified)
-    from datetime import datetime, timedelta
     start = datetime.fromisoformat(start_date)
     end = datetime.fromisoformat(end_date)
     days = (end - start).days + 1
 
-    for day in range(1, min(days, 8)):  # Max 7 days
+    if coords is None:
+        located = [a for a in attractions if 'lat' in a and 'lon' in a]
+        coords = {'lat': sum(a['lat'] for a in located) / len(located) if located else 0.0,
+                  'lon': sum(a['lon'] for a in located) / len(located) if located else 0.0}
+
+    for day, plan in enumerate(itinerary_planner.plan_days(attractions, coords, max(days, 0)), start=1):
         day_plan = {
             'day': day,
             'date': (start + timedelta(days=day-1)).strftime('%Y-%m-%d'),
-            'activities': [
-                {'time': '09:00', 'activity': 'Breakfast at hotel', 'type': 'meal'},
-                {'time': '10:00', 'activity': f'Visit {attractions[day-1]["name"] if day-1 < len(attractions) else "Local attraction"}', 'type': 'attraction'},
-                {'time': '13:00', 'activity': 'Lunch at local restaurant', 'type': 'meal'},
-                {'time': '15:00', 'activity': 'Free time / Shopping', 'type': 'free'},
-                {'time': '19:00', 'activity': 'Dinner and local cuisine experience', 'type': 'meal'}
-            ]
+            'activities': plan['activities'],
+            'distance_km': plan['distance_km']
         }
         itinerary['days'].append(day_plan)
 
@@ -1,16 +1,47 @@
 import requests
 import os
 import logging
-from utils.cache_manager import CacheManager
-
-cache = CacheManager()
+from utils.cache_manager import get_cache
+from utils.spatial_index import get_attraction_index, geohash_bbox, geohash_children
+
+
+SEARCH_RADIUS_METERS = 5000
+# Most attractions one provider request may return; a full response means the area holds more
+TILE_FETCH_LIMIT = 500
+# Requests one refresh may spend splitting areas whose response hit the limit
+MAX_TILE_REQUESTS = 32
+# Geohash precision below which a crowded area is not split any further (about 150 m)
+MAX_SPLIT_PRECISION = 7
+
+STYLE_KINDS = {
+    'balanced': ['parks', 'museums', 'historic', 'churches'],
+    'relaxed': ['museums', 'parks', 'beaches', 'churches', 'historic'],
+    'adventure': ['mountains', 'hiking', 'sports', 'natural', 'geological'],
+    'family': ['museums', 'zoos', 'aquariums', 'parks', 'amusement_parks'],
+    'luxury': ['museums', 'historic', 'architecture', 'galleries', 'theatres']
+}
+
+# One bit per style keyword; an attraction's mask is computed once, when it is indexed
+KIND_BITS = {kind: 1 << i for i, kind in enumerate(sorted({k for kinds in STYLE_KINDS.values() for k in kinds}))}
+STYLE_MASKS = {style: sum(KIND_BITS[k] for k in kinds) for style, kinds in STYLE_KINDS.items()}
+
+def kind_mask(kinds):
+    """Bitmask of the style keywords found in any of the attraction's kinds"""
+    joined = ' '.join(kinds)
+    return sum(bit for kind, bit in KIND_BITS.items() if kind in joined)
 
 def get_attractions(coords, travel_style='balanced', limit=10):
     """
-    Get attractions and points of interest using OpenTripMap API
+    Get attractions and points of interest, served from the local spatial index
+    and filled from the OpenTripMap API for missing or stale tiles
     """
     cache_key = f"attractions_{coords['lat']}_{coords['lon']}_{travel_style}_{limit}"
 
+    # Concurrent misses on the same key wait for one in-flight request
+    return get_cache().inflight.do(cache_key, _fetch_attractions, cache_key, coords, travel_style, limit)
+
+def _fetch_attractions(cache_key, coords, travel_style, limit):
+    cache = get_cache()
     # Check cache first
     cached_result = cache.get(cache_key)
     if cached_result:
@@ -23,61 +54,115 @@ def get_attractions(coords, travel_style='balanced', limit=10):
             logging.warning("OpenTripMap API key not found, returning mock data")
             return get_mock_attractions(coords, travel_style, limit)
 
-        # Get places within 5km radius
-        url = "https://api.opentripmap.com/0.1/en/places/radius"
-        params = {
-            'radius': 5000,  # 5km
-            'lon': coords['lon'],
-            'lat': coords['lat'],
-            'limit': limit,
-            'apikey': api_key
-        }
-
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-
-        places = response.json()
-
-        # Filter and format attractions based on travel style
-        attractions = []
-        for place in places.get('features', []):
-            properties = place.get('properties', {})
-            if properties.get('name'):
-                attraction = {
-                    'name': properties['name'],
-                    'kinds': properties.get('kinds', '').split(','),
-                    'rate': properties.get('rate', 0),
-                    'distance': place.get('properties', {}).get('dist', 0),
-                    'osm_id': properties.get('osm_id')
-                }
-
-                # Filter based on travel style
-                if should_include_attraction(attraction, travel_style):
-                    attractions.append(attraction)
+        index = get_attraction_index()
+        missing = index.missing_tiles(coords['lat'], coords['lon'], SEARCH_RADIUS_METERS)
+        if missing:
+            fetched, complete = fetch_tiles(missing, api_key)
+            index.store(missing, fetched, complete)
+
+        attractions = index.query(coords['lat'], coords['lon'], SEARCH_RADIUS_METERS,
+                                  STYLE_MASKS.get(travel_style, 0), limit)
 
         # Cache and return
-        cache.set(cache_key, attractions[:limit])
-        return attractions[:limit]
+        cache.set(cache_key, attractions)
+        return attractions
 
     except Exception as e:
         logging.error(f"Error fetching attractions: {str(e)}")
         return get_mock_attractions(coords, travel_style, limit)
 
-def should_include_attraction(attraction, travel_style):
+def fetch_tiles(tiles, api_key):
     """
-    Filter attractions based on travel style
-    """
-    kinds = attraction.get('kinds', [])
+    Fetch the attractions in `tiles`, starting with one OpenTripMap bbox request for all of them.
 
-    style_filters = {
-        'relaxed': ['museums', 'parks', 'beaches', 'churches', 'historic'],
-        'adventure': ['mountains', 'hiking', 'sports', 'natural', 'geological'],
-        'family': ['museums', 'zoos', 'aquariums', 'parks', 'amusement_parks'],
-        'luxury': ['museums', 'historic', 'architecture', 'galleries', 'theatres']
+    A response with TILE_FETCH_LIMIT features was cut short, so its area is split
+    in two and both halves are fetched again, down to MAX_SPLIT_PRECISION cells and
+    at most MAX_TILE_REQUESTS requests. Returns (attractions, complete), where
+    `complete` holds the tiles whose every part was fetched without truncation.
+    """
+    found, truncated = {}, set()
+    pending, requests_made = [sorted(tiles)], 0
+    while pending:
+        cells = pending.pop(0)
+        if requests_made == MAX_TILE_REQUESTS:
+            truncated.update(cells)
+            continue
+        attractions, full = _fetch_bbox(_cells_bbox(cells), api_key)
+        requests_made += 1
+        found.update((a['id'], a) for a in attractions)
+        if full:
+            halves = _split_cells(cells)
+            if halves:
+                pending.extend(halves)
+            else:
+                logging.warning(f"Attraction results truncated for geohash {cells[0]}")
+                truncated.update(cells)
+
+    complete = {tile for tile in tiles if not any(cell.startswith(tile) for cell in truncated)}
+    return list(found.values()), complete
+
+def _cells_bbox(cells):
+    boxes = [geohash_bbox(cell) for cell in cells]
+    return (min(b[0] for b in boxes), min(b[1] for b in boxes),
+            max(b[2] for b in boxes), max(b[3] for b in boxes))
+
+def _split_cells(cells):
+    """
+    Two halves of a list of geohash cells, cut across the longer side of their bounding box;
+    a single cell is split into its children, unless it is already at MAX_SPLIT_PRECISION
+    """
+    if len(cells) == 1:
+        if len(cells[0]) >= MAX_SPLIT_PRECISION:
+            return None
+        cells = geohash_children(cells[0])
+    lat_min, lon_min, lat_max, lon_max = _cells_bbox(cells)
+    axis = 0 if lat_max - lat_min > lon_max - lon_min else 1
+    # Sort by the cell centre along that axis (bbox is lat_min, lon_min, lat_max, lon_max)
+    cells = sorted(cells, key=lambda cell: sum(geohash_bbox(cell)[axis::2]))
+    middle = len(cells) // 2
+    return [cells[:middle], cells[middle:]]
+
+def _fetch_bbox(bbox, api_key):
+    """
+    Attractions in one bounding box, and whether the response hit TILE_FETCH_LIMIT
+    """
+    url = "https://api.opentripmap.com/0.1/en/places/bbox"
+    params = {
+        'lat_min': bbox[0],
+        'lon_min': bbox[1],
+        'lat_max': bbox[2],
+        'lon_max': bbox[3],
+        'limit': TILE_FETCH_LIMIT,
+        'apikey': api_key
     }
 
-    relevant_kinds = style_filters.get(travel_style, [])
-    return any(kind in ' '.join(kinds) for kind in relevant_kinds)
+    response = requests.get(url, params=params, timeout=5)
+    response.raise_for_status()
+
+    features = response.json().get('features', [])
+    attractions = []
+    for place in features:
+        properties = place.get('properties', {})
+        coordinates = place.get('geometry', {}).get('coordinates')
+        if properties.get('name') and properties.get('xid') and coordinates:
+            kinds = properties.get('kinds', '').split(',')
+            attractions.append({
+                'id': properties['xid'],
+                'name': properties['name'],
+                'lat': coordinates[1],
+                'lon': coordinates[0],
+                'kinds': kinds,
+                'kind_mask': kind_mask(kinds),
+                'rate': float(properties.get('rate') or 0),
+                'osm_id': properties.get('osm')
+            })
+    return attractions, len(features) >= TILE_FETCH_LIMIT
+
+def should_include_attraction(attraction, travel_style):
+    """
+    Filter attractions based on travel style
+    """
+    return bool(kind_mask(attraction.get('kinds', [])) & STYLE_MASKS.get(travel_style, 0))
 
 def get_mock_attractions(coords, travel_style, limit):
     """
@@ -94,11 +179,6 @@ def get_mock_attractions(coords, travel_style, limit):
         {'name': 'Aquarium', 'kinds': ['aquariums'], 'rate': 4.6, 'distance': 1400}
     ]
 
-    # Filter based on style - ensure we have some matches for 'balanced'
-    if travel_style == 'balanced':
-        # For balanced, include a mix of parks, museums, historic sites
-        filtered = [attr for attr in mock_attractions if any(kind in attr['kinds'] for kind in ['parks', 'museums', 'historic', 'churches'])]
-    else:
-        filtered = [attr for attr in mock_attractions if should_include_attraction(attr, travel_style)]
+    filtered = [attr for attr in mock_attractions if should_include_attraction(attr, travel_style)]
 
     return filtered[:limit]
@@ -2,9 +2,8 @@ import requests
 import os
 import logging
 from datetime import datetime, timedelta
-from utils.cache_manager import CacheManager
+from utils.cache_manager import get_cache
 
-cache = CacheManager()
 
 def search_flights(destination, start_date, end_date, travelers=1):
     """
@@ -13,6 +12,11 @@ def search_flights(destination, start_date, end_date, travelers=1):
     """
     cache_key = f"flights_{destination}_{start_date}_{end_date}_{travelers}"
 
+    # Concurrent misses on the same key wait for one in-flight search
+    return get_cache().inflight.do(cache_key, _search_flights, cache_key, destination, start_date, end_date, travelers)
+
+def _search_flights(cache_key, destination, start_date, end_date, travelers):
+    cache = get_cache()
     # Check cache first
     cached_result = cache.get(cache_key)
     if cached_result:
@@ -1,17 +1,41 @@
 import requests
 import logging
-from utils.cache_manager import CacheManager
+from utils.cache_manager import get_cache
+from utils.gazetteer import get_gazetteer, normalize
 
-cache = CacheManager()
+
+# Unknown destinations are remembered for a shorter time than real coordinates
+NOT_FOUND = {'not_found': True}
+NOT_FOUND_EXPIRY_HOURS = 6
 
 def get_coordinates(destination):
     """
     Get latitude and longitude for a destination using Nominatim API
     """
-    cache_key = f"geocode_{destination.lower().replace(' ', '_')}"
+    # Known places and their aliases resolve locally
+    gazetteer = get_gazetteer()
+    place = gazetteer.lookup(destination)
+    if place:
+        return {'lat': place.lat, 'lon': place.lon}
+
+    cache_key = f"geocode_{normalize(destination).replace(' ', '_')}"
 
+    # Concurrent misses on the same key wait for one in-flight request
+    result = get_cache().inflight.do(cache_key, _lookup_coordinates, cache_key, destination)
+    if result is None:
+        # Only when Nominatim has no answer is a misspelling of a known place worth the guess
+        place = gazetteer.lookup(destination, fuzzy=True)
+        if place:
+            logging.info(f"Geocoding {destination} as near match {place.name}")
+            return {'lat': place.lat, 'lon': place.lon}
+    return result
+
+def _lookup_coordinates(cache_key, destination):
+    cache = get_cache()
     # Check cache first
     cached_result = cache.get(cache_key)
+    if cached_result == NOT_FOUND:
+        return None
     if cached_result:
         return cached_result
 
@@ -23,7 +47,7 @@ def get_coordinates(destination):
             'limit': 1
         }
 
-        response = requests.get(url, params=params, headers={'User-Agent': 'VirtualTravelAgent/1.0'})
+        response = requests.get(url, params=params, headers={'User-Agent': 'VirtualTravelAgent/1.0'}, timeout=5)
         response.raise_for_status()
 
         data = response.json()
@@ -36,6 +60,9 @@ def get_coordinates(destination):
             cache.set(cache_key, result)
             return result
 
+        # Nominatim answered but knows no such place; errors above are not cached
+        cache.set(cache_key, NOT_FOUND, expiry_hours=NOT_FOUND_EXPIRY_HOURS)
+
     except Exception as e:
         logging.error(f"Error geocoding {destination}: {str(e)}")
 
@@ -1,9 +1,8 @@
 import requests
 import os
 import logging
-from utils.cache_manager import CacheManager
+from utils.cache_manager import get_cache
 
-cache = CacheManager()
 
 def search_hotels(coords, checkin_date, checkout_date, travelers=1, budget=1000):
     """
@@ -11,6 +10,12 @@ def search_hotels(coords, checkin_date, checkout_date, travelers=1, budget=1000)
     """
     cache_key = f"hotels_{coords['lat']}_{coords['lon']}_{checkin_date}_{checkout_date}_{travelers}_{budget}"
 
+    # Concurrent misses on the same key wait for one in-flight search
+    return get_cache().inflight.do(cache_key, _search_hotels, cache_key, coords, checkin_date, checkout_date,
+                             travelers, budget)
+
+def _search_hotels(cache_key, coords, checkin_date, checkout_date, travelers, budget):
+    cache = get_cache()
     # Check cache first
     cached_result = cache.get(cache_key)
     if cached_result:
@@ -44,6 +49,9 @@ def get_mock_hotels(coords, checkin_date, checkout_date, travelers, budget):
     checkin = datetime.fromisoformat(checkin_date)
     checkout = datetime.fromisoformat(checkout_date)
     nights = (checkout - checkin).days
+    # A day trip (checkout on the checkin date) needs no hotel
+    if nights <= 0:
+        return []
 
     return [
         {
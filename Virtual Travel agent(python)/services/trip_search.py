@@ -0,0 +1,66 @@
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError
+from services import flights_service, hotels_service, attractions_service
+
+# Seconds each provider may take, measured from when the lookups start
+DEFAULT_TIMEOUTS = {'flights': 8.0, 'hotels': 8.0, 'attractions': 6.0}
+
+# Shared by all requests; the provider calls are I/O bound, so threads overlap their waits
+executor = ThreadPoolExecutor(max_workers=16, thread_name_prefix='provider')
+
+def search_trip(destination, coords, start_date, end_date, travelers=1, budget=1000,
+                travel_style='balanced', timeouts=None, attractions_limit=10, providers=None):
+    """
+    Look up flights, hotels and attractions (or only the named `providers`) in parallel.
+    A provider that raises or misses its timeout is replaced by its mock data, so the
+    result is always complete; those providers are listed under 'fallbacks'.
+    """
+    timeouts = {**DEFAULT_TIMEOUTS, **(timeouts or {})}
+    lookups = {
+        'flights': (flights_service.search_flights,
+                    (destination, start_date, end_date, travelers),
+                    flights_service.get_mock_flights,
+                    (destination, start_date, end_date, travelers)),
+        'hotels': (hotels_service.search_hotels,
+                   (coords, start_date, end_date, travelers, budget),
+                   hotels_service.get_mock_hotels,
+                   (coords, start_date, end_date, travelers, budget)),
+        'attractions': (attractions_service.get_attractions,
+                        (coords, travel_style, attractions_limit),
+                        attractions_service.get_mock_attractions,
+                        (coords, travel_style, attractions_limit)),
+    }
+
+    if providers is not None:
+        lookups = {name: lookup for name, lookup in lookups.items() if name in providers}
+
+    started = time.monotonic()
+    futures = {name: executor.submit(search, *args) for name, (search, args, _, _) in lookups.items()}
+
+    results = {'fallbacks': []}
+    for name, future in futures.items():
+        _, _, fallback, fallback_args = lookups[name]
+        remaining = max(0.0, float(timeouts[name]) - (time.monotonic() - started))
+        try:
+            results[name] = future.result(timeout=remaining)
+        except TimeoutError:
+            # The call keeps running and still fills the cache for the next request
+            logging.warning(f"{name} lookup timed out after {timeouts[name]}s, using mock data")
+            results[name] = _fallback(name, fallback, fallback_args)
+            results['fallbacks'].append(name)
+        except Exception as e:
+            logging.error(f"{name} lookup failed: {str(e)}, using mock data")
+            results[name] = _fallback(name, fallback, fallback_args)
+            results['fallbacks'].append(name)
+
+    logging.info(f"Provider lookups for {destination} took {time.monotonic() - started:.2f}s")
+    return results
+
+def _fallback(name, fallback, args):
+    """Mock data for a provider; if even that fails (it may share the provider's bug), no results"""
+    try:
+        return fallback(*args)
+    except Exception as e:
+        logging.error(f"{name} mock data failed: {str(e)}, using no results")
+        return []
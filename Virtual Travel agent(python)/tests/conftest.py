@@ -0,0 +1,9 @@
+import atexit
+import os
+import shutil
+import tempfile
+
+# Services open their shared caches on first use; keep those files out of the working tree
+cache_dir = tempfile.mkdtemp(prefix='travel-cache-')
+os.environ['TRAVEL_CACHE_DIR'] = cache_dir
+atexit.register(shutil.rmtree, cache_dir, ignore_errors=True)
@@ -0,0 +1,247 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import cache_manager
+from services import geocoding
+
+class TestCacheManager(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'cache.db')
+        self.cache = cache_manager.CacheManager(self.db_path, memory_entries=2)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_memory_tier_serves_repeat_hits(self):
+        """Second lookup is answered from the LRU without touching SQLite"""
+        self.cache.set('a', {'x': 1})
+        self.assertEqual(self.cache.get('a'), {'x': 1})
+
+        # A fresh manager on the same file only has the SQLite tier
+        other = cache_manager.CacheManager(self.db_path)
+        try:
+            self.assertEqual(other.get('a'), {'x': 1})
+            self.assertEqual(other.get('a'), {'x': 1})
+            stats = other.get_stats()
+            self.assertEqual(stats['disk_hits'], 1)
+            self.assertEqual(stats['memory_hits'], 1)
+        finally:
+            other.close()
+
+    def test_lru_evicts_least_recently_used(self):
+        """Bounded front tier evicts in LRU order and counts evictions"""
+        self.cache.set('a', 1)
+        self.cache.set('b', 2)
+        self.cache.get('a')
+        self.cache.set('c', 3)
+        self.assertEqual(len(self.cache.memory), 2)
+        self.assertEqual(self.cache.get_stats()['memory_evictions'], 1)
+        # Evicted from memory but still served from SQLite
+        self.assertEqual(self.cache.get('b'), 2)
+        self.assertEqual(self.cache.get_stats()['disk_hits'], 1)
+
+    def test_expiry_uses_epoch_seconds(self):
+        """Expired entries are misses in both tiers and are swept by clear_expired"""
+        self.cache.set('old', 'value', expiry_hours=-1)
+        self.cache.set('new', 'value')
+        self.assertIsNone(self.cache.get('old'))
+        self.cache.set('old2', 'value', expiry_hours=-1)
+        self.cache.clear_expired()
+        stats = self.cache.get_stats()
+        self.assertEqual(stats['total_entries'], 1)
+        self.assertEqual(stats['misses'], 1)
+        with sqlite3.connect(self.db_path) as conn:
+            expires_at = conn.execute("SELECT expires_at FROM cache WHERE key = 'new'").fetchone()[0]
+        self.assertAlmostEqual(expires_at, time.time() + 24 * 3600, delta=5)
+
+    def test_legacy_table_is_replaced(self):
+        """Caches created with ISO timestamp expiry are recreated with the new layout"""
+        legacy_path = os.path.join(self.tmpdir.name, 'legacy.db')
+        with sqlite3.connect(legacy_path) as conn:
+            conn.execute('CREATE TABLE cache (key TEXT PRIMARY KEY, value TEXT, timestamp TEXT)')
+            conn.execute("INSERT INTO cache VALUES ('k', '1', '2999-01-01T00:00:00')")
+        legacy = cache_manager.CacheManager(legacy_path)
+        try:
+            self.assertIsNone(legacy.get('k'))
+            legacy.set('k', 2)
+            self.assertEqual(legacy.get('k'), 2)
+        finally:
+            legacy.close()
+
+    def test_shared_cache_is_one_instance(self):
+        """Services share one manager per database path"""
+        path = os.path.join(self.tmpdir.name, 'shared.db')
+        first = cache_manager.get_cache(path)
+        self.assertIs(first, cache_manager.get_cache(path))
+        first.close()
+
+    def test_services_open_the_cache_on_first_use(self):
+        """Importing the services opens nothing; the default cache lives under TRAVEL_CACHE_DIR"""
+        package_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        script = ('from services import geocoding, flights_service, hotels_service, attractions_service\n'
+                  'from utils import cache_manager\n'
+                  'import os\n'
+                  'assert not cache_manager._shared and not os.listdir(os.environ["TRAVEL_CACHE_DIR"])\n'
+                  'print(cache_manager.get_cache().db_path)')
+        with tempfile.TemporaryDirectory() as cache_dir:
+            env = dict(os.environ, TRAVEL_CACHE_DIR=cache_dir)
+            output = subprocess.run([sys.executable, '-c', script], cwd=package_dir, env=env,
+                                    capture_output=True, text=True, check=True).stdout
+            self.assertEqual(output.strip(), os.path.join(cache_dir, 'cache.db'))
+
+class TestCacheMaintenance(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmpdir.name, 'cache.db')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_row_cap_evicts_least_recently_accessed(self):
+        """Rows over max_rows are evicted oldest access first, using flushed access times"""
+        cache = cache_manager.CacheManager(self.db_path, max_rows=3)
+        try:
+            now = time.time()
+            with patch('utils.cache_manager.time.time', side_effect=[now, now + 1, now + 2, now + 3, now + 60]):
+                for key in ['a', 'b', 'c', 'd']:
+                    cache.set(key, key)
+                cache.get('a')  # a is now the most recently used
+            result = cache.sweep()
+            self.assertEqual(result['evicted'], 1)
+            self.assertIsNone(cache.get('b'))
+            self.assertEqual(cache.get('a'), 'a')
+            self.assertEqual(cache.get_stats()['disk_evictions'], 1)
+        finally:
+            cache.close()
+
+    def test_byte_cap_and_expired_batches(self):
+        """Expired rows go first, then rows are evicted until under max_bytes"""
+        cache = cache_manager.CacheManager(self.db_path, max_bytes=1000)
+        try:
+            for i in range(1200):
+                cache.set(f'expired_{i}', i, expiry_hours=-1)
+            for i in range(10):
+                cache.set(f'big_{i}', 'x' * 198)
+            result = cache.sweep()
+            self.assertEqual(result['expired'], 1200)
+            self.assertEqual(result['evicted'], 5)
+            self.assertLessEqual(cache.get_stats()['size_bytes'], 1000)
+        finally:
+            cache.close()
+
+    def test_incremental_vacuum_shrinks_file(self):
+        """Deleted pages are returned to the filesystem without a full VACUUM"""
+        cache = cache_manager.CacheManager(self.db_path)
+        try:
+            for i in range(300):
+                cache.set(f'k{i}', 'x' * 2000, expiry_hours=-1)
+            cache._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            before = os.path.getsize(self.db_path)
+            cache.sweep(vacuum_pages=10000)
+            cache._conn.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+            self.assertLess(os.path.getsize(self.db_path), before / 2)
+        finally:
+            cache.close()
+
+    def test_background_sweeper_runs(self):
+        """The sweeper thread removes expired entries on its own"""
+        cache = cache_manager.CacheManager(self.db_path)
+        try:
+            cache.set('stale', 1, expiry_hours=-1)
+            cache.start_sweeper(interval_seconds=0.01)
+            deadline = time.time() + 2
+            while cache.get_stats()['total_entries'] and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(cache.get_stats()['total_entries'], 0)
+        finally:
+            cache.close()
+
+class TestRequestCoalescing(unittest.TestCase):
+
+    def test_concurrent_calls_share_one_execution(self):
+        """Callers arriving while a fetch is in flight get its result instead of fetching again"""
+        flight = cache_manager.SingleFlight()
+        calls = []
+        release = threading.Event()
+
+        def fetch():
+            calls.append(1)
+            release.wait(2)
+            return {'lat': 1.0}
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do('geocode_x', fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        deadline = time.time() + 2
+        while flight.coalesced < 7 and time.time() < deadline:
+            time.sleep(0.01)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(results, [{'lat': 1.0}] * 8)
+        self.assertEqual(flight.coalesced, 7)
+        self.assertEqual(len(flight), 0)
+
+    def test_errors_reach_every_waiter_and_are_not_kept(self):
+        """A failed fetch raises for its waiters, and the next call fetches again"""
+        def broken():
+            raise RuntimeError('down')
+
+        flight = cache_manager.SingleFlight()
+        with self.assertRaises(RuntimeError):
+            flight.do('k', broken)
+        self.assertEqual(flight.do('k', lambda: 2), 2)
+
+    def test_waiters_fetch_directly_when_the_leader_hangs(self):
+        """A caller stuck behind a hung fetch stops waiting after wait_timeout and fetches itself"""
+        flight = cache_manager.SingleFlight(wait_timeout=0.1)
+        release = threading.Event()
+        leader = threading.Thread(target=flight.do, args=('k', release.wait, 2))
+        leader.start()
+        while not len(flight):
+            time.sleep(0.01)
+
+        started = time.monotonic()
+        self.assertEqual(flight.do('k', lambda: 'direct'), 'direct')
+        self.assertLess(time.monotonic() - started, 1)
+        self.assertEqual(flight.wait_timeouts, 1)
+        release.set()
+        leader.join()
+
+    def test_unknown_destination_is_negatively_cached(self):
+        """Nominatim is asked once about a place it does not know; network errors are not cached"""
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = cache_manager.CacheManager(os.path.join(tmpdir, 'cache.db'))
+            try:
+                with patch('services.geocoding.get_cache', return_value=cache), \
+                     patch('services.geocoding.requests.get') as mock_get:
+                    mock_get.return_value = MagicMock(json=MagicMock(return_value=[]))
+                    self.assertIsNone(geocoding.get_coordinates('Atlantis'))
+                    self.assertIsNone(geocoding.get_coordinates('Atlantis'))
+                    self.assertEqual(mock_get.call_count, 1)
+
+                    mock_get.side_effect = ConnectionError('offline')
+                    self.assertIsNone(geocoding.get_coordinates('Lemuria'))
+                    self.assertIsNone(cache.get('geocode_lemuria'))
+            finally:
+                cache.close()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,83 @@
+import unittest
+import itertools
+import random
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import cost_estimator
+from services import flights_service
+
+def itinerary(*visits):
+    """Two-day itinerary with the given (name, kinds, rate) visits on day one"""
+    activities = [{'type': 'attraction', 'name': name, 'kinds': kinds, 'rate': rate} for name, kinds, rate in visits]
+    return {'days': [{'day': 1, 'activities': activities}, {'day': 2, 'activities': []}]}
+
+class TestBudgetSolver(unittest.TestCase):
+
+    def setUp(self):
+        self.flights = flights_service.get_mock_flights('Paris', '2024-06-01', '2024-06-02', 1)
+        self.hotels = [
+            {'name': 'Budget Inn', 'rating': 3.5, 'total_price': 80},
+            {'name': 'Comfort Hotel', 'rating': 4.2, 'total_price': 120},
+            {'name': 'Luxury Resort', 'rating': 4.8, 'total_price': 200},
+        ]
+        self.itinerary = itinerary(('Louvre', ['museums'], 7), ('Zoo', ['zoos'], 5), ('Park', ['parks'], 3))
+
+    def test_best_variant_within_budget(self):
+        """A generous budget buys the best flight, hotel and every paid visit"""
+        variants = cost_estimator.get_cost_variants(self.itinerary, 1, 5000, self.flights, self.hotels)
+        best = variants[0]
+        self.assertEqual(best['rank'], 1)
+        self.assertEqual(best['hotel']['name'], 'Luxury Resort')
+        self.assertEqual(best['flight']['stops'], 0)
+        self.assertEqual(best['skipped_visits'], [])
+        self.assertEqual(best['costs']['activities'], 50)
+        self.assertEqual(len(variants), 3)
+        self.assertEqual([v['quality'] for v in variants], sorted((v['quality'] for v in variants), reverse=True))
+
+    def test_tight_budget_trades_off_options(self):
+        """Every variant fits the budget; a direct flight and all visits beat the luxury hotel"""
+        budget = (380 + 200 + 20) * 1.1
+        variants = cost_estimator.get_cost_variants(self.itinerary, 1, budget, self.flights, self.hotels)
+        for variant in variants:
+            self.assertTrue(variant['within_budget'])
+            self.assertLessEqual(variant['costs']['total'], budget + 0.01)
+        # 0.3 * 1.0 + 0.4 * 0.7 + 0.3 * 1.0 = 0.88 against 0.3 * 0.75 + 0.4 * 0.96 + 0.3 * 10 / 15 = 0.809
+        self.assertEqual(variants[0]['flight']['airline'], 'Mock Airlines')
+        self.assertEqual(variants[0]['hotel']['name'], 'Budget Inn')
+        self.assertEqual(variants[0]['skipped_visits'], [])
+        self.assertIn(['Zoo'], [v['skipped_visits'] for v in variants[1:]])
+
+    def test_nothing_fits_returns_cheapest(self):
+        """An impossible budget yields the cheapest combination, flagged as over budget"""
+        variants = cost_estimator.get_cost_variants(self.itinerary, 1, 100, self.flights, self.hotels)
+        self.assertEqual(len(variants), 1)
+        self.assertFalse(variants[0]['within_budget'])
+        self.assertEqual(variants[0]['flight']['airline'], 'Budget Fly')
+        self.assertEqual(variants[0]['hotel']['name'], 'Budget Inn')
+
+    def test_knapsack_matches_brute_force(self):
+        """Branch and bound finds the optimal visit selection"""
+        rng = random.Random(11)
+        for _ in range(100):
+            items = [(rng.choice([10, 15, 20, 30, 60]), float(rng.randint(1, 7)), i) for i in range(rng.randint(1, 9))]
+            items.sort(key=lambda item: (-item[1] / item[0], item[0], item[1]))
+            capacity = rng.randint(0, 120)
+            best = max(sum(value for _, value, _ in subset)
+                       for r in range(len(items) + 1) for subset in itertools.combinations(items, r)
+                       if sum(cost for cost, _, _ in subset) <= capacity)
+            self.assertAlmostEqual(cost_estimator.best_activities(items, capacity)[0], best)
+
+    def test_total_cost_uses_chosen_options(self):
+        """Provider prices and entry fees replace the flat estimates"""
+        costs = cost_estimator.calculate_total_cost(self.itinerary, 2, self.flights[1], self.hotels[0])
+        self.assertEqual(costs['flights'], 380)
+        self.assertEqual(costs['hotels'], 80)
+        self.assertEqual(costs['activities'], 100)
+        self.assertEqual(costs['total'], round((380 + 80 + 100) * 1.1, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+import tempfile
+import shutil
+import csv
+import io
+import os
+import sys
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from utils import exporter
+
+ITINERARY = {
+    'destination': 'Paris',
+    'duration': '2024-06-01 to 2024-06-02',
+    'travelers': 2,
+    'style': 'relaxed',
+    'days': [
+        {'day': 1, 'date': '2024-06-01', 'distance_km': 3.2, 'activities': [
+            {'time': '08:00', 'activity': 'Breakfast at hotel', 'type': 'meal'},
+            {'time': '09:30', 'activity': 'Visit Louvre & Tuileries', 'type': 'attraction',
+             'duration_minutes': 150, 'travel_minutes': 12},
+        ]},
+        {'day': 2, 'date': '2024-06-02', 'activities': [
+            {'time': '10:00', 'activity': 'Free time to explore', 'type': 'free'},
+        ]},
+    ]
+}
+VARIANT = {
+    'flight': {'airline': 'Mock Airlines', 'price': 380, 'stops': 0},
+    'hotel': {'name': 'Budget Inn', 'rating': 3.5, 'total_price': 80},
+    'skipped_visits': [],
+    'costs': {'flights': 380, 'hotels': 80, 'activities': 40, 'misc': 50.0, 'total': 550.0},
+}
+
+class TestExporter(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.store = exporter.ExportStore(self.directory)
+        self.app = Flask(__name__)
+
+        @self.app.route('/export/<format_type>')
+        def export(format_type):
+            return exporter.export_response(ITINERARY, VARIANT, format_type, f'itinerary.{format_type}', self.store)
+
+        self.client = self.app.test_client()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def stored(self):
+        return sorted(os.listdir(self.directory))
+
+    def test_csv_is_streamed_then_served_from_disk(self):
+        """The first download streams and stores the CSV; repeats are static files with ETag and Range"""
+        first = self.client.get('/export/csv')
+        self.assertIsNone(first.content_length)
+        body = first.get_data()
+        rows = list(csv.reader(io.StringIO(body.decode('utf-8'))))
+        self.assertEqual(rows[0], exporter.CSV_HEADER)
+        self.assertIn('Visit Louvre & Tuileries', [row[4] for row in rows])
+        self.assertEqual(rows[-1][4:], ['Total', '', '', '', '550.0'])
+
+        digest = exporter.export_hash(ITINERARY, VARIANT, 'csv')
+        self.assertEqual(self.stored(), [f'{digest}.csv'])
+        self.assertEqual(first.get_etag()[0], digest)
+
+        again = self.client.get('/export/csv')
+        self.assertEqual(again.get_data(), body)
+        self.assertEqual(again.content_length, len(body))
+        self.assertEqual(again.headers['Accept-Ranges'], 'bytes')
+
+        self.assertEqual(self.client.get('/export/csv', headers={'If-None-Match': f'"{digest}"'}).status_code, 304)
+        partial = self.client.get('/export/csv', headers={'Range': 'bytes=0-6'})
+        self.assertEqual(partial.status_code, 206)
+        self.assertEqual(partial.get_data(), body[:7])
+
+    def test_pdf_is_rendered_once(self):
+        """A PDF is rendered into the store and later downloads reuse the same file"""
+        first = self.client.get('/export/pdf')
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(first.mimetype, 'application/pdf')
+        self.assertTrue(first.get_data().startswith(b'%PDF'))
+        self.assertEqual(len(self.stored()), 1)
+
+        path = os.path.join(self.directory, self.stored()[0])
+        mtime = os.stat(path).st_mtime_ns
+        self.assertEqual(self.client.get('/export/pdf').get_data(), first.get_data())
+        self.assertEqual(len(self.stored()), 1)
+        self.assertGreaterEqual(os.stat(path).st_mtime_ns, mtime)
+
+    def test_interrupted_stream_is_not_stored(self):
+        """A download abandoned part way leaves neither an export nor a temporary file behind"""
+        chunks = self.store.tee(exporter.iter_csv(ITINERARY, VARIANT), 'abc', 'csv')
+        next(chunks)
+        chunks.close()
+        self.assertEqual(self.stored(), [])
+
+    def test_hash_follows_content(self):
+        """Another choice of options is a different export; dict order is not"""
+        digest = exporter.export_hash(ITINERARY, VARIANT, 'pdf')
+        self.assertEqual(digest, exporter.export_hash(dict(reversed(list(ITINERARY.items()))), VARIANT, 'pdf'))
+        self.assertNotEqual(digest, exporter.export_hash(ITINERARY, dict(VARIANT, skipped_visits=['Zoo']), 'pdf'))
+        self.assertNotEqual(digest, exporter.export_hash(ITINERARY, VARIANT, 'csv'))
+
+    def test_prune_keeps_most_recent(self):
+        """Beyond max_files the least recently used exports are removed"""
+        self.store.max_files = 2
+        for i, name in enumerate(['a', 'b', 'c']):
+            path = self.store.path(name, 'csv')
+            with open(path, 'w') as f:
+                f.write(name)
+            os.utime(path, (1000 + i, 1000 + i))
+        os.utime(self.store.path('a', 'csv'), (2000, 2000))
+        self.store.prune()
+        self.assertEqual(self.stored(), ['a.csv', 'c.csv'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import unittest
+from unittest.mock import patch
+import tempfile
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import gazetteer
+from services import geocoding
+
+class TestGazetteer(unittest.TestCase):
+
+    def setUp(self):
+        self.places = gazetteer.get_gazetteer()
+
+    def test_aliases_and_normalized_names(self):
+        """Aliases, accents, case, punctuation and spacing all resolve to the same place"""
+        for query in ['New York', 'NYC', 'new york city', '  New   York! ']:
+            self.assertEqual(self.places.lookup(query).name, 'New York')
+        self.assertEqual(self.places.lookup('São Paulo').name, 'Sao Paulo')
+        self.assertEqual(self.places.lookup('St. Petersburg').name, 'Saint Petersburg')
+
+    def test_fuzzy_matches_and_rejections(self):
+        """Near-miss spellings match; unrelated or too-short strings do not"""
+        self.assertEqual(self.places.lookup('Barcelonna', fuzzy=True).name, 'Barcelona')
+        self.assertEqual(self.places.lookup('Pairs', fuzzy=True).name, 'Paris')
+        self.assertIsNone(self.places.lookup('NonexistentPlace12345', fuzzy=True))
+        self.assertIsNone(self.places.lookup('Rom', fuzzy=True))
+        # Without fuzzy, only names and aliases match
+        self.assertIsNone(self.places.lookup('Barcelonna'))
+
+    def test_country_qualifier_must_agree(self):
+        """"City, Country" only matches when the country is the matched place's"""
+        self.assertEqual(self.places.lookup('Paris, France').name, 'Paris')
+        self.assertEqual(self.places.lookup('Kyoto, JP').name, 'Kyoto')
+        self.assertIsNone(self.places.lookup('Paris, Texas'))
+
+    def test_geonames_dump_and_population_tiebreak(self):
+        """GeoNames rows load with their alternate names; the larger place wins a shared name"""
+        rows = [
+            ['4717560', 'Paris', 'Paris', 'Paris TX', '33.66', '-95.55', 'P', 'PPLA2', 'US', '', 'TX', '', '', '',
+             '24171', '', '180', 'America/Chicago', '2017-05-23'],
+            ['1', 'Springfield', 'Springfield', 'Springfeld', '39.80', '-89.64', 'P', 'PPLA', 'US', '', 'IL', '', '',
+             '', '114394', '', '180', 'America/Chicago', '2019-09-05'],
+        ]
+        with tempfile.TemporaryDirectory() as tmpdir:
+            path = os.path.join(tmpdir, 'cities15000.txt')
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write(''.join('\t'.join(row) + '\n' for row in rows))
+            places = gazetteer.Gazetteer()
+            places.load(gazetteer.DEFAULT_PATH)
+            self.assertEqual(places.load(path), 2)
+
+        self.assertEqual(places.lookup('Paris').country_code, 'FR')
+        self.assertEqual(places.lookup('Paris TX').country_code, 'US')
+        self.assertAlmostEqual(places.lookup('springfeld').lat, 39.80)
+        self.assertAlmostEqual(places.lookup('Sprngfield', fuzzy=True).lat, 39.80)
+
+    @patch('services.geocoding.requests.get')
+    def test_known_destinations_skip_the_network(self, mock_get):
+        """get_coordinates answers gazetteer hits without calling Nominatim"""
+        self.assertEqual(geocoding.get_coordinates('Tokyo'), {'lat': 35.6762, 'lon': 139.6503})
+        mock_get.assert_not_called()
+
+    @patch('services.geocoding.requests.get')
+    def test_near_miss_names_ask_nominatim_first(self, mock_get):
+        """Bern is not Berlin: a fuzzy hit is only used when Nominatim has no answer"""
+        mock_get.return_value.json.return_value = [{'lat': '46.9480', 'lon': '7.4474'}]
+        self.assertEqual(geocoding.get_coordinates('Bern'), {'lat': 46.948, 'lon': 7.4474})
+        mock_get.assert_called_once()
+
+        mock_get.return_value.json.return_value = []
+        berlin = self.places.lookup('Berlin')
+        self.assertEqual(geocoding.get_coordinates('Berlinn'), {'lat': berlin.lat, 'lon': berlin.lon})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import itinerary_cache
+
+class TestItineraryCacheKeys(unittest.TestCase):
+
+    def setUp(self):
+        self.coords = {'lat': 40.712776, 'lon': -74.005974}
+
+    def test_request_key_is_normalized(self):
+        """Nearby geocodes, equivalent dates, style case and close budgets share one key"""
+        key = itinerary_cache.request_key(self.coords, '2024-06-01', '2024-06-05', 2, 2000, 'relaxed')
+        self.assertEqual(key, itinerary_cache.request_key({'lat': 40.7128, 'lon': -74.0060},
+                                                          '2024-06-01T00:00:00', '2024-06-05', 2, 2020, 'Relaxed'))
+        self.assertNotEqual(key, itinerary_cache.request_key(self.coords, '2024-06-01', '2024-06-05', 2, 2400,
+                                                             'relaxed'))
+        self.assertNotEqual(key, itinerary_cache.request_key(self.coords, '2024-06-01', '2024-06-05', 3, 2000,
+                                                             'relaxed'))
+
+    def test_budget_buckets_grow_geometrically(self):
+        """Buckets are about 10% wide at any budget"""
+        for budget in (500, 5000, 50000):
+            self.assertEqual(itinerary_cache.budget_bucket(budget), itinerary_cache.budget_bucket(budget * 1.04))
+            self.assertNotEqual(itinerary_cache.budget_bucket(budget), itinerary_cache.budget_bucket(budget * 1.25))
+
+    def test_hotel_offers_need_the_exact_budget(self):
+        """Budgets sharing a bucket share the result key but not the hotel offers"""
+        key = itinerary_cache.request_key(self.coords, '2024-06-01', '2024-06-05', 2, 2000, 'relaxed')
+        self.assertEqual(key, itinerary_cache.request_key(self.coords, '2024-06-01', '2024-06-05', 2, 2020, 'relaxed'))
+        self.assertEqual(itinerary_cache.hotels_key(key, 2000), itinerary_cache.hotels_key(key, 2000.0))
+        self.assertNotEqual(itinerary_cache.hotels_key(key, 2000), itinerary_cache.hotels_key(key, 2020))
+        self.assertFalse(itinerary_cache.hotels_key(key, 2000).startswith('itinerary_'))
+
+    def test_plan_reuse_across_dates(self):
+        """Plans ignore dates; redating leaves the cached days untouched"""
+        self.assertEqual(itinerary_cache.plan_key(self.coords, 'Family', 3),
+                         itinerary_cache.plan_key({'lat': 40.7128, 'lon': -74.006}, 'family', 3))
+        cached = [{'day': 1, 'date': '2024-06-01', 'activities': []},
+                  {'day': 2, 'date': '2024-06-02', 'activities': []}]
+        days = itinerary_cache.redate(cached, '2024-12-31')
+        self.assertEqual([d['date'] for d in days], ['2024-12-31', '2025-01-01'])
+        self.assertEqual(cached[0]['date'], '2024-06-01')
+
+if __name__ == '__main__':
+    unittest.main()
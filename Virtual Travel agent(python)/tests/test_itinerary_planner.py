@@ -0,0 +1,88 @@
+import unittest
+import random
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import itinerary_planner
+
+def visits(day):
+    return [a for a in day['activities'] if a['type'] == 'attraction']
+
+class TestItineraryPlanner(unittest.TestCase):
+
+    def setUp(self):
+        self.center = {'lat': 48.8566, 'lon': 2.3522}
+
+    def test_distance_matrix_matches_known_distance(self):
+        """Paris to London is about 344 km; the matrix is symmetric with a zero diagonal"""
+        matrix = itinerary_planner.distance_matrix([48.8566, 51.5074], [2.3522, -0.1278])
+        self.assertAlmostEqual(matrix[0][1], 343.5, delta=1.5)
+        self.assertAlmostEqual(matrix[1][0], matrix[0][1])
+        self.assertEqual(matrix[0][0], 0)
+
+    def test_two_opt_removes_crossing(self):
+        """A tour that crosses itself is untangled"""
+        # Depot 0 at the origin and the corners of a unit square
+        points = [(0, 0), (0, 1), (1, 1), (1, 0)]
+        dist = [[((a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2) ** 0.5 for b in points] for a in points]
+        self.assertIn(itinerary_planner.two_opt([2, 1, 3], dist), ([1, 2, 3], [3, 2, 1]))
+
+    def test_days_follow_geography(self):
+        """Two distant neighbourhoods become separate days, each routed within itself"""
+        west = [{'name': f'West {i}', 'lat': 48.86 + i * 0.002, 'lon': 2.25, 'kinds': ['parks'], 'rate': 3}
+                for i in range(3)]
+        east = [{'name': f'East {i}', 'lat': 48.85 + i * 0.002, 'lon': 2.45, 'kinds': ['parks'], 'rate': 3}
+                for i in range(3)]
+        days = itinerary_planner.plan_days(west + east, self.center, 2)
+
+        groups = [{a['name'].split()[0] for a in visits(day)} for day in days]
+        self.assertEqual(sorted(len(g) for g in groups), [1, 1])
+        self.assertNotEqual(groups[0], groups[1])
+        self.assertEqual(sum(len(visits(day)) for day in days), 6)
+
+    def test_opening_hours_and_day_budget(self):
+        """Visits start within opening hours and end before dinner; a closed attraction is dropped"""
+        attractions = [
+            {'name': 'Morning Market', 'lat': 48.857, 'lon': 2.353, 'kinds': ['markets'], 'rate': 5},
+            {'name': 'Night Club', 'lat': 48.858, 'lon': 2.354, 'kinds': ['bars'], 'rate': 5,
+             'opening_hours': [22 * 60, 26 * 60]},
+            {'name': 'Museum', 'lat': 48.859, 'lon': 2.355, 'kinds': ['museums'], 'rate': 4},
+        ]
+        day = itinerary_planner.plan_days(attractions, self.center, 1)[0]
+        names = [a['name'] for a in visits(day)]
+        self.assertNotIn('Night Club', names)
+        self.assertEqual(sorted(names), ['Morning Market', 'Museum'])
+        for activity in visits(day):
+            hours, minutes = map(int, activity['time'].split(':'))
+            self.assertGreaterEqual(hours * 60 + minutes, itinerary_planner.DAY_START)
+            self.assertLessEqual(hours * 60 + minutes + activity['duration_minutes'], itinerary_planner.DAY_END)
+
+    def test_long_trip_over_many_candidates_is_fast(self):
+        """A 14-day plan over 300 candidates takes well under a second and never repeats a stop"""
+        rng = random.Random(7)
+        kinds = ['museums', 'parks', 'historic', 'churches', 'galleries', 'architecture']
+        attractions = [{'name': f'Place {i}', 'lat': 48.8566 + rng.uniform(-0.05, 0.05),
+                        'lon': 2.3522 + rng.uniform(-0.07, 0.07), 'kinds': [rng.choice(kinds)],
+                        'rate': rng.randint(1, 7)} for i in range(300)]
+        started = time.perf_counter()
+        days = itinerary_planner.plan_days(attractions, self.center, 14)
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual(len(days), 14)
+        names = [a['name'] for day in days for a in visits(day)]
+        self.assertEqual(len(names), len(set(names)))
+        self.assertTrue(all(visits(day) for day in days))
+        self.assertLess(elapsed, 0.5)
+
+    def test_days_without_attractions_get_free_time(self):
+        """Trips longer than the attraction list still get a plan for every day"""
+        days = itinerary_planner.plan_days([{'name': 'Only Sight', 'rate': 4}], self.center, 3)
+        self.assertEqual([len(visits(day)) for day in days], [1, 0, 0])
+        self.assertIn('free', [a['type'] for a in days[2]['activities']])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,129 @@
+import unittest
+from unittest.mock import patch, MagicMock
+import tempfile
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import spatial_index, cache_manager
+from services import attractions_service
+
+def feature(xid, name, lat, lon, kinds, rate=3):
+    return {'properties': {'xid': xid, 'name': name, 'kinds': kinds, 'rate': rate, 'osm': f'node/{xid}'},
+            'geometry': {'type': 'Point', 'coordinates': [lon, lat]}}
+
+class TestGeohash(unittest.TestCase):
+
+    def test_encode_and_bbox(self):
+        """Known geohash round-trips through its cell bounds"""
+        self.assertEqual(spatial_index.geohash_encode(57.64911, 10.40744, 11), 'u4pruydqqvj')
+        lat_min, lon_min, lat_max, lon_max = spatial_index.geohash_bbox('u4pru')
+        self.assertTrue(lat_min <= 57.64911 <= lat_max and lon_min <= 10.40744 <= lon_max)
+        lat_step, lon_step = spatial_index.cell_size(5)
+        self.assertAlmostEqual(lat_max - lat_min, lat_step)
+        self.assertAlmostEqual(lon_max - lon_min, lon_step)
+
+    def test_radius_cover_widens_with_latitude(self):
+        """A 5 km circle needs more longitude cells further from the equator"""
+        equator = spatial_index.covering_tiles(*spatial_index.radius_bbox(0.02, 0.02, 5000))
+        north = spatial_index.covering_tiles(*spatial_index.radius_bbox(60.02, 0.02, 5000))
+        self.assertIn(spatial_index.geohash_encode(0.02, 0.02), equator)
+        self.assertGreater(len(north), len(equator))
+
+class TestAttractionIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.index = spatial_index.AttractionIndex(os.path.join(self.tmpdir.name, 'attractions.db'))
+        self.cache = cache_manager.CacheManager(os.path.join(self.tmpdir.name, 'cache.db'))
+        self.coords = {'lat': 48.8566, 'lon': 2.3522}
+
+    def tearDown(self):
+        self.index.close()
+        self.cache.close()
+        self.tmpdir.cleanup()
+
+    def test_query_filters_by_radius_and_kind_mask(self):
+        """Only attractions inside the radius whose kinds match the style are returned, best rated first"""
+        places = [feature('a', 'Louvre', 48.8606, 2.3376, 'museums,cultural', 7),
+                  feature('b', 'Parc Monceau', 48.8797, 2.3091, 'urban_environment,gardens_and_parks', 3),
+                  feature('c', 'Versailles', 48.8049, 2.1204, 'historic,palaces', 7),
+                  feature('d', 'Bar', 48.8570, 2.3530, 'foods,bars', 2)]
+        tiles = self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000)
+        with patch('services.attractions_service.requests.get') as mock_get:
+            mock_get.return_value = MagicMock(json=MagicMock(return_value={'features': places}))
+            self.index.store(tiles, *attractions_service.fetch_tiles(tiles, 'key'))
+
+        mask = attractions_service.STYLE_MASKS['balanced']
+        results = self.index.query(self.coords['lat'], self.coords['lon'], 5000, mask)
+        self.assertEqual([a['name'] for a in results], ['Louvre', 'Parc Monceau'])
+        self.assertLess(results[0]['distance'], 1500)
+        self.assertEqual(self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000), set())
+
+    def test_stale_tiles_are_refetched(self):
+        """Tiles older than max_age_hours count as missing again"""
+        tiles = self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000)
+        self.index.store(tiles, [])
+        with patch('utils.spatial_index.time.time', return_value=time.time() + 8 * 24 * 3600):
+            self.assertEqual(self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000), tiles)
+
+    @patch.dict(os.environ, {'OPENTRIPMAP_API_KEY': 'key'})
+    def test_service_fetches_each_area_once(self):
+        """Different styles and radius queries over fetched tiles are served locally"""
+        places = [feature('a', 'Louvre', 48.8606, 2.3376, 'museums,cultural', 7),
+                  feature('z', 'Zoo de Vincennes', 48.8400, 2.3900, 'zoos,animals', 5)]
+        with patch('services.attractions_service.get_cache', return_value=self.cache), \
+             patch('services.attractions_service.get_attraction_index', return_value=self.index), \
+             patch('services.attractions_service.requests.get') as mock_get:
+            mock_get.return_value = MagicMock(json=MagicMock(return_value={'features': places}))
+            family = attractions_service.get_attractions(self.coords, 'family')
+            luxury = attractions_service.get_attractions(self.coords, 'luxury')
+            nearby = attractions_service.get_attractions({'lat': 48.8570, 'lon': 2.3500}, 'family')
+
+        self.assertEqual(mock_get.call_count, 1)
+        self.assertIn('bbox', mock_get.call_args[0][0])
+        self.assertEqual([a['name'] for a in family], ['Louvre', 'Zoo de Vincennes'])
+        self.assertEqual([a['name'] for a in luxury], ['Louvre'])
+        self.assertEqual(len(nearby), 2)
+
+    def test_truncated_responses_are_split_and_not_marked_fetched(self):
+        """A response that hits the fetch limit is requested again in halves; a tile left truncated stays missing"""
+        tile = spatial_index.geohash_encode(self.coords['lat'], self.coords['lon'])
+        lat_min, lon_min, lat_max, lon_max = spatial_index.geohash_bbox(tile)
+        places = [feature(f'p{i}', f'Place {i}', (lat_min + lat_max) / 2, lon_min + (lon_max - lon_min) * x, 'museums')
+                  for i, x in enumerate([0.1, 0.2, 0.3, 0.6, 0.7, 0.8])]
+
+        def bbox_response(url, params, timeout):
+            inside = [p for p in places
+                      if params['lat_min'] <= p['geometry']['coordinates'][1] <= params['lat_max']
+                      and params['lon_min'] <= p['geometry']['coordinates'][0] <= params['lon_max']]
+            return MagicMock(json=MagicMock(return_value={'features': inside[:params['limit']]}))
+
+        with patch.object(attractions_service, 'TILE_FETCH_LIMIT', 4), \
+             patch('services.attractions_service.requests.get', side_effect=bbox_response) as mock_get:
+            with patch.object(attractions_service, 'MAX_TILE_REQUESTS', 1):
+                attractions, complete = attractions_service.fetch_tiles({tile}, 'key')
+            self.assertEqual(len(attractions), 4)
+            self.assertEqual(complete, set())
+            self.index.store({tile}, attractions, complete)
+            self.assertIn(tile, self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000))
+
+            mock_get.reset_mock()
+            attractions, complete = attractions_service.fetch_tiles({tile}, 'key')
+            self.assertEqual(mock_get.call_count, 3)
+            self.assertEqual(sorted(a['id'] for a in attractions), [f'p{i}' for i in range(6)])
+            self.assertEqual(complete, {tile})
+            self.index.store({tile}, attractions, complete)
+            self.assertNotIn(tile, self.index.missing_tiles(self.coords['lat'], self.coords['lon'], 5000))
+
+    def test_balanced_style_matches_real_kinds(self):
+        """Balanced trips include parks, museums and historic sites from provider kinds"""
+        self.assertTrue(attractions_service.should_include_attraction(
+            {'kinds': ['historic', 'historic_architecture']}, 'balanced'))
+        self.assertFalse(attractions_service.should_include_attraction({'kinds': ['foods']}, 'balanced'))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import patch
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services import trip_search
+
+def slow(result, seconds):
+    def call(*args):
+        time.sleep(seconds)
+        return result
+    return call
+
+class TestTripSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.coords = {'lat': 48.8566, 'lon': 2.3522}
+        self.args = ('Paris', self.coords, '2024-06-01', '2024-06-05', 2, 2000, 'relaxed')
+
+    def test_lookups_run_in_parallel(self):
+        """Total latency is close to the slowest provider, not the sum"""
+        with patch('services.flights_service.search_flights', slow(['flight'], 0.3)), \
+             patch('services.hotels_service.search_hotels', slow(['hotel'], 0.3)), \
+             patch('services.attractions_service.get_attractions', slow(['sight'], 0.3)):
+            started = time.monotonic()
+            results = trip_search.search_trip(*self.args)
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.6)
+        self.assertEqual(results['flights'], ['flight'])
+        self.assertEqual(results['hotels'], ['hotel'])
+        self.assertEqual(results['attractions'], ['sight'])
+        self.assertEqual(results['fallbacks'], [])
+
+    def test_timeout_and_error_fall_back_to_mock_data(self):
+        """A slow provider and a failing provider are replaced by their mock data"""
+        def broken(*args):
+            raise RuntimeError('provider down')
+
+        with patch('services.flights_service.search_flights', slow(['flight'], 0.05)), \
+             patch('services.hotels_service.search_hotels', slow(['hotel'], 1.0)), \
+             patch('services.attractions_service.get_attractions', broken):
+            started = time.monotonic()
+            results = trip_search.search_trip(*self.args, timeouts={'hotels': 0.2})
+            elapsed = time.monotonic() - started
+
+        self.assertLess(elapsed, 0.8)
+        self.assertEqual(results['flights'], ['flight'])
+        self.assertEqual(sorted(results['fallbacks']), ['attractions', 'hotels'])
+        self.assertTrue(all(h['price_per_night'] > 0 for h in results['hotels']))
+        self.assertEqual(len(results['attractions']), len(trip_search.attractions_service.get_mock_attractions(
+            self.coords, 'relaxed', 10)))
+
+    def test_failing_mock_data_leaves_no_results(self):
+        """A fallback that raises as well yields an empty list instead of failing the search"""
+        def broken(*args):
+            raise ZeroDivisionError('integer division or modulo by zero')
+
+        with patch('services.flights_service.search_flights', slow(['flight'], 0)), \
+             patch('services.hotels_service.search_hotels', broken), \
+             patch('services.hotels_service.get_mock_hotels', broken):
+            results = trip_search.search_trip(*self.args, providers=('flights', 'hotels'))
+
+        self.assertEqual(results['flights'], ['flight'])
+        self.assertEqual(results['hotels'], [])
+        self.assertEqual(results['fallbacks'], ['hotels'])
+
+    def test_day_trip_needs_no_hotel(self):
+        """Checking out on the arrival date means zero nights and no hotel offers"""
+        self.assertEqual(trip_search.hotels_service.get_mock_hotels(self.coords, '2024-06-01', '2024-06-01', 2, 2000),
+                         [])
+
+    def test_only_requested_providers_are_called(self):
+        """A cached plan lets the caller skip the attractions lookup"""
+        with patch('services.flights_service.search_flights', slow(['flight'], 0)), \
+             patch('services.hotels_service.search_hotels', slow(['hotel'], 0)), \
+             patch('services.attractions_service.get_attractions') as attractions:
+            results = trip_search.search_trip(*self.args, providers=('flights', 'hotels'))
+
+        attractions.assert_not_called()
+        self.assertNotIn('attractions', results)
+        self.assertEqual(results['hotels'], ['hotel'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,162 @@
 import sqlite3
 import json
 import os
-from datetime import datetime, timedelta
+import time
+import threading
 import logging
+from collections import OrderedDict
+
+# Cache files live in the package's cache/ directory whatever the working directory is;
+# TRAVEL_CACHE_DIR moves them (tests point it at a temporary directory)
+PACKAGE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_DB_NAME = 'cache.db'
+DEFAULT_MEMORY_ENTRIES = 2048
+DEFAULT_MAX_ROWS = 50000
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+SWEEP_BATCH_SIZE = 500
+# Longest a coalesced caller waits on another caller's fetch before fetching itself
+INFLIGHT_WAIT_SECONDS = 30
+
+def cache_path(name):
+    """Path of a file or directory inside the cache directory"""
+    return os.path.join(os.getenv('TRAVEL_CACHE_DIR') or os.path.join(PACKAGE_DIR, 'cache'), name)
+
+class LRUCache:
+    """Thread-safe, bounded in-process cache of decoded values with their expiry times"""
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_ENTRIES):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key, now):
+        """Return (found, value); expired entries are dropped"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False, None
+            value, expires_at = entry
+            if expires_at <= now:
+                del self._entries[key]
+                return False, None
+            self._entries.move_to_end(key)
+            return True, value
+
+    def set(self, key, value, expires_at):
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_many(self, keys):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear_expired(self, now):
+        with self._lock:
+            for key in [k for k, (_, expires_at) in self._entries.items() if expires_at <= now]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+class SingleFlight:
+    """Coalesces concurrent calls with the same key into one execution.
+
+    The first caller runs the function; callers arriving while it is in flight
+    wait and receive the same result (or exception). A waiter gives up after
+    wait_timeout seconds and runs the function itself, so a hung fetch does not
+    hang every later request for its key. Nothing is remembered once the call
+    finishes, so caching stays the caller's job.
+    """
+
+    def __init__(self, wait_timeout=INFLIGHT_WAIT_SECONDS):
+        self.wait_timeout = wait_timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.coalesced = 0
+        self.wait_timeouts = 0
+
+    def do(self, key, fn, *args, **kwargs):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            if call.done.wait(self.wait_timeout):
+                if call.error is not None:
+                    raise call.error
+                return call.result
+            with self._lock:
+                self.wait_timeouts += 1
+            logging.warning(f"In-flight fetch of {key} still running after {self.wait_timeout}s, fetching directly")
+            return fn(*args, **kwargs)
+
+        try:
+            call.result = fn(*args, **kwargs)
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def __len__(self):
+        return len(self._calls)
 
 class CacheManager:
-    def __init__(self, db_path='cache/cache.db', expiry_hours=24):
-        self.db_path = db_path
+    """Two-tier cache: an in-process LRU in front of a SQLite table.
+
+    Memory hits return the already-decoded value, so cached values are shared
+    between callers and must be treated as read-only. The SQLite tier uses one
+    long-lived WAL-mode connection and stores expiry as integer epoch seconds
+    (indexed), so expiry checks never parse timestamps.
+
+    The SQLite tier is bounded by row count and total value size. Access times
+    are collected in memory and written in batches by sweep(), which also
+    removes expired rows, evicts least-recently-used rows over the caps and
+    returns free pages to the filesystem with incremental vacuum.
+
+    `inflight` coalesces concurrent fetches of the same key, so a burst of
+    misses on one key results in a single upstream request.
+    """
+
+    def __init__(self, db_path=None, expiry_hours=24, memory_entries=DEFAULT_MEMORY_ENTRIES,
+                 max_rows=DEFAULT_MAX_ROWS, max_bytes=DEFAULT_MAX_BYTES):
+        self.db_path = db_path or cache_path(DEFAULT_DB_NAME)
         self.expiry_hours = expiry_hours
+        self.max_rows = max_rows
+        self.max_bytes = max_bytes
+        self.memory = LRUCache(memory_entries)
+        self.inflight = SingleFlight()
+        self._lock = threading.Lock()
+        self._counters = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'sets': 0, 'expired': 0,
+                          'disk_evictions': 0, 'sweeps': 0}
+        self._accessed = {}
+        self._sweeper = None
+        self._stop_sweeper = threading.Event()
         self._ensure_cache_dir()
+        self._conn = self._connect()
         self._init_db()
 
     def _ensure_cache_dir(self):
@@ -17,74 +165,222 @@ class CacheManager:
         if cache_dir and not os.path.exists(cache_dir):
             os.makedirs(cache_dir)
 
+    def _connect(self):
+        # One shared connection for all threads; access is serialized by self._lock
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+
     def _init_db(self):
         """Initialize SQLite database for caching"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('''
+        with self._lock:
+            columns = {row[1] for row in self._conn.execute('PRAGMA table_info(cache)')}
+            if columns and not {'expires_at', 'last_access', 'size'} <= columns:
+                # Entries from an older layout are only a cache; start over
+                logging.info("Recreating cache table with the current layout")
+                self._conn.execute('DROP TABLE cache')
+            if self._conn.execute('PRAGMA auto_vacuum').fetchone()[0] != 2:
+                # Switching an existing file to incremental auto-vacuum needs one full VACUUM
+                self._conn.execute('PRAGMA auto_vacuum=INCREMENTAL')
+                self._conn.execute('VACUUM')
+            self._conn.execute('''
                 CREATE TABLE IF NOT EXISTS cache (
                     key TEXT PRIMARY KEY,
-                    value TEXT,
-                    timestamp TEXT
+                    value TEXT NOT NULL,
+                    expires_at INTEGER NOT NULL,
+                    last_access INTEGER NOT NULL,
+                    size INTEGER NOT NULL
                 )
             ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_expires_at ON cache (expires_at)')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_cache_last_access ON cache (last_access)')
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _touch(self, key, now, counter):
+        # Access times are flushed to SQLite by sweep(), not written on every hit
+        with self._lock:
+            self._accessed[key] = int(now)
+            self._counters[counter] += 1
 
     def set(self, key, value, expiry_hours=None):
         """Store value in cache"""
         if expiry_hours is None:
             expiry_hours = self.expiry_hours
 
-        expiry_time = datetime.now() + timedelta(hours=expiry_hours)
+        now = int(time.time())
+        expires_at = int(now + expiry_hours * 3600)
+        encoded = json.dumps(value)
 
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                'INSERT OR REPLACE INTO cache (key, value, timestamp) VALUES (?, ?, ?)',
-                (key, json.dumps(value), expiry_time.isoformat())
+        self.memory.set(key, value, expires_at)
+        with self._lock:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO cache (key, value, expires_at, last_access, size) VALUES (?, ?, ?, ?, ?)',
+                (key, encoded, expires_at, now, len(encoded))
             )
+            self._accessed.pop(key, None)
+            self._counters['sets'] += 1
 
     def get(self, key):
         """Retrieve value from cache if not expired"""
-        with sqlite3.connect(self.db_path) as conn:
-            result = conn.execute(
-                'SELECT value, timestamp FROM cache WHERE key = ?',
+        now = time.time()
+        found, value = self.memory.get(key, now)
+        if found:
+            self._touch(key, now, 'memory_hits')
+            return value
+
+        with self._lock:
+            result = self._conn.execute(
+                'SELECT value, expires_at FROM cache WHERE key = ?',
                 (key,)
             ).fetchone()
 
         if result:
-            value, timestamp = result
-            expiry_time = datetime.fromisoformat(timestamp)
-
-            if datetime.now() < expiry_time:
-                return json.loads(value)
-            else:
-                # Remove expired entry
-                self.delete(key)
+            encoded, expires_at = result
+            if now < expires_at:
+                value = json.loads(encoded)
+                self.memory.set(key, value, expires_at)
+                self._touch(key, now, 'disk_hits')
+                return value
+            # Remove expired entry
+            self._count('expired')
+            self.delete(key)
 
+        self._count('misses')
         return None
 
     def delete(self, key):
         """Remove entry from cache"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute('DELETE FROM cache WHERE key = ?', (key,))
+        self.memory.delete(key)
+        with self._lock:
+            self._conn.execute('DELETE FROM cache WHERE key = ?', (key,))
 
     def clear_expired(self):
         """Remove all expired entries"""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute(
-                'DELETE FROM cache WHERE timestamp < ?',
-                (datetime.now().isoformat(),)
-            )
+        now = int(time.time())
+        self.memory.clear_expired(now)
+        return self._delete_batches('SELECT key FROM cache WHERE expires_at <= ? LIMIT ?', (now,), 'expired')
+
+    def _delete_batches(self, select_sql, params, counter, limit=None, batch_size=SWEEP_BATCH_SIZE):
+        """Delete rows selected by select_sql in small batches, releasing the lock between them"""
+        removed = 0
+        while limit is None or removed < limit:
+            size = batch_size if limit is None else min(batch_size, limit - removed)
+            with self._lock:
+                keys = [row[0] for row in self._conn.execute(select_sql, params + (size,))]
+                if keys:
+                    self._conn.executemany('DELETE FROM cache WHERE key = ?', [(k,) for k in keys])
+                    self._counters[counter] += len(keys)
+            self.memory.delete_many(keys)
+            removed += len(keys)
+            if len(keys) < size:
+                break
+        return removed
+
+    def _flush_access_times(self):
+        with self._lock:
+            accessed, self._accessed = self._accessed, {}
+            self._conn.executemany('UPDATE cache SET last_access = ? WHERE key = ?',
+                                   [(ts, key) for key, ts in accessed.items()])
+
+    def _evict_over_caps(self):
+        """Evict least-recently-used rows until both the row and byte caps are met"""
+        with self._lock:
+            rows, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+        evicted = 0
+        if rows > self.max_rows:
+            evicted += self._delete_batches('SELECT key FROM cache ORDER BY last_access LIMIT ?', (),
+                                            'disk_evictions', limit=rows - self.max_rows)
+            with self._lock:
+                size = self._conn.execute('SELECT COALESCE(SUM(size), 0) FROM cache').fetchone()[0]
+        while size > self.max_bytes:
+            with self._lock:
+                victims = self._conn.execute('SELECT key, size FROM cache ORDER BY last_access LIMIT ?',
+                                             (SWEEP_BATCH_SIZE,)).fetchall()
+            # Only take as many of the oldest rows as needed to get under the byte cap
+            keys = []
+            for key, row_size in victims:
+                if size <= self.max_bytes:
+                    break
+                keys.append(key)
+                size -= row_size
+            if not keys:
+                break
+            with self._lock:
+                self._conn.executemany('DELETE FROM cache WHERE key = ?', [(k,) for k in keys])
+                self._counters['disk_evictions'] += len(keys)
+            self.memory.delete_many(keys)
+            evicted += len(keys)
+        return evicted
+
+    def sweep(self, vacuum_pages=256):
+        """One maintenance pass: flush access times, expire, enforce caps, incremental vacuum"""
+        self._flush_access_times()
+        expired = self.clear_expired()
+        evicted = self._evict_over_caps()
+        with self._lock:
+            free_pages = self._conn.execute('PRAGMA freelist_count').fetchone()[0]
+            if free_pages:
+                # execute() only steps the pragma once (one page); executescript runs it to completion
+                self._conn.executescript(f'PRAGMA incremental_vacuum({int(vacuum_pages)});')
+            self._counters['sweeps'] += 1
+        return {'expired': expired, 'evicted': evicted, 'free_pages': free_pages}
+
+    def start_sweeper(self, interval_seconds=300):
+        """Run sweep() every interval_seconds on a daemon thread"""
+        if self._sweeper is None:
+            self._sweeper = threading.Thread(target=self._sweep_loop, args=(interval_seconds,),
+                                             name='cache-sweeper', daemon=True)
+            self._sweeper.start()
+
+    def _sweep_loop(self, interval_seconds):
+        while not self._stop_sweeper.wait(interval_seconds):
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error(f"Cache sweep failed: {str(e)}")
 
     def get_stats(self):
         """Get cache statistics"""
-        with sqlite3.connect(self.db_path) as conn:
-            total = conn.execute('SELECT COUNT(*) FROM cache').fetchone()[0]
-            expired = conn.execute(
-                'SELECT COUNT(*) FROM cache WHERE timestamp < ?',
-                (datetime.now().isoformat(),)
+        now = int(time.time())
+        with self._lock:
+            total, size = self._conn.execute('SELECT COUNT(*), COALESCE(SUM(size), 0) FROM cache').fetchone()
+            expired = self._conn.execute(
+                'SELECT COUNT(*) FROM cache WHERE expires_at <= ?',
+                (now,)
             ).fetchone()[0]
+            counters = dict(self._counters)
 
+        lookups = counters['memory_hits'] + counters['disk_hits'] + counters['misses']
         return {
             'total_entries': total,
             'expired_entries': expired,
-            'active_entries': total - expired
+            'active_entries': total - expired,
+            'size_bytes': size,
+            'memory_entries': len(self.memory),
+            'memory_evictions': self.memory.evictions,
+            'coalesced': self.inflight.coalesced,
+            'inflight_wait_timeouts': self.inflight.wait_timeouts,
+            **counters,
+            'hit_rate': round((counters['memory_hits'] + counters['disk_hits']) / lookups, 3) if lookups else None
         }
+
+    def close(self):
+        self._stop_sweeper.set()
+        with self._lock:
+            self._conn.close()
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_cache(db_path=None):
+    """Process-wide CacheManager for db_path, shared by every service module; opened on first use"""
+    db_path = db_path or cache_path(DEFAULT_DB_NAME)
+    with _shared_lock:
+        if db_path not in _shared:
+            _shared[db_path] = CacheManager(db_path)
+            _shared[db_path].start_sweeper()
+        return _shared[db_path]
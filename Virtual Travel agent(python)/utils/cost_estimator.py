@@ -1,35 +1,69 @@
+import heapq
 import logging
+import math
 
-def calculate_total_cost(itinerary, travelers=1):
+# Fallbacks when no provider results are available
+FLIGHT_COST = 450  # Base flight cost per person
+HOTEL_COST_PER_NIGHT = 120  # Base hotel cost per night
+ACTIVITY_COST_PER_DAY = 50  # Base activity cost per day
+MISC_RATE = 0.1  # Share added for miscellaneous expenses
+
+# Typical entry fee per person; the first keyword found in an attraction's kinds applies
+ENTRY_FEES = [
+    ('amusement_parks', 60), ('zoos', 30), ('aquariums', 30), ('theatres', 50), ('museums', 20),
+    ('galleries', 15), ('historic', 10), ('churches', 0), ('parks', 0), ('beaches', 0),
+    ('markets', 0), ('natural', 0), ('architecture', 0),
+]
+DEFAULT_ENTRY_FEE = 15
+
+# Knapsack search stops here and keeps the best selection found so far
+MAX_BRANCH_NODES = 50000
+
+# How much each part of the trip contributes to a variant's quality score (sums to 1)
+QUALITY_WEIGHTS = {'flight': 0.3, 'hotel': 0.4, 'activities': 0.3}
+
+def entry_fee(kinds):
+    joined = ' '.join(kinds or [])
+    return next((fee for kind, fee in ENTRY_FEES if kind in joined), DEFAULT_ENTRY_FEE)
+
+def _visits(itinerary):
+    return [a for day in itinerary.get('days', []) for a in day.get('activities', []) if a.get('type') == 'attraction']
+
+def _hotel_cost(hotel, nights):
+    return hotel['total_price'] if 'total_price' in hotel else hotel['price_per_night'] * nights
+
+def _breakdown(flights, hotels, activities, travelers):
+    misc = (flights + hotels + activities) * MISC_RATE
+    total = flights + hotels + activities + misc
+    return {
+        'flights': round(flights, 2),
+        'hotels': round(hotels, 2),
+        'activities': round(activities, 2),
+        'misc': round(misc, 2),
+        'total': round(total, 2),
+        'per_person': round(total / travelers, 2) if travelers > 0 else 0
+    }
+
+def calculate_total_cost(itinerary, travelers=1, flight=None, hotel=None):
     """
-    Calculate total cost breakdown for the itinerary
+    Calculate total cost breakdown for the itinerary, using the chosen flight and
+    hotel when given and the entry fees of its scheduled visits
     """
     try:
-        # Base costs (these would come from actual API data in production)
-        flight_cost = 450  # Base flight cost per person
-        hotel_cost_per_night = 120  # Base hotel cost per night
-        activity_cost_per_day = 50  # Base activity cost per day
-
         # Calculate duration
         days = len(itinerary.get('days', []))
         nights = max(0, days - 1) if days > 0 else 0
 
-        # Calculate costs
-        flights = flight_cost * travelers
-        hotels = hotel_cost_per_night * nights * travelers
-        activities = activity_cost_per_day * days * travelers
-        misc = (flights + hotels + activities) * 0.1  # 10% for miscellaneous
+        # Provider prices already cover every traveler
+        flights = flight['price'] if flight else FLIGHT_COST * travelers
+        hotels = _hotel_cost(hotel, nights) if hotel else HOTEL_COST_PER_NIGHT * nights * travelers
+        visits = _visits(itinerary)
+        if visits:
+            activities = sum(entry_fee(v.get('kinds')) for v in visits) * travelers
+        else:
+            activities = ACTIVITY_COST_PER_DAY * days * travelers
 
-        total = flights + hotels + activities + misc
-
-        return {
-            'flights': round(flights, 2),
-            'hotels': round(hotels, 2),
-            'activities': round(activities, 2),
-            'misc': round(misc, 2),
-            'total': round(total, 2),
-            'per_person': round(total / travelers, 2) if travelers > 0 else 0
-        }
+        return _breakdown(flights, hotels, activities, travelers)
 
     except Exception as e:
         logging.error(f"Error calculating costs: {str(e)}")
@@ -42,33 +76,125 @@ def calculate_total_cost(itinerary, travelers=1):
             'per_person': 0
         }
 
-def get_cost_variants(itinerary, travelers=1, budget=None):
+def flight_quality(flight):
+    return max(0.0, 1.0 - 0.25 * flight.get('stops', 0))
+
+def hotel_quality(hotel):
+    return min(1.0, hotel.get('rating', 3) / 5)
+
+def _fractional_bound(items, capacity, start=0):
+    """Upper bound on the value of items[start:] within capacity, allowing a fraction of one item"""
+    value = 0.0
+    for cost, item_value, _ in items[start:]:
+        if cost <= capacity:
+            capacity -= cost
+            value += item_value
+        else:
+            return value + item_value * capacity / cost
+    return value
+
+def best_activities(items, capacity):
+    """0/1 knapsack by branch and bound: (value, chosen indices) of the best item set within capacity.
+
+    `items` are (cost, value, index) tuples sorted by value per cost, best first, with
+    identical (cost, value) items next to each other.
     """
-    Provide cost variants (economy, balanced, premium)
+    best_value, best_set, nodes = 0.0, [], 0
+
+    def branch(position, capacity, value, chosen):
+        nonlocal best_value, best_set, nodes
+        nodes += 1
+        if value > best_value:
+            best_value, best_set = value, list(chosen)
+        if (position == len(items) or nodes > MAX_BRANCH_NODES or
+                value + _fractional_bound(items, capacity, position) <= best_value):
+            return
+        cost, item_value, index = items[position]
+        if cost <= capacity:
+            chosen.append(index)
+            branch(position + 1, capacity - cost, value + item_value, chosen)
+            chosen.pop()
+        # Leaving this item out also leaves out its identical neighbours, which would only repeat the search
+        skip = position + 1
+        while skip < len(items) and items[skip][:2] == (cost, item_value):
+            skip += 1
+        branch(skip, capacity, value, chosen)
+
+    branch(0, capacity, 0.0, [])
+    return best_value, best_set
+
+def get_cost_variants(itinerary, travelers=1, budget=None, flights=None, hotels=None, k=3):
     """
-    base_costs = calculate_total_cost(itinerary, travelers)
-
-    variants = {
-        'economy': {
-            'multiplier': 0.8,
-            'description': 'Budget-friendly options'
-        },
-        'balanced': {
-            'multiplier': 1.0,
-            'description': 'Balanced comfort and cost'
-        },
-        'premium': {
-            'multiplier': 1.3,
-            'description': 'Luxury experience'
-        }
-    }
+    Up to k trip variants with the highest quality score that fit the budget, best first.
 
-    for variant, config in variants.items():
-        variants[variant]['total'] = round(base_costs['total'] * config['multiplier'], 2)
-        variants[variant]['per_person'] = round(variants[variant]['total'] / travelers, 2)
+    Each variant picks one flight and one hotel and the scheduled visits to pay for;
+    visits without an entry fee are always kept. Flight/hotel pairs are explored in
+    order of their upper bound and the visit selection is a branch-and-bound knapsack,
+    so pairs that cannot beat the current top k are never solved. When nothing fits
+    the budget, the single cheapest variant is returned with within_budget False.
+    """
+    days = len(itinerary.get('days', []))
+    nights = max(0, days - 1)
+    flights = flights or [{'airline': 'Estimated', 'price': FLIGHT_COST * travelers, 'stops': 0}]
+    hotels = hotels or [{'name': 'Estimated', 'rating': 3.5, 'total_price': HOTEL_COST_PER_NIGHT * nights * travelers}]
+    limit = math.inf if budget is None else budget / (1 + MISC_RATE)
+
+    visits = _visits(itinerary)
+    values = [max(float(v.get('rate') or 0), 1.0) for v in visits]
+    fees = [entry_fee(v.get('kinds')) * travelers for v in visits]
+    total_value = sum(values) or 1.0
+    free_value = sum(value for value, fee in zip(values, fees) if fee == 0)
+    paid = sorted(((fee, value, i) for i, (fee, value) in enumerate(zip(fees, values)) if fee > 0),
+                  key=lambda item: (-item[1] / item[0], item[0], item[1]))
+
+    def score(flight, hotel, activity_value):
+        return (QUALITY_WEIGHTS['flight'] * flight_quality(flight) + QUALITY_WEIGHTS['hotel'] * hotel_quality(hotel) +
+                QUALITY_WEIGHTS['activities'] * (free_value + activity_value) / total_value)
+
+    pairs = []
+    for flight in flights:
+        for hotel in hotels:
+            remaining = limit - flight['price'] - _hotel_cost(hotel, nights)
+            if remaining >= 0:
+                pairs.append((score(flight, hotel, _fractional_bound(paid, remaining)), remaining, flight, hotel))
+    pairs.sort(key=lambda pair: pair[0], reverse=True)
 
+    top = []  # min-heap of (score, -total cost, -order, variant): on equal quality the cheaper variant ranks higher
+    for order, (bound, remaining, flight, hotel) in enumerate(pairs):
+        if len(top) == k and bound < top[0][0]:
+            break  # pairs are sorted by bound, so none of the rest can enter the top k
+        activity_value, chosen = best_activities(paid, remaining)
+        quality = score(flight, hotel, activity_value)
+        chosen = set(chosen)
+        variant = _variant(flight, hotel, visits, fees, chosen, quality, travelers, nights)
+        entry = (quality, -variant['costs']['total'], -order, variant)
+        if len(top) < k:
+            heapq.heappush(top, entry)
+        elif entry[:3] > top[0][:3]:
+            heapq.heapreplace(top, entry)
+
+    variants = [entry[3] for entry in sorted(top, key=lambda entry: entry[:3], reverse=True)]
+    if not variants:
+        flight = min(flights, key=lambda f: f['price'])
+        hotel = min(hotels, key=lambda h: _hotel_cost(h, nights))
+        variant = _variant(flight, hotel, visits, fees, set(), score(flight, hotel, 0.0), travelers, nights)
+        variant['within_budget'] = False
+        variants = [variant]
+    for rank, variant in enumerate(variants, start=1):
+        variant['rank'] = rank
     return variants
 
+def _variant(flight, hotel, visits, fees, chosen, quality, travelers, nights):
+    activities = sum(fee for i, fee in enumerate(fees) if i in chosen)
+    return {
+        'flight': flight,
+        'hotel': hotel,
+        'skipped_visits': [v.get('name') for i, v in enumerate(visits) if fees[i] > 0 and i not in chosen],
+        'quality': round(quality, 3),
+        'costs': _breakdown(flight['price'], _hotel_cost(hotel, nights), activities, travelers),
+        'within_budget': True
+    }
+
 def validate_budget(total_cost, budget, travelers=1):
     """
     Check if total cost fits within budget
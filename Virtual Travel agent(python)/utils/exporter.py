@@ -0,0 +1,218 @@
+import csv
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+from xml.sax.saxutils import escape
+
+from flask import Response, request, send_file
+from reportlab.lib import colors
+from reportlab.lib.pagesizes import A4
+from reportlab.lib.styles import getSampleStyleSheet
+from reportlab.lib.units import mm
+from reportlab.platypus import Paragraph, SimpleDocTemplate, Spacer, Table, TableStyle
+
+from utils.cache_manager import cache_path
+
+DEFAULT_EXPORT_DIR_NAME = 'exports'
+# Part of every export hash: bump it when either document layout changes so old files are not served
+EXPORT_VERSION = 1
+FORMATS = {'pdf': 'application/pdf', 'csv': 'text/csv'}
+# Exports are immutable (the name is their content hash), so clients may keep them for a day
+EXPORT_MAX_AGE = 24 * 3600
+MAX_EXPORT_FILES = 500
+
+CSV_HEADER = ['section', 'day', 'date', 'time', 'activity', 'type', 'duration_minutes', 'travel_minutes', 'amount']
+COST_LABELS = [('flights', 'Flights'), ('hotels', 'Hotels'), ('activities', 'Activities'),
+               ('misc', 'Miscellaneous'), ('total', 'Total')]
+
+def export_hash(itinerary, variant, format_type):
+    """Content address of an export: the same itinerary and chosen options always map to the same file"""
+    payload = json.dumps({'itinerary': itinerary, 'variant': variant, 'format': format_type,
+                          'version': EXPORT_VERSION}, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def csv_rows(itinerary, variant):
+    """CSV rows grouped into blocks (one per day, then the chosen options and costs)"""
+    for day in itinerary.get('days', []):
+        yield [['itinerary', day['day'], day.get('date', ''), activity.get('time', ''), activity.get('activity', ''),
+                activity.get('type', ''), activity.get('duration_minutes', ''), activity.get('travel_minutes', ''), '']
+               for activity in day.get('activities', [])]
+
+    block = []
+    flight, hotel = variant.get('flight'), variant.get('hotel')
+    if flight:
+        block.append(['flight', '', '', '', flight.get('airline', ''), '', '', '', flight.get('price', '')])
+    if hotel:
+        block.append(['hotel', '', '', '', hotel.get('name', ''), '', '', '', hotel.get('total_price', '')])
+    block.extend(['skipped', '', '', '', name, 'attraction', '', '', ''] for name in variant.get('skipped_visits', []))
+    costs = variant.get('costs', {})
+    block.extend(['cost', '', '', '', label, '', '', '', costs[key]] for key, label in COST_LABELS if key in costs)
+    yield block
+
+def iter_csv(itinerary, variant):
+    """Encoded CSV chunks, one per block, so a download starts before the whole file is built"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_HEADER)
+    for block in csv_rows(itinerary, variant):
+        writer.writerows(block)
+        yield buffer.getvalue().encode('utf-8')
+        buffer.seek(0)
+        buffer.truncate()
+
+def render_pdf(itinerary, variant, out):
+    """Lay the itinerary out with platypus and write the PDF to `out` (a path or binary file)"""
+    styles = getSampleStyleSheet()
+    grid = TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('BACKGROUND', (0, 0), (-1, 0), colors.lightgrey),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ])
+
+    def text(value, style='BodyText'):
+        return Paragraph(escape(str(value)), styles[style])
+
+    story = [
+        text(f"Trip to {itinerary.get('destination', '')}", 'Title'),
+        text(f"Duration: {itinerary.get('duration', '')}"),
+        text(f"Travelers: {itinerary.get('travelers', '')}"),
+        text(f"Style: {itinerary.get('style', '')}"),
+        Spacer(1, 6 * mm),
+    ]
+
+    costs = variant.get('costs', {})
+    rows = [['Cost', 'Amount']] + [[label, f"${costs[key]}"] for key, label in COST_LABELS if key in costs]
+    flight, hotel = variant.get('flight'), variant.get('hotel')
+    if flight:
+        rows.append(['Flight', f"{flight.get('airline', '')} (${flight.get('price', '')})"])
+    if hotel:
+        rows.append(['Hotel', f"{hotel.get('name', '')} (rating {hotel.get('rating', '')})"])
+    if variant.get('skipped_visits'):
+        rows.append(['Skipped paid visits', text(', '.join(variant['skipped_visits']))])
+    story += [text('Costs and Selected Options', 'Heading2'), Table(rows, colWidths=[50 * mm, 110 * mm], style=grid)]
+
+    story.append(text('Day-by-Day Itinerary', 'Heading2'))
+    for day in itinerary.get('days', []):
+        heading = f"Day {day['day']} - {day.get('date', '')}"
+        if day.get('distance_km'):
+            heading += f" ({day['distance_km']} km)"
+        rows = [['Time', 'Activity', 'Duration', 'Travel']]
+        for activity in day.get('activities', []):
+            rows.append([activity.get('time', ''), text(activity.get('activity', '')),
+                         f"{activity['duration_minutes']} min" if activity.get('duration_minutes') else '',
+                         f"{activity['travel_minutes']} min" if activity.get('travel_minutes') else ''])
+        story += [text(heading, 'Heading3'),
+                  Table(rows, colWidths=[18 * mm, 102 * mm, 20 * mm, 20 * mm], style=grid, repeatRows=1)]
+
+    SimpleDocTemplate(out, pagesize=A4, title=f"Trip to {itinerary.get('destination', '')}").build(story)
+
+class ExportStore:
+    """Rendered exports on disk, named by content hash and written atomically"""
+
+    def __init__(self, directory=None, max_files=MAX_EXPORT_FILES):
+        self.directory = directory or cache_path(DEFAULT_EXPORT_DIR_NAME)
+        self.max_files = max_files
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, digest, format_type):
+        return os.path.join(self.directory, f"{digest}.{format_type}")
+
+    def lookup(self, digest, format_type):
+        """Path of a stored export, or None; a hit refreshes its age for pruning"""
+        path = self.path(digest, format_type)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def _commit(self, tmp_path, digest, format_type):
+        # Concurrent renders of the same export produce identical files, so the last rename wins harmlessly
+        os.replace(tmp_path, self.path(digest, format_type))
+        self.prune()
+
+    def write_pdf(self, itinerary, variant, digest):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                render_pdf(itinerary, variant, f)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+        self._commit(tmp_path, digest, 'pdf')
+        return self.path(digest, 'pdf')
+
+    def tee(self, chunks, digest, format_type):
+        """Yield chunks while saving them; the file is stored only if the stream completes"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+        except BaseException:
+            # Includes GeneratorExit when the client disconnects mid-download
+            os.unlink(tmp_path)
+            raise
+        self._commit(tmp_path, digest, format_type)
+
+    def prune(self):
+        """Drop the least recently used exports beyond max_files"""
+        try:
+            entries = [entry for entry in os.scandir(self.directory)
+                       if entry.is_file() and not entry.name.endswith('.part')]
+            if len(entries) <= self.max_files:
+                return
+            entries.sort(key=lambda entry: entry.stat().st_mtime)
+            for entry in entries[:len(entries) - self.max_files]:
+                os.unlink(entry.path)
+        except OSError as e:
+            logging.warning(f"Export prune error: {str(e)}")
+
+def export_response(itinerary, variant, format_type, download_name, store=None):
+    """
+    Flask response with the itinerary exported as PDF or CSV.
+
+    Stored exports are sent as static files, which gives clients ETag revalidation
+    and Range requests. A CSV miss is streamed while it is written to the store;
+    a PDF miss is rendered into the store first, since reportlab only serializes
+    the document once every page is laid out.
+    """
+    store = store or get_export_store()
+    mimetype = FORMATS[format_type]
+    digest = export_hash(itinerary, variant, format_type)
+
+    # The ETag names the content, so a client holding it is current even if the file was pruned
+    if request.if_none_match.contains(digest):
+        response = Response(status=304)
+        response.set_etag(digest)
+        return response
+
+    path = store.lookup(digest, format_type)
+    if path is None and format_type == 'pdf':
+        path = store.write_pdf(itinerary, variant, digest)
+    if path is not None:
+        return send_file(os.path.abspath(path), mimetype=mimetype, as_attachment=True, download_name=download_name,
+                         conditional=True, etag=digest, max_age=EXPORT_MAX_AGE)
+
+    response = Response(store.tee(iter_csv(itinerary, variant), digest, format_type), mimetype=mimetype)
+    response.headers['Content-Disposition'] = f'attachment; filename="{download_name}"'
+    response.set_etag(digest)
+    response.cache_control.max_age = EXPORT_MAX_AGE
+    return response
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_export_store(directory=None):
+    """Process-wide ExportStore for directory"""
+    directory = directory or cache_path(DEFAULT_EXPORT_DIR_NAME)
+    with _shared_lock:
+        if directory not in _shared:
+            _shared[directory] = ExportStore(directory)
+        return _shared[directory]
@@ -0,0 +1,131 @@
+import difflib
+import logging
+import os
+import re
+import threading
+import unicodedata
+from collections import Counter, defaultdict, namedtuple
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data', 'gazetteer.tsv')
+# Shorter queries are only matched exactly (aliases cover codes like "NYC" or "LA")
+MIN_FUZZY_LENGTH = 4
+FUZZY_THRESHOLD = 0.8
+MAX_FUZZY_CANDIDATES = 50
+
+Place = namedtuple('Place', ['name', 'country_code', 'country', 'lat', 'lon', 'population'])
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation and collapse whitespace: "São  Paulo!" -> "sao paulo" """
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c))
+    return ' '.join(re.sub(r'[^\w\s]', ' ', text.lower()).split())
+
+def trigrams(name):
+    padded = f"  {name} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+class Gazetteer:
+    """In-memory place index for resolving destinations without a network call.
+
+    Every normalized name and alias maps to one place, and the most populous
+    place wins a shared name. With fuzzy=True, names that do not match exactly
+    are looked up through a trigram index and the candidates are ranked by
+    similarity. A fuzzy hit is only a guess: a real place missing from the
+    index (Bern) can look like one that is in it (Berlin).
+    """
+
+    def __init__(self):
+        self.places = []
+        self._names = {}
+        self._trigrams = defaultdict(set)
+
+    def add(self, name, country_code, country, lat, lon, population=0, aliases=()):
+        index = len(self.places)
+        self.places.append(Place(name, country_code, country, lat, lon, population))
+        for key in {normalize(n) for n in (name, *aliases)} - {''}:
+            current = self._names.get(key)
+            if current is None:
+                for gram in trigrams(key):
+                    self._trigrams[gram].add(key)
+            if current is None or self.places[current].population < population:
+                self._names[key] = index
+
+    def load(self, path):
+        """Add places from the bundled TSV layout or a GeoNames cities*.txt dump; returns places added"""
+        added = 0
+        with open(path, encoding='utf-8') as f:
+            for line in f:
+                if not line.strip() or line.startswith('#'):
+                    continue
+                cols = line.rstrip('\r\n').split('\t')
+                if len(cols) >= 15:
+                    # GeoNames: name, asciiname, alternatenames, lat, lon, ..., country code, ..., population
+                    aliases = [cols[2]] + (cols[3].split(',') if cols[3] else [])
+                    self.add(cols[1], cols[8], '', float(cols[4]), float(cols[5]), int(cols[14] or 0), aliases)
+                else:
+                    name, country_code, country, lat, lon, population = cols[:6]
+                    aliases = cols[6].split('|') if len(cols) > 6 and cols[6] else []
+                    self.add(name, country_code, country, float(lat), float(lon), int(population or 0), aliases)
+                added += 1
+        return added
+
+    def lookup(self, query, fuzzy=False):
+        """Place whose name or alias is the free-text destination (or, with fuzzy, a near miss), or None"""
+        place = self._match(normalize(query), fuzzy)
+        if place is None and ',' in query:
+            # "Paris, France": the part after the comma must name the matched place's country
+            head, _, qualifier = query.partition(',')
+            place = self._match(normalize(head), fuzzy)
+            qualifier = normalize(qualifier)
+            if place and qualifier not in (place.country_code.lower(), normalize(place.country)):
+                place = None
+        return place
+
+    def _match(self, name, fuzzy):
+        if not name:
+            return None
+        index = self._names.get(name)
+        if index is not None:
+            return self.places[index]
+        if not fuzzy or len(name) < MIN_FUZZY_LENGTH:
+            return None
+
+        shared = Counter()
+        for gram in trigrams(name):
+            shared.update(self._trigrams.get(gram, ()))
+        # The query is the cached second sequence; the cheap upper bounds skip most candidates
+        matcher = difflib.SequenceMatcher(None, '', name)
+        best, best_rank = None, None
+        for candidate, _ in shared.most_common(MAX_FUZZY_CANDIDATES):
+            matcher.set_seq1(candidate)
+            if matcher.real_quick_ratio() < FUZZY_THRESHOLD or matcher.quick_ratio() < FUZZY_THRESHOLD:
+                continue
+            score = matcher.ratio()
+            if score < FUZZY_THRESHOLD:
+                continue
+            place = self.places[self._names[candidate]]
+            rank = (score, place.population)
+            if best_rank is None or rank > best_rank:
+                best, best_rank = place, rank
+        return best
+
+    def __len__(self):
+        return len(self.places)
+
+_shared = None
+_shared_lock = threading.Lock()
+
+def get_gazetteer():
+    """Process-wide gazetteer: the bundled places plus any files listed in GAZETTEER_PATH"""
+    global _shared
+    with _shared_lock:
+        if _shared is None:
+            gazetteer = Gazetteer()
+            paths = [DEFAULT_PATH] + [p for p in os.getenv('GAZETTEER_PATH', '').split(os.pathsep) if p]
+            for path in paths:
+                try:
+                    gazetteer.load(path)
+                except (OSError, ValueError, IndexError) as e:
+                    logging.error(f"Could not load gazetteer {path}: {str(e)}")
+            _shared = gazetteer
+        return _shared
@@ -0,0 +1,32 @@
+import math
+from datetime import datetime, timedelta
+
+# ~100 m: spellings that geocode to the same place share entries
+COORD_PRECISION = 3
+# Each budget bucket is 10% wider than the last; the exact budget is still applied when pricing
+BUDGET_STEP = 1.1
+
+def destination_key(coords):
+    return f"{coords['lat']:.{COORD_PRECISION}f}_{coords['lon']:.{COORD_PRECISION}f}"
+
+def budget_bucket(budget):
+    return int(math.floor(math.log(max(budget, 1)) / math.log(BUDGET_STEP)))
+
+def request_key(coords, start_date, end_date, travelers, budget, style):
+    """Key of a complete result: flight offers and the day plan for these dates"""
+    start = datetime.fromisoformat(start_date).date().isoformat()
+    end = datetime.fromisoformat(end_date).date().isoformat()
+    return f"itinerary_{destination_key(coords)}_{start}_{end}_{travelers}_{budget_bucket(budget)}_{style.lower()}"
+
+def hotels_key(request_key, budget):
+    """Key of the hotel offers behind a result: providers cap prices by the budget, so only the exact budget matches"""
+    return f"hotels_{request_key}_{float(budget)}"
+
+def plan_key(coords, style, days):
+    """Key of a day plan, which depends only on place, style and trip length, not on dates"""
+    return f"plan_{destination_key(coords)}_{style.lower()}_{days}"
+
+def redate(days, start_date):
+    """Copies of cached plan days dated from start_date"""
+    start = datetime.fromisoformat(start_date)
+    return [dict(day, date=(start + timedelta(days=day['day'] - 1)).strftime('%Y-%m-%d')) for day in days]
@@ -0,0 +1,216 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+# Minutes after midnight
+BREAKFAST_TIME = 9 * 60
+DAY_START = 10 * 60
+DAY_END = 18 * 60 + 30
+LUNCH_AFTER = 12 * 60 + 30
+LUNCH_MINUTES = 60
+DINNER_TIME = 19 * 60
+MAX_STOPS_PER_DAY = 4
+# Door-to-door city travel; every transfer also costs a fixed overhead
+TRAVEL_SPEED_KMH = 15
+TRANSFER_MINUTES = 10
+KMEANS_ITERATIONS = 25
+BACKFILL_ATTEMPTS = 10
+
+# (kind keyword, opens, closes, visit minutes); the first keyword found in an attraction's kinds applies
+KIND_SCHEDULES = [
+    ('amusement_parks', 10 * 60, 20 * 60, 240),
+    ('zoos', 9 * 60 + 30, 17 * 60 + 30, 150),
+    ('aquariums', 9 * 60 + 30, 17 * 60 + 30, 120),
+    ('museums', 10 * 60, 18 * 60, 120),
+    ('galleries', 10 * 60, 18 * 60, 90),
+    ('theatres', 10 * 60, 22 * 60, 120),
+    ('churches', 8 * 60, 18 * 60, 45),
+    ('markets', 8 * 60, 14 * 60, 60),
+    ('beaches', 7 * 60, 20 * 60, 150),
+    ('mountains', 7 * 60, 19 * 60, 180),
+    ('hiking', 7 * 60, 19 * 60, 180),
+    ('natural', 7 * 60, 19 * 60, 120),
+    ('parks', 6 * 60, 21 * 60, 90),
+    ('historic', 9 * 60, 18 * 60, 60),
+    ('architecture', 0, 24 * 60, 45),
+]
+DEFAULT_SCHEDULE = (9 * 60, 18 * 60, 90)
+
+def distance_matrix(lats, lons):
+    """Pairwise great-circle distances in km, computed in one vectorized haversine pass"""
+    lat = np.radians(np.asarray(lats, dtype=float))
+    lon = np.radians(np.asarray(lons, dtype=float))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def visit_window(attraction):
+    """(opens, closes, visit minutes) from explicit fields or the attraction's kinds"""
+    kinds = ' '.join(attraction.get('kinds', []))
+    opens, closes, minutes = next(((o, c, m) for kind, o, c, m in KIND_SCHEDULES if kind in kinds), DEFAULT_SCHEDULE)
+    if attraction.get('opening_hours'):
+        opens, closes = attraction['opening_hours']
+    return opens, closes, attraction.get('duration_minutes', minutes)
+
+def travel_minutes(distance_km):
+    return round(TRANSFER_MINUTES + distance_km / TRAVEL_SPEED_KMH * 60)
+
+def format_time(minutes):
+    return f"{int(minutes) // 60:02d}:{int(minutes) % 60:02d}"
+
+def cluster_by_day(xy, k, capacity):
+    """Balanced k-means: day labels for each point, with at most `capacity` points per day.
+
+    Centroids start from farthest-point seeding (from the first, best-scored point) and
+    each assignment step hands out points in order of distance until a day is full.
+    """
+    centroids = [xy[0]]
+    nearest = ((xy - xy[0]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        centroids.append(xy[int(np.argmax(nearest))])
+        nearest = np.minimum(nearest, ((xy - centroids[-1]) ** 2).sum(axis=1))
+    centroids = np.array(centroids)
+
+    labels = None
+    for _ in range(KMEANS_ITERATIONS):
+        distances = ((xy[:, None, :] - centroids[None, :, :]) ** 2).sum(axis=2)
+        new_labels = np.full(len(xy), -1)
+        counts = np.zeros(k, dtype=int)
+        for flat in np.argsort(distances, axis=None, kind='stable'):
+            point, day = divmod(int(flat), k)
+            if new_labels[point] < 0 and counts[day] < capacity:
+                new_labels[point] = day
+                counts[day] += 1
+        if labels is not None and np.array_equal(labels, new_labels):
+            break
+        labels = new_labels
+        centroids = np.array([xy[labels == day].mean(axis=0) if counts[day] else centroids[day] for day in range(k)])
+    return labels
+
+def nearest_neighbour_route(nodes, dist):
+    """Visit order for `nodes` starting from the depot (node 0), always moving to the closest stop"""
+    route, here, remaining = [], 0, set(nodes)
+    while remaining:
+        here = min(remaining, key=lambda node: (dist[here][node], node))
+        route.append(here)
+        remaining.remove(here)
+    return route
+
+def two_opt(route, dist):
+    """Improve a depot-to-depot tour by reversing segments while that shortens it"""
+    path = [0] + list(route) + [0]
+    improved = True
+    while improved:
+        improved = False
+        for i in range(1, len(path) - 2):
+            for j in range(i + 1, len(path) - 1):
+                delta = (dist[path[i - 1]][path[j]] + dist[path[i]][path[j + 1]]
+                         - dist[path[i - 1]][path[i]] - dist[path[j]][path[j + 1]])
+                if delta < -1e-9:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+    return path[1:-1]
+
+def schedule_day(route, dist, windows):
+    """Timed visits along `route`; stops that cannot be reached while open (or before DAY_END) are skipped"""
+    clock, here, lunch_at = DAY_START, 0, None
+    visits, skipped = [], []
+    for node in route:
+        opens, closes, minutes = windows[node]
+        if lunch_at is None and clock >= LUNCH_AFTER:
+            lunch_at, clock = clock, clock + LUNCH_MINUTES
+        travel = travel_minutes(dist[here][node])
+        start = max(clock + travel, opens)
+        if start + minutes > min(closes, DAY_END):
+            skipped.append(node)
+            continue
+        visits.append({'node': node, 'start': start, 'minutes': minutes, 'travel': travel})
+        clock, here = start + minutes, node
+    if lunch_at is None:
+        lunch_at, clock = max(clock, LUNCH_AFTER + 30), max(clock, LUNCH_AFTER + 30) + LUNCH_MINUTES
+    return visits, skipped, lunch_at, clock
+
+def plan_days(attractions, center, num_days, max_stops_per_day=MAX_STOPS_PER_DAY):
+    """Day-by-day activities for a trip based at `center` ({'lat', 'lon'}).
+
+    The best-rated attractions (up to max_stops_per_day per day) are split into
+    geographic day clusters, each day is routed with nearest neighbour + 2-opt
+    over a precomputed distance matrix and then timed against opening hours and
+    the day's time budget. Stops that do not fit are offered to days with spare
+    time, together with the remaining candidates. Attractions without
+    coordinates are placed at the center.
+
+    Returns one dict per day with 'activities' and 'distance_km'.
+    """
+    candidates = sorted(attractions, key=lambda a: -float(a.get('rate') or 0))
+    lats = [center['lat']] + [a.get('lat', center['lat']) for a in candidates]
+    lons = [center['lon']] + [a.get('lon', center['lon']) for a in candidates]
+    matrix = distance_matrix(lats, lons)
+    dist = matrix.tolist()  # plain lists: the routing loops index single cells
+    windows = [None] + [visit_window(a) for a in candidates]
+
+    selected = list(range(1, min(len(candidates), num_days * max_stops_per_day) + 1))
+    routes = [[] for _ in range(num_days)]
+    if selected:
+        k = min(num_days, len(selected))
+        # Equirectangular projection around the center is accurate enough to cluster a city
+        scale = math.cos(math.radians(center['lat']))
+        xy = np.column_stack([np.radians(lons)[selected] * scale, np.radians(lats)[selected]]) * EARTH_RADIUS_KM
+        labels = cluster_by_day(xy, k, math.ceil(len(selected) / k))
+        for node, day in zip(selected, labels):
+            routes[day].append(node)
+
+    schedules, leftovers = [], []
+    for nodes in routes:
+        visits, skipped, lunch_at, end = schedule_day(two_opt(nearest_neighbour_route(nodes, dist), dist), dist, windows)
+        schedules.append((visits, lunch_at, end))
+        leftovers.extend(skipped)
+
+    # Skipped stops and unselected candidates fill spare time, nearest to each day's last stop first
+    pool = set(leftovers) | set(range(len(selected) + 1, len(candidates) + 1))
+    for day in range(num_days):
+        visits, lunch_at, end = schedules[day]
+        while pool and len(visits) < max_stops_per_day:
+            last = visits[-1]['node'] if visits else 0
+            route = [visit['node'] for visit in visits]
+            for candidate in sorted(pool, key=lambda node: (dist[last][node], node))[:BACKFILL_ATTEMPTS]:
+                trial = schedule_day(route + [candidate], dist, windows)
+                if not trial[1]:
+                    visits, _, lunch_at, end = trial
+                    pool.remove(candidate)
+                    break
+            else:
+                break
+        schedules[day] = (visits, lunch_at, end)
+
+    days = []
+    for visits, lunch_at, end in schedules:
+        activities = [{'time': format_time(BREAKFAST_TIME), 'activity': 'Breakfast at hotel', 'type': 'meal'}]
+        here, distance = 0, 0.0
+        for visit in visits:
+            attraction = candidates[visit['node'] - 1]
+            activity = {
+                'time': format_time(visit['start']),
+                'activity': f"Visit {attraction['name']}",
+                'type': 'attraction',
+                'name': attraction['name'],
+                'kinds': attraction.get('kinds', []),
+                'rate': attraction.get('rate', 0),
+                'duration_minutes': visit['minutes'],
+                'travel_minutes': visit['travel']
+            }
+            if 'lat' in attraction and 'lon' in attraction:
+                activity.update(lat=attraction['lat'], lon=attraction['lon'])
+            activities.append(activity)
+            distance += dist[here][visit['node']]
+            here = visit['node']
+        distance += dist[here][0]
+        activities.append({'time': format_time(lunch_at), 'activity': 'Lunch at local restaurant', 'type': 'meal'})
+        if end <= DAY_END - 90:
+            activities.append({'time': format_time(end), 'activity': 'Free time / Shopping', 'type': 'free'})
+        activities.append({'time': format_time(DINNER_TIME), 'activity': 'Dinner and local cuisine experience',
+                           'type': 'meal'})
+        activities.sort(key=lambda a: a['time'])
+        days.append({'activities': activities, 'distance_km': round(distance, 1)})
+    return days
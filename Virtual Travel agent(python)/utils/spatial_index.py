@@ -0,0 +1,200 @@
+import sqlite3
+import json
+import math
+import os
+import time
+import threading
+
+from utils.cache_manager import cache_path
+
+DEFAULT_DB_NAME = 'attractions.db'
+# Precision-5 geohash cells are about 4.9 x 4.9 km at the equator
+TILE_PRECISION = 5
+TILE_MAX_AGE_HOURS = 24 * 7
+EARTH_RADIUS_METERS = 6371000
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+def geohash_encode(lat, lon, precision=TILE_PRECISION):
+    """Standard base32 geohash of a point"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    chars, bits, value, even = [], 0, 0, True
+    while len(chars) < precision:
+        rng, coord = (lon_range, lon) if even else (lat_range, lat)
+        mid = (rng[0] + rng[1]) / 2
+        value <<= 1
+        if coord >= mid:
+            value |= 1
+            rng[0] = mid
+        else:
+            rng[1] = mid
+        even = not even
+        bits += 1
+        if bits == 5:
+            chars.append(_BASE32[value])
+            bits, value = 0, 0
+    return ''.join(chars)
+
+def geohash_children(geohash):
+    """The 32 cells one precision finer that make up a geohash cell"""
+    return [geohash + char for char in _BASE32]
+
+def cell_size(precision=TILE_PRECISION):
+    """(lat_degrees, lon_degrees) spanned by one geohash cell"""
+    bits = 5 * precision
+    return 180.0 / 2 ** (bits // 2), 360.0 / 2 ** ((bits + 1) // 2)
+
+def geohash_bbox(geohash):
+    """(lat_min, lon_min, lat_max, lon_max) of a geohash cell"""
+    lat_range, lon_range = [-90.0, 90.0], [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = _BASE32.index(char)
+        for shift in range(4, -1, -1):
+            rng = lon_range if even else lat_range
+            mid = (rng[0] + rng[1]) / 2
+            if value >> shift & 1:
+                rng[0] = mid
+            else:
+                rng[1] = mid
+            even = not even
+    return lat_range[0], lon_range[0], lat_range[1], lon_range[1]
+
+def covering_tiles(lat_min, lon_min, lat_max, lon_max, precision=TILE_PRECISION):
+    """Geohash cells overlapping a bounding box"""
+    lat_step, lon_step = cell_size(precision)
+    tiles = set()
+    lat = math.floor((max(lat_min, -90.0) + 90) / lat_step) * lat_step - 90 + lat_step / 2
+    while lat - lat_step / 2 < min(lat_max, 90.0):
+        lon = math.floor((max(lon_min, -180.0) + 180) / lon_step) * lon_step - 180 + lon_step / 2
+        while lon - lon_step / 2 < min(lon_max, 180.0):
+            tiles.add(geohash_encode(lat, lon, precision))
+            lon += lon_step
+        lat += lat_step
+    return tiles
+
+def radius_bbox(lat, lon, radius_meters):
+    """Bounding box of a circle, widened in longitude away from the equator"""
+    dlat = math.degrees(radius_meters / EARTH_RADIUS_METERS)
+    dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+    return lat - dlat, lon - dlon, lat + dlat, lon + dlon
+
+def haversine_meters(lat1, lon1, lat2, lon2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2 +
+         math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+class AttractionIndex:
+    """Attractions persisted in SQLite, bucketed by geohash tile.
+
+    Tiles record when they were last fetched from the provider, so callers can
+    refetch only missing or stale tiles. Each attraction stores a kind bitmask
+    computed once at insert time; queries select candidate tiles by index and
+    filter by mask and exact distance.
+    """
+
+    def __init__(self, db_path=None, max_age_hours=TILE_MAX_AGE_HOURS):
+        self.db_path = db_path = db_path or cache_path(DEFAULT_DB_NAME)
+        self.max_age_hours = max_age_hours
+        self._lock = threading.Lock()
+        cache_dir = os.path.dirname(db_path)
+        if cache_dir and not os.path.exists(cache_dir):
+            os.makedirs(cache_dir)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._init_db()
+
+    def _init_db(self):
+        with self._lock:
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS attractions (
+                    id TEXT PRIMARY KEY,
+                    tile TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    lat REAL NOT NULL,
+                    lon REAL NOT NULL,
+                    kinds TEXT NOT NULL,
+                    kind_mask INTEGER NOT NULL,
+                    rate REAL NOT NULL,
+                    osm_id TEXT
+                )
+            ''')
+            self._conn.execute('CREATE INDEX IF NOT EXISTS idx_attractions_tile ON attractions (tile, kind_mask)')
+            self._conn.execute('''
+                CREATE TABLE IF NOT EXISTS tiles (
+                    tile TEXT PRIMARY KEY,
+                    fetched_at INTEGER NOT NULL
+                )
+            ''')
+
+    def missing_tiles(self, lat, lon, radius_meters):
+        """Tiles covering the circle that were never fetched or are older than max_age_hours"""
+        tiles = covering_tiles(*radius_bbox(lat, lon, radius_meters))
+        fresh_after = int(time.time() - self.max_age_hours * 3600)
+        placeholders = ','.join('?' * len(tiles))
+        with self._lock:
+            fresh = {row[0] for row in self._conn.execute(
+                f'SELECT tile FROM tiles WHERE tile IN ({placeholders}) AND fetched_at > ?',
+                (*tiles, fresh_after))}
+        return tiles - fresh
+
+    def store(self, tiles, attractions, complete=None):
+        """Replace the contents of `tiles` with `attractions` and mark the tiles fetched.
+
+        Each attraction is a dict with id, name, lat, lon, kinds (list),
+        kind_mask, rate and osm_id; ones outside `tiles` are stored too.
+        When `complete` is given, only those tiles are marked fetched: the
+        others keep what was stored but count as missing on the next search.
+        """
+        complete = tiles if complete is None else complete
+        now = int(time.time())
+        rows = [(a['id'], geohash_encode(a['lat'], a['lon']), a['name'], a['lat'], a['lon'],
+                 json.dumps(a['kinds']), a['kind_mask'], a['rate'], a.get('osm_id')) for a in attractions]
+        with self._lock:
+            self._conn.execute('BEGIN')
+            try:
+                self._conn.executemany('DELETE FROM attractions WHERE tile = ?', [(t,) for t in tiles])
+                self._conn.executemany('INSERT OR REPLACE INTO attractions VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)', rows)
+                self._conn.executemany('INSERT OR REPLACE INTO tiles (tile, fetched_at) VALUES (?, ?)',
+                                       [(t, now) for t in complete])
+                self._conn.execute('COMMIT')
+            except Exception:
+                self._conn.execute('ROLLBACK')
+                raise
+
+    def query(self, lat, lon, radius_meters, kind_mask, limit=10):
+        """Attractions within radius whose kind bitmask intersects kind_mask, best rated and nearest first"""
+        tiles = covering_tiles(*radius_bbox(lat, lon, radius_meters))
+        placeholders = ','.join('?' * len(tiles))
+        with self._lock:
+            rows = self._conn.execute(
+                f'SELECT name, lat, lon, kinds, rate, osm_id FROM attractions '
+                f'WHERE tile IN ({placeholders}) AND kind_mask & ? != 0',
+                (*tiles, kind_mask)
+            ).fetchall()
+
+        results = []
+        for name, place_lat, place_lon, kinds, rate, osm_id in rows:
+            distance = haversine_meters(lat, lon, place_lat, place_lon)
+            if distance <= radius_meters:
+                results.append({'name': name, 'kinds': json.loads(kinds), 'rate': rate,
+                                'distance': round(distance), 'osm_id': osm_id, 'lat': place_lat, 'lon': place_lon})
+        results.sort(key=lambda a: (-a['rate'], a['distance']))
+        return results[:limit]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+def get_attraction_index(db_path=None):
+    """Process-wide AttractionIndex for db_path"""
+    db_path = db_path or cache_path(DEFAULT_DB_NAME)
+    with _shared_lock:
+        if db_path not in _shared:
+            _shared[db_path] = AttractionIndex(db_path)
+        return _shared[db_path]